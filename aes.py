@@ -3,23 +3,15 @@ import time
 import sys
 import struct
 import subprocess
+import os
+from uart import read_uint, DutConnection
 # import secrets
  
 def read32bitData(ser):
-    data = 0
-    for i in range(4):
-        tmp = ser.read()
-        data = data + (int.from_bytes(tmp , byteorder=sys.byteorder) << (i * 8))
-        time.sleep(0.2)
-    return data
+    return read_uint(ser, 4)
  
 def read64bitData(ser):
-    data = 0
-    for i in range(8):
-        tmp = ser.read()
-        data = data + (int.from_bytes(tmp , byteorder=sys.byteorder) << (i * 8))
-        time.sleep(0.2)
-    return data
+    return read_uint(ser, 8)
  
 def uart_write_byte(ser, val):
     # length = 8
@@ -28,51 +20,20 @@ def uart_write_byte(ser, val):
     print(tmp)
     # ser.write
     # ser.write(val.to_bytes(1, byteorder='big'))
+
+dut = DutConnection(os.environ.get("DUT_PORT", "COM4"), 115200)
  
 def start_aes():
- 
-    com_port = serial.Serial(
-        port='COM4',
-        baudrate=115200,
-        bytesize=serial.EIGHTBITS,
-        parity=serial.PARITY_NONE,
-        stopbits=serial.STOPBITS_ONE,
-        timeout = 5
-    )
-   
-    com_port.close()
-    cmd = [0x20]
-    com_port.open()
- 
-    #com_port.write(bytes((bytearray(cmd))))
-    #time.sleep(0.2)
-    #tmp =  list(com_port.read(8))
-    # tmp =  list(bytearray(com_port.read(8)))
-    #print(tmp)
- 
-    # ## Encryption
-    # time.sleep(2)
-    for i in range(1):
-        cmd = [0xAE, 0x7B, 0xE9, 0x59, 0x01, 0xBD, 0x9F, 0x48, 0x31, 0x7B, 0xE9, 0x59, 0x01, 0xBD, 0x9F, 0x48, 0x31]
-        com_port.write(bytes((bytearray(cmd))))
-        time.sleep(0.2)
-     
-        if com_port.in_waiting >= 16:
-            tmp = list(com_port.read(16))
-            print(tmp)
-        else:
-            print("Looks like I'm getting influenced by Mr.E.M waves here.")
-            
-        #tmp =  list(com_port.read(16))
-        #print(tmp)
- 
-    #cmd = [0x1D]
-    #com_port.write(bytes((bytearray(cmd))))
-    #time.sleep(0.2)
-    #tmp =  list(com_port.read(8))
-    #print(tmp)
- 
-    com_port.close()
+    # The DUT port stays open between shots; stale input is flushed and the
+    # 16-byte response is awaited with a deadline instead of a fixed sleep.
+    cmd = [0xAE, 0x7B, 0xE9, 0x59, 0x01, 0xBD, 0x9F, 0x48, 0x31, 0x7B, 0xE9, 0x59, 0x01, 0xBD, 0x9F, 0x48, 0x31]
+    tmp = dut.transact(cmd, 16)
+
+    if len(tmp) >= 16:
+        print(list(tmp))
+    else:
+        print("Looks like I'm getting influenced by Mr.E.M waves here.")
+
     return True
 
 '''
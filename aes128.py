@@ -0,0 +1,111 @@
+'''
+Pure Python AES-128 reference model.
+
+Used by the DUT emulator to produce ciphertexts and, optionally, faulty
+ciphertexts with a byte fault injected at the start of a given round.
+'''
+
+SBOX = [
+    0x63, 0x7c, 0x77, 0x7b, 0xf2, 0x6b, 0x6f, 0xc5, 0x30, 0x01, 0x67, 0x2b, 0xfe, 0xd7, 0xab, 0x76,
+    0xca, 0x82, 0xc9, 0x7d, 0xfa, 0x59, 0x47, 0xf0, 0xad, 0xd4, 0xa2, 0xaf, 0x9c, 0xa4, 0x72, 0xc0,
+    0xb7, 0xfd, 0x93, 0x26, 0x36, 0x3f, 0xf7, 0xcc, 0x34, 0xa5, 0xe5, 0xf1, 0x71, 0xd8, 0x31, 0x15,
+    0x04, 0xc7, 0x23, 0xc3, 0x18, 0x96, 0x05, 0x9a, 0x07, 0x12, 0x80, 0xe2, 0xeb, 0x27, 0xb2, 0x75,
+    0x09, 0x83, 0x2c, 0x1a, 0x1b, 0x6e, 0x5a, 0xa0, 0x52, 0x3b, 0xd6, 0xb3, 0x29, 0xe3, 0x2f, 0x84,
+    0x53, 0xd1, 0x00, 0xed, 0x20, 0xfc, 0xb1, 0x5b, 0x6a, 0xcb, 0xbe, 0x39, 0x4a, 0x4c, 0x58, 0xcf,
+    0xd0, 0xef, 0xaa, 0xfb, 0x43, 0x4d, 0x33, 0x85, 0x45, 0xf9, 0x02, 0x7f, 0x50, 0x3c, 0x9f, 0xa8,
+    0x51, 0xa3, 0x40, 0x8f, 0x92, 0x9d, 0x38, 0xf5, 0xbc, 0xb6, 0xda, 0x21, 0x10, 0xff, 0xf3, 0xd2,
+    0xcd, 0x0c, 0x13, 0xec, 0x5f, 0x97, 0x44, 0x17, 0xc4, 0xa7, 0x7e, 0x3d, 0x64, 0x5d, 0x19, 0x73,
+    0x60, 0x81, 0x4f, 0xdc, 0x22, 0x2a, 0x90, 0x88, 0x46, 0xee, 0xb8, 0x14, 0xde, 0x5e, 0x0b, 0xdb,
+    0xe0, 0x32, 0x3a, 0x0a, 0x49, 0x06, 0x24, 0x5c, 0xc2, 0xd3, 0xac, 0x62, 0x91, 0x95, 0xe4, 0x79,
+    0xe7, 0xc8, 0x37, 0x6d, 0x8d, 0xd5, 0x4e, 0xa9, 0x6c, 0x56, 0xf4, 0xea, 0x65, 0x7a, 0xae, 0x08,
+    0xba, 0x78, 0x25, 0x2e, 0x1c, 0xa6, 0xb4, 0xc6, 0xe8, 0xdd, 0x74, 0x1f, 0x4b, 0xbd, 0x8b, 0x8a,
+    0x70, 0x3e, 0xb5, 0x66, 0x48, 0x03, 0xf6, 0x0e, 0x61, 0x35, 0x57, 0xb9, 0x86, 0xc1, 0x1d, 0x9e,
+    0xe1, 0xf8, 0x98, 0x11, 0x69, 0xd9, 0x8e, 0x94, 0x9b, 0x1e, 0x87, 0xe9, 0xce, 0x55, 0x28, 0xdf,
+    0x8c, 0xa1, 0x89, 0x0d, 0xbf, 0xe6, 0x42, 0x68, 0x41, 0x99, 0x2d, 0x0f, 0xb0, 0x54, 0xbb, 0x16,
+]
+
+INV_SBOX = [0] * 256
+for _i, _v in enumerate(SBOX):
+    INV_SBOX[_v] = _i
+
+# Default key of the Pinata board firmware; with the start_aes plaintext it
+# gives the reference ciphertext recorded in parser.py
+PINATA_KEY = bytes(bytearray([0xCA, 0xFE, 0xBA, 0xBE, 0xDE, 0xAD, 0xBE, 0xEF, 0x00, 0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07]))
+
+# Plaintext sent by start_aes in reset.py
+START_AES_PLAINTEXT = bytes(bytearray([0x7B, 0xE9, 0x59, 0x01, 0xBD, 0x9F, 0x48, 0x31, 0x7B, 0xE9, 0x59, 0x01, 0xBD, 0x9F, 0x48, 0x31]))
+
+RCON = [0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80, 0x1b, 0x36]
+
+# Byte i of the state after ShiftRows comes from byte SHIFT_ROWS[i] before it
+# (column-major state layout, byte i is row i % 4 of column i // 4)
+SHIFT_ROWS = [0, 5, 10, 15, 4, 9, 14, 3, 8, 13, 2, 7, 12, 1, 6, 11]
+
+
+def xtime(a):
+    a <<= 1
+    if a & 0x100:
+        a ^= 0x11b
+    return a
+
+
+def expand_key(key):
+    """Returns the 11 round keys of an AES-128 key as lists of 16 bytes"""
+    key = list(bytearray(key))
+    assert len(key) == 16
+    w = key[:]
+    for i in range(4, 44):
+        t = w[(i - 1) * 4:i * 4]
+        if i % 4 == 0:
+            t = t[1:] + t[:1]
+            t = [SBOX[b] for b in t]
+            t[0] ^= RCON[i // 4 - 1]
+        w.extend(w[(i - 4) * 4 + j] ^ t[j] for j in range(4))
+    return [w[r * 16:(r + 1) * 16] for r in range(11)]
+
+
+def last_round_key_to_key(round_key):
+    """Runs the key schedule backwards from the round 10 key to the AES-128 key"""
+    w = [0] * 160 + list(bytearray(round_key))
+    assert len(w) == 176
+    for i in range(43, 3, -1):
+        t = w[(i - 1) * 4:i * 4]
+        if i % 4 == 0:
+            t = t[1:] + t[:1]
+            t = [SBOX[b] for b in t]
+            t[0] ^= RCON[i // 4 - 1]
+        for j in range(4):
+            w[(i - 4) * 4 + j] = w[i * 4 + j] ^ t[j]
+    return bytes(bytearray(w[:16]))
+
+
+def _mix_columns(s):
+    out = [0] * 16
+    for c in range(4):
+        a = s[c * 4:c * 4 + 4]
+        b = [xtime(x) for x in a]
+        out[c * 4 + 0] = b[0] ^ a[1] ^ b[1] ^ a[2] ^ a[3]
+        out[c * 4 + 1] = a[0] ^ b[1] ^ a[2] ^ b[2] ^ a[3]
+        out[c * 4 + 2] = a[0] ^ a[1] ^ b[2] ^ a[3] ^ b[3]
+        out[c * 4 + 3] = a[0] ^ b[0] ^ a[1] ^ a[2] ^ b[3]
+    return out
+
+
+def encrypt_block(round_keys, plaintext, fault=None):
+    """
+    Encrypts one 16-byte block. fault is an optional (round, byte, mask) tuple
+    that XORs mask into state byte at the start of that round (1..10).
+    """
+    s = [p ^ k for p, k in zip(bytearray(plaintext), round_keys[0])]
+    for r in range(1, 11):
+        if fault is not None and fault[0] == r:
+            s[fault[1]] ^= fault[2]
+        s = [SBOX[s[SHIFT_ROWS[i]]] for i in range(16)]
+        if r != 10:
+            s = _mix_columns(s)
+        s = [a ^ k for a, k in zip(s, round_keys[r])]
+    return bytes(bytearray(s))
+
+
+def encrypt(key, plaintext, fault=None):
+    return encrypt_block(expand_key(key), plaintext, fault)
@@ -0,0 +1,191 @@
+'''
+Incremental outcome counts per (voltage, delay, duration) bin.
+
+OutcomeIndex is updated with every shot and answers rate and heat map
+questions from its bins instead of the raw records. Voltages are binned to
+1 mV like the rest of the campaign code. The index is saved as a small binary
+file of fixed-size bins (header as in results.py) and indexes of separate
+runs can be merged:
+
+    python aggregate.py glitch_index1743033460.95.bin glitch_results1743040000.1.bin
+
+accepts index and result files and prints the merged per-voltage table.
+'''
+import os
+import sys
+
+import numpy as np
+
+from checkpoint import _replace
+from results import HEADER, MAGIC as RESULTS_MAGIC, OUTCOME, OUTCOME_NAMES, load_results
+
+MAGIC = b'EMFIIDX1'
+BIN_DTYPE = np.dtype([
+    ('voltage', '<i4'),  # Millivolts
+    ('delay', '<u4'),
+    ('duration', '<u4'),
+    ('counts', '<u4', (len(OUTCOME_NAMES),)),
+])
+AXES = ('voltage', 'delay', 'duration')
+
+
+def _key(voltage, delay, duration):
+    return int(round(voltage * 1000)), int(delay), int(duration)
+
+
+class OutcomeIndex(object):
+    """Outcome counts per (voltage, delay, duration) bin"""
+
+    def __init__(self):
+        self.bins = {}  # (millivolts, delay, duration) -> [counts per OUTCOME]
+
+    def __len__(self):
+        return len(self.bins)
+
+    def add(self, voltage, delay, duration, outcome, count=1):
+        key = _key(voltage, delay, duration)
+        counts = self.bins.get(key)
+        if counts is None:
+            counts = self.bins[key] = [0] * len(OUTCOME_NAMES)
+        counts[outcome] += count
+
+    def add_records(self, records):
+        """Adds result records (results.load_results)"""
+        if len(records) == 0:
+            return
+        keys = np.empty(len(records), dtype=[('v', '<i4'), ('d', '<u4'), ('t', '<u4')])
+        keys['v'] = np.round(records['voltage'].astype(float) * 1000)
+        keys['d'] = records['delay']
+        keys['t'] = records['duration']
+        unique, inverse = np.unique(keys, return_inverse=True)
+        k = len(OUTCOME_NAMES)
+        counts = np.bincount(inverse * k + records['outcome'], minlength=len(unique) * k).reshape(-1, k)
+        for (v, d, t), row in zip(unique.tolist(), counts.tolist()):
+            self._add_counts((v, d, t), row)
+
+    def _add_counts(self, key, row):
+        counts = self.bins.get(key)
+        if counts is None:
+            self.bins[key] = list(row)
+        else:
+            for i, c in enumerate(row):
+                counts[i] += c
+
+    def merge(self, other):
+        for key, row in other.bins.items():
+            self._add_counts(key, row)
+        return self
+
+    def shots(self):
+        return sum(sum(row) for row in self.bins.values())
+
+    def catch_up(self, results_path):
+        """
+        Adds the records of a result file beyond the shots already counted, for
+        an index built from that one file and saved before its last shots.
+        """
+        if os.path.exists(results_path):
+            self.add_records(load_results(results_path)[self.shots():])
+
+    def arrays(self):
+        """Returns (keys, counts): an (N, 3) array of voltage [V], delay, duration and (N, outcomes) counts"""
+        items = list(self.bins.items())
+        keys = np.array([k for k, _ in items], dtype=float).reshape(-1, 3)
+        keys[:, 0] /= 1000.0
+        return keys, np.array([c for _, c in items], dtype=np.int64).reshape(-1, len(OUTCOME_NAMES))
+
+    def _select(self, voltage=None, delay=None, duration=None):
+        keys, counts = self.arrays()
+        keep = np.ones(len(keys), dtype=bool)
+        for column, value in enumerate((voltage, delay, duration)):
+            if value is not None:
+                keep &= np.round(keys[:, column], 3) == round(value, 3)
+        return keys[keep], counts[keep]
+
+    def counts(self, voltage=None, delay=None, duration=None):
+        """Outcome counts summed over the bins matching the given parameters"""
+        return self._select(voltage, delay, duration)[1].sum(axis=0)
+
+    def rate(self, outcome=OUTCOME.FAULT, voltage=None, delay=None, duration=None):
+        """Fraction of the matching shots with an outcome, None without shots"""
+        counts = self.counts(voltage, delay, duration)
+        total = counts.sum()
+        return float(counts[outcome]) / total if total else None
+
+    def heatmap(self, x='delay', y='voltage', outcome=OUTCOME.FAULT, **fixed):
+        """
+        Rate of an outcome over two axes, summed over the third unless it is
+        fixed by keyword. Returns (x values, y values, rates[y, x]) with NaN
+        where no shots were fired.
+        """
+        keys, counts = self._select(**fixed)
+        xi, yi = AXES.index(x), AXES.index(y)
+        xs, x_bin = np.unique(np.round(keys[:, xi], 3), return_inverse=True)
+        ys, y_bin = np.unique(np.round(keys[:, yi], 3), return_inverse=True)
+        hits = np.zeros((len(ys), len(xs)))
+        total = np.zeros((len(ys), len(xs)))
+        np.add.at(hits, (y_bin, x_bin), counts[:, outcome])
+        np.add.at(total, (y_bin, x_bin), counts.sum(axis=1))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return xs, ys, hits / total
+
+    def save(self, path):
+        """Writes the index atomically"""
+        items = sorted(self.bins.items())
+        data = np.zeros(len(items), dtype=BIN_DTYPE)
+        for i, ((v, d, t), row) in enumerate(items):
+            data[i] = (v, d, t, row)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, BIN_DTYPE.itemsize, len(items)))
+            f.write(data.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        _replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with open(path, 'rb') as f:
+            magic, bin_size, n = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or bin_size != BIN_DTYPE.itemsize:
+                raise ValueError("{} is not an index file of this format".format(path))
+            data = np.frombuffer(f.read(n * bin_size), dtype=BIN_DTYPE)
+        for v, d, t, row in data.tolist():
+            index.bins[(v, d, t)] = list(row)
+        return index
+
+    @classmethod
+    def from_results(cls, path):
+        index = cls()
+        index.add_records(load_results(path))
+        return index
+
+    def report(self):
+        keys, counts = self.arrays()
+        voltages, inverse = np.unique(np.round(keys[:, 0], 3), return_inverse=True)
+        per_voltage = np.zeros((len(voltages), counts.shape[1]), dtype=np.int64)
+        np.add.at(per_voltage, inverse, counts)
+        print("{:>8} {:>6} ".format("Voltage", "Shots") + " ".join("{:>7}".format(n) for n in OUTCOME_NAMES) +
+              " {:>7}".format("Fault%"))
+        for v, row in zip(voltages, per_voltage):
+            total = row.sum()
+            print("{:>8.3f} {:>6} ".format(v, total) + " ".join("{:>7}".format(c) for c in row) +
+                  " {:>7.2f}".format(100.0 * row[OUTCOME.FAULT] / total if total else 0.0))
+        print("{} shots in {} bins".format(int(counts.sum()), len(keys)))
+
+
+def load(path):
+    """OutcomeIndex of an index or a result file"""
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+    if magic == RESULTS_MAGIC:
+        return OutcomeIndex.from_results(path)
+    return OutcomeIndex.load(path)
+
+
+if __name__ == "__main__":
+    index = OutcomeIndex()
+    for path in sys.argv[1:]:
+        index.merge(load(path))
+    index.report()
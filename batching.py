@@ -0,0 +1,86 @@
+'''
+Multi-shot pattern batching for the Embedded Glitcher.
+
+Instead of clearing, committing, arming and triggering once per (delay,
+duration) candidate, non-overlapping candidates are packed into one committed
+pattern sequence, up to the guaranteed pattern buffer size. Most candidates
+have no effect, so a batch that comes back normal clears all of its members at
+once. A batch with an effect is split in half and both halves are retried until
+the effect is pinned to single candidates (adaptive group testing). This
+assumes the glitches of one sequence act independently. Outcomes are random,
+so the halves of a faulty batch can both come back normal; the batch's outcome
+is then kept for all of its members and they are reported as unattributed.
+'''
+from results import OUTCOME
+
+
+def pack(candidates, capacity):
+    """
+    Packs (delay, duration) candidates, delays counted from the trigger, into
+    batches of at most capacity glitches each. Glitches of a batch are
+    separated by a gap, back to back ones would act as one longer glitch.
+    """
+    batches = []
+    for delay, duration in sorted(set(candidates)):
+        for batch in batches:
+            last_delay, last_duration = batch[-1]
+            if len(batch) < capacity and delay > last_delay + last_duration:
+                batch.append((delay, duration))
+                break
+        else:
+            batches.append([(delay, duration)])
+    return batches
+
+
+def to_pattern(batch):
+    """Converts absolute candidates into pattern pairs with delays relative to the previous glitch"""
+    pairs = []
+    end = 0
+    for delay, duration in batch:
+        pairs.append((delay - end, duration))
+        end = delay + duration
+    return pairs
+
+
+class BatchTester(object):
+    """Attributes shot outcomes to individual candidates of batched pattern sequences"""
+
+    def __init__(self, shoot, capacity):
+        self.shoot = shoot        # shoot(pattern_pairs) fires one armed sequence, returns an OUTCOME
+        self.capacity = capacity
+        self.rounds = 0
+        self.candidates = 0
+        self.unattributed = set()  # Candidates given the outcome of a batch none of them reproduced
+
+    def run(self, candidates):
+        """Returns {(delay, duration): outcome} for every candidate"""
+        outcomes = {}
+        splits = []  # (batch, outcome) of every batch that was split
+        queue = pack(candidates, self.capacity)
+        self.candidates += sum(len(b) for b in queue)
+        while queue:
+            batch = queue.pop()
+            outcome = self.shoot(to_pattern(batch))
+            self.rounds += 1
+            if outcome == OUTCOME.NORMAL or len(batch) == 1:
+                for candidate in batch:
+                    outcomes[candidate] = outcome
+            else:
+                splits.append((batch, outcome))
+                half = len(batch) // 2
+                queue.append(batch[half:])
+                queue.append(batch[:half])
+        # Smallest batches first, so an effect is pinned as narrowly as possible
+        for batch, outcome in reversed(splits):
+            if all(outcomes[c] == OUTCOME.NORMAL for c in batch):
+                for candidate in batch:
+                    outcomes[candidate] = outcome
+                self.unattributed.update(batch)
+        return outcomes
+
+    def report(self):
+        print("Batching: {} candidates in {} arm/trigger rounds ({:.2f} per candidate)".format(
+            self.candidates, self.rounds, float(self.rounds) / self.candidates if self.candidates else 0.0))
+        if self.unattributed:
+            print("{} candidates share the outcome of a batch no single candidate reproduced".format(
+                len(self.unattributed)))
@@ -0,0 +1,76 @@
+'''
+Durable campaign checkpoints.
+
+The result file written by results.ResultWriter is the per-shot progress log:
+with durable=True every record is flushed and fsynced before the next shot.
+The checkpoint is a small JSON file next to it holding what the records
+cannot: the campaign's file names, sweep configuration and sampler/RNG state.
+It is replaced atomically, so a crash leaves either the old or the new state.
+
+On resume the completed shots are counted back from the result file and the
+(deterministic) sweep replays its decisions from them, so at most the shot in
+flight when the campaign died is repeated. This holds because records are
+written in the shot loop itself; log lines and the aggregate index go through
+the shot pipeline's queue and may miss the last shots (the index is caught up
+from the result file on resume).
+'''
+import json
+import os
+
+from results import load_results, outcome_counts
+
+
+def _replace(src, dst):
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:
+        # Python 2 on Windows cannot rename over an existing file
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+class Checkpoint(object):
+    """JSON campaign state, saved atomically"""
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        with open(self.path, 'r') as f:
+            self.state = json.load(f)
+        return self.state
+
+    def save(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        _replace(tmp, self.path)
+
+    def update(self, **values):
+        self.state.update(values)
+        self.save()
+
+
+def completed_counts(results_path, delay=None, duration=None):
+    """
+    Outcome counts per voltage already recorded in a result file, optionally
+    only for one delay/duration. Returns {voltage: [counts per OUTCOME]}.
+    """
+    if not os.path.exists(results_path):
+        return {}
+    records = load_results(results_path)
+    if delay is not None:
+        records = records[records['delay'] == delay]
+    if duration is not None:
+        records = records[records['duration'] == duration]
+    if len(records) == 0:
+        return {}
+    voltages, counts = outcome_counts(records)
+    return dict((round(float(v), 3), row.tolist()) for v, row in zip(voltages, counts))
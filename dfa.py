@@ -0,0 +1,242 @@
+'''
+Differential fault analysis of the start_aes campaigns.
+
+KeyRecovery takes (correct, faulty) ciphertext pairs, sorts them with the
+faults classifier and narrows the candidates for the last round key:
+
+    single     a fault entering round 10 changes one ciphertext byte j with
+               INV_SBOX[C ^ k] ^ INV_SBOX[C* ^ k] equal to the fault value.
+               Under a bit flip model (last_round_faults=BIT_FAULTS) this
+               rules out most of the 2^8 values of key byte j; under the
+               default byte model every value fits. Each pair votes for the
+               values it allows and a byte keeps the values with the most
+               votes, so pairs that do not fit the model are outvoted
+               instead of emptying the byte
+    diagonal   a single byte fault entering round 9 is spread by MixColumns
+               to one diagonal of four ciphertext bytes whose differences are
+               2d, d, d, 3d (rotated by the faulted row) for some d. The 2^32
+               hypotheses of the four key bytes factor into per-byte 2^8
+               tables, so each pair leaves a few hundred candidates without
+               enumerating the full space
+
+Diagonal pairs are solved on a process pool and every result is intersected
+with the candidates left by the pairs before it, so the remaining key entropy
+can be reported while a campaign is still running. Once one round key is
+left, the AES key follows from the inverted key schedule; if the per-byte and
+diagonal candidates contradict each other the entropy is infinite.
+
+    python dfa.py glitch_results1743033460.95.bin [workers]
+'''
+import math
+import multiprocessing
+import sys
+
+import numpy as np
+
+from aes128 import SHIFT_ROWS, START_AES_PLAINTEXT, encrypt, last_round_key_to_key
+from faults import (DIAGONALS, DIAGONAL_MASKS, BYTE_BITS, FAULT_CLASS, INV_SBOX_NP, XTIME_NP,
+                    classify_ciphertexts, classify_records, reference_ciphertext)
+from results import load_results
+
+# Fault values: single bit flips, or any byte as injected by the glitcher
+BIT_FAULTS = 1 << np.arange(8)
+BYTE_FAULTS = np.arange(1, 256)
+
+# MixColumns matrix, MIX[r][f] multiplies input row f into output row r
+MIX = np.array([[2, 3, 1, 1], [1, 2, 3, 1], [1, 1, 2, 3], [3, 1, 1, 2]])
+GMUL = np.array([np.zeros(256), np.arange(256), XTIME_NP, XTIME_NP ^ np.arange(256)], dtype=np.uint8)
+
+# MixColumns output row of each byte of a diagonal
+DIAGONAL_ROWS = [np.array([SHIFT_ROWS[i] % 4 for i in d]) for d in DIAGONALS]
+KEY_GUESSES = np.arange(256, dtype=np.uint8)
+
+
+def _byte_differences(correct, faulty):
+    # (..., 256) differences before the last SubBytes for every key byte guess
+    correct = np.asarray(correct, dtype=np.uint8)[..., None]
+    faulty = np.asarray(faulty, dtype=np.uint8)[..., None]
+    return INV_SBOX_NP[correct ^ KEY_GUESSES] ^ INV_SBOX_NP[faulty ^ KEY_GUESSES]
+
+
+def _diagonal_candidates(args):
+    """
+    Round 10 key candidates of one diagonal for one round 9 fault, as sorted
+    uint32 values with the diagonal's first key byte in the top byte.
+    """
+    column, correct, faulty, faults = args
+    diff = _byte_differences(correct, faulty)  # (4, 256)
+    counts = np.array([np.bincount(d, minlength=256) for d in diff])
+
+    # expected[f, v, j]: difference of byte j for a fault of value v in row f
+    coefficients = MIX[DIAGONAL_ROWS[column]].T  # (fault row, byte)
+    expected = GMUL[coefficients[:, None, :], np.asarray(faults)[None, :, None]]
+    possible = (counts[np.arange(4), expected] > 0).all(axis=2)
+
+    found = []
+    for f, v in zip(*np.nonzero(possible)):
+        k = [np.nonzero(diff[j] == expected[f, v, j])[0].astype(np.uint32) for j in range(4)]
+        found.append((k[0][:, None, None, None] << 24 | k[1][None, :, None, None] << 16 |
+                      k[2][None, None, :, None] << 8 | k[3][None, None, None, :]).ravel())
+    if not found:
+        return column, np.zeros(0, dtype=np.uint32)
+    return column, np.unique(np.concatenate(found))
+
+
+class KeyRecovery(object):
+    """Last round key candidates, narrowed by every faulty ciphertext added"""
+
+    def __init__(self, workers=1, last_round_faults=BYTE_FAULTS, round9_faults=BYTE_FAULTS):
+        self.workers = workers
+        self.last_round_faults = np.asarray(last_round_faults)
+        self.round9_faults = np.asarray(round9_faults)
+        self.pool = None
+        self.votes = np.zeros((16, 256), dtype=np.int64)  # Single pairs allowing each key byte value
+        self.singles = np.zeros(16, dtype=np.int64)       # Single pairs per key byte
+        self.diagonals = [None] * 4                       # Candidate arrays, None before the first fault
+        self.used = 0                                     # Diagonal pairs applied
+        self.rejected = 0                                 # Diagonal pairs that contradict the fault model
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def _map(self, items):
+        if self.workers > 1 and len(items) > 1:
+            if self.pool is None:
+                self.pool = multiprocessing.Pool(self.workers)
+            return self.pool.imap(_diagonal_candidates, items, chunksize=16)
+        return (_diagonal_candidates(item) for item in items)
+
+    def add_pairs(self, correct, faulty):
+        """
+        Applies an (N, 16) array of faulty ciphertexts. correct is the correct
+        ciphertext or one per row; correct, mute and multi-byte rows are skipped.
+        """
+        faulty = np.asarray(faulty, dtype=np.uint8).reshape(-1, 16)
+        correct = np.broadcast_to(np.asarray(correct, dtype=np.uint8).reshape(-1, 16), faulty.shape)
+        classes = classify_ciphertexts(faulty, correct)
+
+        single = np.nonzero(classes == FAULT_CLASS.SINGLE)[0]
+        if len(single):
+            position = np.argmax(correct[single] != faulty[single], axis=1)
+            diff = _byte_differences(correct[single, position], faulty[single, position])
+            allowed = np.isin(diff, self.last_round_faults)
+            np.add.at(self.votes, position, allowed)
+            np.add.at(self.singles, position, 1)
+
+        diagonal = np.nonzero(classes == FAULT_CLASS.DIAGONAL)[0]
+        bits = (correct[diagonal] != faulty[diagonal]).dot(BYTE_BITS)
+        items = []
+        for row, mask in zip(diagonal, bits):
+            column = int(np.nonzero(DIAGONAL_MASKS == mask)[0][0])
+            d = DIAGONALS[column]
+            items.append((column, correct[row, d], faulty[row, d], self.round9_faults))
+        for column, candidates in self._map(items):
+            self._intersect(column, candidates)
+
+    def _intersect(self, column, candidates):
+        previous = self.diagonals[column]
+        if previous is not None:
+            candidates = np.intersect1d(previous, candidates, assume_unique=True)
+        if len(candidates):
+            self.diagonals[column] = candidates
+            self.used += 1
+        else:
+            self.rejected += 1
+
+    def byte_candidates(self, position):
+        """Allowed values of one key byte: those allowed by the most single pairs"""
+        votes = self.votes[position]
+        return votes == votes.max()
+
+    def single_counts(self):
+        """(used, rejected) single pairs: those that agree with the winning byte values or not"""
+        used = int(sum(self.votes[p][self.byte_candidates(p)][0] for p in range(16)))
+        return used, int(self.singles.sum()) - used
+
+    def diagonal_candidates(self, column):
+        """Candidates of one diagonal that also fit the per-byte constraints, or None"""
+        candidates = self.diagonals[column]
+        if candidates is None:
+            return None
+        keep = np.ones(len(candidates), dtype=bool)
+        for j, position in enumerate(DIAGONALS[column]):
+            keep &= self.byte_candidates(position)[(candidates >> (24 - 8 * j)) & 0xff]
+        return candidates[keep]
+
+    def entropy(self):
+        """Remaining bits of the last round key, inf if the constraints leave no candidate"""
+        bits = 0.0
+        for column, positions in enumerate(DIAGONALS):
+            candidates = self.diagonal_candidates(column)
+            if candidates is None:
+                bits += sum(math.log(self.byte_candidates(p).sum(), 2) for p in positions)
+            elif len(candidates):
+                bits += math.log(len(candidates), 2)
+            else:
+                return float('inf')
+        return bits
+
+    def round_key(self):
+        """The last round key once a single candidate is left, else None"""
+        key = [0] * 16
+        for column, positions in enumerate(DIAGONALS):
+            candidates = self.diagonal_candidates(column)
+            if candidates is None:
+                values = [np.nonzero(self.byte_candidates(p))[0] for p in positions]
+                if any(len(v) != 1 for v in values):
+                    return None
+                values = [int(v[0]) for v in values]
+            else:
+                if len(candidates) != 1:
+                    return None
+                values = [(int(candidates[0]) >> (24 - 8 * j)) & 0xff for j in range(4)]
+            for position, value in zip(positions, values):
+                key[position] = value
+        return bytes(bytearray(key))
+
+    def key(self):
+        round_key = self.round_key()
+        return last_round_key_to_key(round_key) if round_key is not None else None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def report(self):
+        used, rejected = self.single_counts()
+        print("DFA: {} single and {} diagonal faults used, {} rejected".format(
+            used, self.used, rejected + self.rejected))
+        for column in range(4):
+            candidates = self.diagonal_candidates(column)
+            print("  Diagonal {} bytes {}: {}".format(
+                column, DIAGONALS[column],
+                "no round 9 fault" if candidates is None else "{} candidates".format(len(candidates))))
+        entropy = self.entropy()
+        if entropy == float('inf'):
+            print("No key candidate left: the single byte and diagonal faults contradict each other "
+                  "(wrong fault model?)")
+        else:
+            print("Remaining key entropy: {:.1f} bits".format(entropy))
+        key = self.key()
+        if key is not None:
+            print("Recovered key: {}".format(' '.join('{:02X}'.format(b) for b in bytearray(key))))
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "glitch_results1743033460.95.bin"
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else multiprocessing.cpu_count()
+    reference = reference_ciphertext()
+    records = load_results(path)
+    classes = classify_records(records, reference)
+    exploitable = (classes == FAULT_CLASS.SINGLE) | (classes == FAULT_CLASS.DIAGONAL)
+    with KeyRecovery(workers) as dfa:
+        dfa.add_pairs(reference, records['ciphertext'][exploitable])
+        dfa.report()
+        key = dfa.key()
+        if key is not None and encrypt(key, START_AES_PLAINTEXT) != bytes(bytearray(reference)):
+            print("Recovered key does not reproduce the reference ciphertext")
@@ -0,0 +1,203 @@
+'''
+Software stand-in for the AES target behind COM4.
+
+Speaks the start_aes protocol on a pseudo-terminal: an 0xAE opcode followed by
+a 16-byte plaintext, answered with the 16-byte ciphertext. The harness reports
+each glitch (voltage, delay, duration) through glitch(); the fault model turns
+that into a correct answer, a faulty ciphertext, no response, or a hang that
+lasts until reset(). A second pty (relay_port) accepts the relay on/off frames
+of power.py; after power-on the board stays silent for boot_time seconds.
+
+Run standalone to get a port name for DUT_PORT:
+    python emulator.py
+'''
+import math
+import os
+import pty
+import random
+import select
+import threading
+import time
+import tty
+
+from aes128 import PINATA_KEY, expand_key, encrypt_block
+from vcglitcher import enum
+from power import RELAY_OFF, RELAY_ON
+
+AES_OPCODE = 0xAE
+BLOCK_SIZE = 16
+
+OUTCOME = enum(NORMAL=0, FAULT=1, MUTE=2, HANG=3)
+
+
+class FaultModel(object):
+    """Maps glitch parameters to fault / no-response / hang probabilities"""
+
+    def __init__(self, center=-5.0, width=0.1, fault_peak=0.3, mute_voltage=-5.2, mute_slope=0.08,
+                 hang_ratio=0.1, delay_window=(0, 2000), nominal_duration=100):
+        self.center = center                  # Voltage where faults are most likely
+        self.width = width                    # Width of the fault window in volts
+        self.fault_peak = fault_peak          # Fault probability at the center
+        self.mute_voltage = mute_voltage      # Below this the board tends to crash
+        self.mute_slope = mute_slope          # Softness of the crash threshold in volts
+        self.hang_ratio = hang_ratio          # Share of crashes that need a power cycle
+        self.delay_window = delay_window      # Delays that land inside the AES computation
+        self.nominal_duration = nominal_duration
+
+    def probabilities(self, voltage, delay=100, duration=100):
+        """Returns (p_fault, p_mute, p_hang) for one glitch"""
+        if not (self.delay_window[0] <= delay <= self.delay_window[1]):
+            return 0.0, 0.0, 0.0
+        # Longer glitches act like deeper ones
+        depth = voltage * min(max(float(duration) / self.nominal_duration, 0.1), 2.0)
+        p_fault = self.fault_peak * math.exp(-((depth - self.center) / self.width) ** 2)
+        p_crash = 1.0 / (1.0 + math.exp((depth - self.mute_voltage) / self.mute_slope))
+        p_fault = min(p_fault, 1.0 - p_crash)
+        return p_fault, p_crash * (1.0 - self.hang_ratio), p_crash * self.hang_ratio
+
+
+class AesTarget(object):
+    """AES DUT emulator served on a pseudo-terminal"""
+
+    def __init__(self, key=PINATA_KEY, model=None, seed=None, response_delay=0.0, boot_time=0.0):
+        self.round_keys = expand_key(key)
+        self.model = model if model is not None else FaultModel()
+        self.rng = random.Random(seed)
+        self.response_delay = response_delay
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.relay_master, self.relay_slave = pty.openpty()
+        tty.setraw(self.relay_slave)
+        self.relay_port = os.ttyname(self.relay_slave)
+        self.boot_time = boot_time
+        self.powered = True
+        self.ready_at = 0.0
+        self.pending = []
+        self.hung = False
+        self.counts = [0, 0, 0, 0]
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+
+    def glitch(self, voltage, delay=100, duration=100):
+        """Called by the harness for every glitch fired; affects the next command"""
+        with self.lock:
+            self.pending.append((voltage, delay, duration))
+
+    def power(self, on):
+        """Switches the board supply; powering off clears a hang and any pending glitch"""
+        with self.lock:
+            if on and not self.powered:
+                self.ready_at = time.time() + self.boot_time
+            self.powered = on
+            if not on:
+                self.hung = False
+                self.pending = []
+
+    def reset(self):
+        """Power cycle"""
+        self.power(False)
+        self.power(True)
+
+    def alive(self):
+        return self.powered and time.time() >= self.ready_at
+
+    def outcome(self):
+        with self.lock:
+            glitches, self.pending = self.pending, []
+            if self.hung:
+                return OUTCOME.HANG
+        # Glitches of one sequence act in order; the first one with an effect wins
+        for glitch in glitches:
+            p_fault, p_mute, p_hang = self.model.probabilities(*glitch)
+            x = self.rng.random()
+            if x < p_hang:
+                with self.lock:
+                    self.hung = True
+                return OUTCOME.HANG
+            if x < p_hang + p_mute:
+                return OUTCOME.MUTE
+            if x < p_hang + p_mute + p_fault:
+                return OUTCOME.FAULT
+        return OUTCOME.NORMAL
+
+    def respond(self, plaintext):
+        """Returns the bytes the board answers with, or None for no answer"""
+        outcome = self.outcome()
+        self.counts[outcome] += 1
+        if outcome in (OUTCOME.MUTE, OUTCOME.HANG):
+            return None
+        fault = None
+        if outcome == OUTCOME.FAULT:
+            # Single-byte fault at the input of round 9 or round 10
+            fault = (self.rng.choice((9, 10)), self.rng.randrange(BLOCK_SIZE), self.rng.randrange(1, 256))
+        return encrypt_block(self.round_keys, plaintext, fault)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.daemon = True
+        self.thread.start()
+        return self.port
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        for fd in (self.slave, self.master, self.relay_slave, self.relay_master):
+            os.close(fd)
+
+    def serve(self):
+        buf = bytearray()
+        relay_buf = bytearray()
+        while self.running:
+            ready, _, _ = select.select([self.master, self.relay_master], [], [], 0.05)
+            if self.relay_master in ready:
+                relay_buf.extend(os.read(self.relay_master, 64))
+                while len(relay_buf) >= len(RELAY_ON):
+                    frame = bytes(relay_buf[:len(RELAY_ON)])
+                    if frame in (RELAY_ON, RELAY_OFF):
+                        self.power(frame == RELAY_ON)
+                        del relay_buf[:len(RELAY_ON)]
+                    else:
+                        del relay_buf[0]
+            if self.master not in ready:
+                continue
+            buf.extend(os.read(self.master, 1024))
+            if not self.alive():
+                del buf[:]  # Unpowered or still booting: input is lost
+                continue
+            while buf:
+                if buf[0] != AES_OPCODE:
+                    del buf[0]  # Unknown opcode, resynchronise on the next byte
+                    continue
+                if len(buf) < 1 + BLOCK_SIZE:
+                    break
+                plaintext = bytes(buf[1:1 + BLOCK_SIZE])
+                del buf[:1 + BLOCK_SIZE]
+                response = self.respond(plaintext)
+                if response is None:
+                    continue
+                if self.response_delay:
+                    time.sleep(self.response_delay)
+                os.write(self.master, response)
+
+
+if __name__ == "__main__":
+    target = AesTarget()
+    print("AES target emulator listening on {}".format(target.start()))
+    print("Relay listening on {}".format(target.relay_port))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        target.stop()
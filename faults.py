@@ -0,0 +1,125 @@
+'''
+Vectorised AES-128 fault classification.
+
+encrypt_batch() is a NumPy version of the aes128 reference model that encrypts
+many blocks at once, optionally with a byte fault injected per block. The
+classifier compares returned ciphertexts with the correct ones and sorts them
+by the shape of the difference:
+
+    correct      no byte differs
+    single       one byte differs (fault in the last round)
+    diagonal     the four bytes of one ShiftRows diagonal differ, the
+                 signature of a single-byte fault entering round 9, which is
+                 what differential fault analysis needs
+    multi        any other corruption
+    none         no or truncated response
+
+so a campaign can be judged by its exploitable faults rather than by any
+mismatch.
+
+    python faults.py glitch_results1743033460.95.bin
+'''
+import sys
+
+import numpy as np
+
+from aes128 import SBOX, INV_SBOX, SHIFT_ROWS, PINATA_KEY, START_AES_PLAINTEXT, expand_key, xtime
+from results import OUTCOME, load_results
+from vcglitcher import enum
+
+FAULT_CLASS = enum(CORRECT=0, SINGLE=1, DIAGONAL=2, MULTI=3, NONE=4)
+FAULT_CLASS_NAMES = ('correct', 'single', 'diagonal', 'multi', 'none')
+
+SBOX_NP = np.array(SBOX, dtype=np.uint8)
+INV_SBOX_NP = np.array(INV_SBOX, dtype=np.uint8)
+XTIME_NP = np.array([xtime(i) for i in range(256)], dtype=np.uint8)
+SHIFT_ROWS_NP = np.array(SHIFT_ROWS)
+
+# Output bytes reached by each column of the round 9 MixColumns
+DIAGONALS = [[i for i in range(16) if SHIFT_ROWS[i] // 4 == c] for c in range(4)]
+BYTE_BITS = 1 << np.arange(16)
+DIAGONAL_MASKS = np.array([sum(1 << i for i in d) for d in DIAGONALS])
+
+
+def mix_columns_batch(s):
+    """MixColumns of an (N, 16) state array"""
+    a = s.reshape(-1, 4, 4)
+    b = XTIME_NP[a]
+    out = b ^ np.roll(a, -1, axis=2) ^ np.roll(b, -1, axis=2) ^ np.roll(a, -2, axis=2) ^ np.roll(a, -3, axis=2)
+    return out.reshape(-1, 16)
+
+
+def encrypt_batch(key, plaintexts, fault=None):
+    """
+    Encrypts an (N, 16) array of blocks. fault is an optional (round, bytes,
+    masks) tuple whose bytes and masks hold one state byte index and XOR mask
+    per block, applied at the start of that round as in aes128.encrypt_block.
+    """
+    round_keys = np.array(expand_key(key), dtype=np.uint8)
+    s = np.array(plaintexts, dtype=np.uint8).reshape(-1, 16) ^ round_keys[0]
+    rows = np.arange(len(s))
+    for r in range(1, 11):
+        if fault is not None and fault[0] == r:
+            s[rows, fault[1]] ^= np.asarray(fault[2], dtype=np.uint8)
+        s = SBOX_NP[s[:, SHIFT_ROWS_NP]]
+        if r != 10:
+            s = mix_columns_batch(s)
+        s ^= round_keys[r]
+    return s
+
+
+def reference_ciphertext(key=PINATA_KEY, plaintext=START_AES_PLAINTEXT):
+    return encrypt_batch(key, np.frombuffer(bytes(bytearray(plaintext)), dtype=np.uint8))[0]
+
+
+def classify_ciphertexts(ciphertexts, reference, responded=None):
+    """
+    FAULT_CLASS code of every row of an (N, 16) ciphertext array. reference is
+    one correct ciphertext or one per row; responded marks rows with a complete
+    response (all rows by default).
+    """
+    ct = np.asarray(ciphertexts, dtype=np.uint8).reshape(-1, 16)
+    diff = ct != np.asarray(reference, dtype=np.uint8).reshape(-1, 16)
+    count = diff.sum(axis=1)
+    bits = diff.dot(BYTE_BITS)
+    classes = np.full(len(ct), FAULT_CLASS.MULTI, dtype=np.uint8)
+    classes[count == 0] = FAULT_CLASS.CORRECT
+    classes[count == 1] = FAULT_CLASS.SINGLE
+    classes[(count == 4) & np.isin(bits, DIAGONAL_MASKS)] = FAULT_CLASS.DIAGONAL
+    if responded is not None:
+        classes[~np.asarray(responded, dtype=bool)] = FAULT_CLASS.NONE
+    return classes
+
+
+def classify_records(records, reference):
+    """FAULT_CLASS of every record of a result file (results.load_results)"""
+    responded = (records['outcome'] == OUTCOME.NORMAL) | (records['outcome'] == OUTCOME.FAULT)
+    return classify_ciphertexts(records['ciphertext'], reference, responded)
+
+
+def fault_table(voltages, classes):
+    """Returns (voltages, counts) with counts[i, class] shots per voltage"""
+    voltages, inverse = np.unique(np.round(voltages, 3), return_inverse=True)
+    k = len(FAULT_CLASS_NAMES)
+    counts = np.bincount(inverse * k + classes, minlength=len(voltages) * k)
+    return voltages, counts.reshape(len(voltages), k)
+
+
+def report(voltages, counts):
+    print("{:>8} ".format("Voltage") + " ".join("{:>8}".format(n) for n in FAULT_CLASS_NAMES))
+    for v, row in zip(voltages, counts):
+        print("{:>8.3f} ".format(v) + " ".join("{:>8}".format(c) for c in row))
+    totals = counts.sum(axis=0)
+    print("   Total " + " ".join("{:>8}".format(c) for c in totals))
+    exploitable = counts[:, FAULT_CLASS.SINGLE] + counts[:, FAULT_CLASS.DIAGONAL]
+    if exploitable.any():
+        best = np.argmax(exploitable)
+        print("Most exploitable faults at {:.3f}V ({} of {} shots)".format(
+            voltages[best], exploitable[best], counts[best].sum()))
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        records = load_results(path)
+        classes = classify_records(records, reference_ciphertext())
+        report(*fault_table(records['voltage'], classes))
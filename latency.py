@@ -0,0 +1,66 @@
+'''
+Fixed-bucket latency histogram.
+
+Buckets are spaced a quarter octave apart from 1 us to about 100 s, so
+recording is one log2 and a list increment and percentiles are accurate to
+about 19%.
+'''
+import math
+
+BASE = 1e-6
+STEPS_PER_OCTAVE = 4
+BUCKETS = 27 * STEPS_PER_OCTAVE
+
+
+def bucket_upper(index):
+    """Upper bound in seconds of a bucket"""
+    return BASE * 2.0 ** (float(index) / STEPS_PER_OCTAVE)
+
+
+class LatencyHistogram(object):
+    """Histogram of durations in seconds"""
+
+    def __init__(self):
+        self.counts = [0] * (BUCKETS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        if seconds <= BASE:
+            index = 0
+        else:
+            index = min(int(math.ceil(math.log(seconds / BASE, 2) * STEPS_PER_OCTAVE)), BUCKETS)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """Upper bucket bound below which a fraction q of the samples fall"""
+        if self.count == 0:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target and c:
+                return min(bucket_upper(i), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self):
+        if self.count == 0:
+            return "no samples"
+        return "n={} mean={:.6f}s p50={:.6f}s p90={:.6f}s p99={:.6f}s max={:.6f}s".format(
+            self.count, self.mean(), self.percentile(0.5), self.percentile(0.9), self.percentile(0.99), self.max)
@@ -1,27 +1,200 @@
+'''
+Glitch log analyzer.
 
+Memory-maps a glitch_log*.txt written by reset.py and extracts iteration,
+voltage, soft start result, ciphertext and reset events in a single regex
+pass. Ciphertexts are compared against the reference all at once with NumPy
+and faults, resets and successes are reported per glitch voltage.
 
-def analyze_log(filepath, reference_ciphertext):
-    fault_count = 0
-    reset_count = 0
+    python parser.py glitch_log1743033460.95.txt
+'''
+import ast
+import mmap
+import multiprocessing
+import os
+import re
+import sys
 
-    with open(filepath, 'r') as file:
-        for line in file:
-            if "board no response" in line:
-                reset_count += 1
-            elif "AES encryption successful" in line:
-                continue  
-            elif "[" in line and "]" in line:
-                try:
-                    parts = line.split(" - ", 1)
-                    if len(parts) < 2:
-                        continue
-                    cipher_line = parts[1].strip()
-                    
+import numpy as np
 
+from faults import FAULT_CLASS, FAULT_CLASS_NAMES, classify_ciphertexts
+
+# Every event of interest starts right after the " - " of the logging format;
+# the literal prefix lets the regex engine skip ahead instead of trying each
+# alternative at every byte. Successful soft starts carry no information.
+LOG_PATTERN = re.compile(
+    br" - (?:Iteration (?P<iter>\d+) \| Glitch Voltage: (?P<volt>-?[\d.]+)V"
+    br"|(?P<soft>Soft start result: False)"
+    br"|(?P<reset>board no response)"
+    br"|(?P<ct>\[[^\r\n]*\]))"
+)
+
+
+def ciphertext_bytes(ct):
+    """Converts a logged ciphertext (list of chars or ints) into 16 bytes"""
+    return bytearray(c if isinstance(c, int) else ord(c) for c in ct)
+
+
+class LogSummary(object):
+    """Per-voltage outcome arrays produced by analyze_log"""
+
+    def __init__(self, voltages, shots, successes, faults, resets, soft_fail, classes):
+        self.voltages = voltages
+        self.shots = shots
+        self.successes = successes
+        self.faults = faults
+        self.resets = resets
+        self.soft_fail = soft_fail
+        self.classes = classes  # counts[i, FAULT_CLASS] per voltage
+
+    def rows(self):
+        return zip(self.voltages.tolist(), self.shots.tolist(), self.successes.tolist(),
+                   self.faults.tolist(), self.resets.tolist())
+
+    def report(self):
+        print("{:>8} {:>6} {:>8} {:>6} {:>6} {:>6} {:>8} {:>6}".format(
+            "Voltage", "Shots", "Success", "Fault", "Reset", "Single", "Diagonal", "Multi"))
+        for i, (v, n, ok, fault, reset) in enumerate(self.rows()):
+            single, diagonal, multi = self.classes[i, [FAULT_CLASS.SINGLE, FAULT_CLASS.DIAGONAL, FAULT_CLASS.MULTI]]
+            print("{:>8.2f} {:>6} {:>8} {:>6} {:>6} {:>6} {:>8} {:>6}".format(
+                v, n, ok, fault, reset, single, diagonal, multi))
+        print("Total Faults Detected: {}".format(int(self.faults.sum())))
+        print("Total Resets (board no response): {}".format(int(self.resets.sum())))
+        print("Failed soft starts: {}".format(int(self.soft_fail.sum())))
+
+
+def _scan_range(args):
+    # Scans log bytes [start, end) of one chunk. Events before the chunk's first
+    # Iteration line get a NaN voltage; scan_log fills them in from the chunk before.
+    filepath, start, end = args
+    decoded = {}  # Most shots log the same ciphertext, decode each text once
+    ct_voltage = []
+    ct_raw = []
+    event_voltage = []
+    event_kind = []
+    voltage = float('nan')
+
+    with open(filepath, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for m in LOG_PATTERN.finditer(data, start, end):
+                group = m.lastgroup
+                if group == 'volt':
+                    voltage = float(m.group('volt'))
+                elif group == 'ct':
+                    text = m.group('ct')
+                    ct = decoded.get(text)
+                    if ct is None:
+                        try:
+                            ct = bytes(ciphertext_bytes(ast.literal_eval(text.decode('latin-1'))))
+                        except (ValueError, SyntaxError, TypeError):
+                            continue
+                        if len(ct) != 16:
+                            continue
+                        decoded[text] = ct
+                    ct_voltage.append(voltage)
+                    ct_raw.append(ct)
+                elif group == 'reset':
+                    event_voltage.append(voltage)
+                    event_kind.append(1)
+                elif group == 'soft':
+                    event_voltage.append(voltage)
+                    event_kind.append(2)
+        finally:
+            data.close()
+    return ct_voltage, b''.join(ct_raw), event_voltage, event_kind, voltage
+
+
+def _chunk_ranges(filepath, chunk_size):
+    # Splits the file into ranges that end on line boundaries
+    size = os.path.getsize(filepath)
+    ranges = []
+    with open(filepath, 'rb') as f:
+        start = 0
+        while start < size:
+            end = min(start + chunk_size, size)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            ranges.append((filepath, start, end))
+            start = end
+    return ranges
+
+
+def scan_log(filepath, workers=1, chunk_size=64 << 20):
+    """
+    Single pass over the log, split into chunks scanned by a process pool when
+    workers > 1. Returns (ct_voltage, ciphertexts, event_voltage, event_kind)
+    where ciphertexts is an (N, 16) uint8 array and event_kind is 1 for a reset
+    and 2 for a failed soft start.
+    """
+    ranges = _chunk_ranges(filepath, chunk_size)
+    if workers > 1 and len(ranges) > 1:
+        pool = multiprocessing.Pool(workers)
+        try:
+            parts = pool.map(_scan_range, ranges)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        parts = [_scan_range(r) for r in ranges]
+
+    ct_voltage, ct_raw, event_voltage, event_kind = [], [], [], []
+    carry = float('nan')
+    for cv, raw, ev, ek, last in parts:
+        cv = np.array(cv, dtype=float)
+        ev = np.array(ev, dtype=float)
+        cv[np.isnan(cv)] = carry
+        ev[np.isnan(ev)] = carry
+        if not np.isnan(last):
+            carry = last
+        ct_voltage.append(cv)
+        ct_raw.append(raw)
+        event_voltage.append(ev)
+        event_kind.append(np.array(ek, dtype=np.uint8))
+
+    ciphertexts = np.frombuffer(b''.join(ct_raw), dtype=np.uint8).reshape(-1, 16)
+    return (np.concatenate(ct_voltage or [np.zeros(0)]), ciphertexts,
+            np.concatenate(event_voltage or [np.zeros(0)]),
+            np.concatenate(event_kind or [np.zeros(0, np.uint8)]))
+
+
+def analyze_log(filepath, reference_ciphertext, workers=None):
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    ct_voltage, ciphertexts, event_voltage, event_kind = scan_log(filepath, workers)
+    reference = np.frombuffer(bytes(ciphertext_bytes(reference_ciphertext)), dtype=np.uint8)
+
+    # Events logged before the first Iteration line belong to no voltage
+    keep = ~np.isnan(ct_voltage)
+    ct_voltage, ciphertexts = ct_voltage[keep], ciphertexts[keep]
+    fault_class = classify_ciphertexts(ciphertexts, reference)
+    faulty = fault_class != FAULT_CLASS.CORRECT
+    keep = ~np.isnan(event_voltage)
+    event_voltage, event_kind = event_voltage[keep], event_kind[keep]
+
+    # Round away float noise from the np.arange sweep before grouping
+    voltages, inverse = np.unique(np.round(np.concatenate((ct_voltage, event_voltage)), 3),
+                                  return_inverse=True)
+    ct_bin = inverse[:len(ct_voltage)]
+    event_bin = inverse[len(ct_voltage):]
+    n = len(voltages)
+
+    faults = np.bincount(ct_bin, weights=faulty, minlength=n).astype(int)
+    successes = np.bincount(ct_bin, minlength=n) - faults
+    resets = np.bincount(event_bin, weights=event_kind == 1, minlength=n).astype(int)
+    soft_fail = np.bincount(event_bin, weights=event_kind == 2, minlength=n).astype(int)
+    k = len(FAULT_CLASS_NAMES)
+    classes = np.bincount(ct_bin * k + fault_class, minlength=n * k).reshape(n, k)
+    classes[:, FAULT_CLASS.NONE] = resets
+    summary = LogSummary(voltages, successes + faults + resets, successes, faults, resets, soft_fail, classes)
+    summary.report()
+    return summary
 
-    print("Total Faults Detected: {}".format(fault_count))
-    print("Total Resets (board no response): {}".format(reset_count))
 
 reference_ciphertext = ['\xec', '\xfa', '\x81', '\x88', 'h', '"', 'G', '.', '-', '\x0b', '\x08', '\x88', 'Z', '\x16', '\xfd', '\x01']
-log_file = "glitch_log1743033460.95.txt"  
-analyze_log(log_file, reference_ciphertext)
+
+if __name__ == "__main__":
+    log_file = sys.argv[1] if len(sys.argv) > 1 else "glitch_log1743033460.95.txt"
+    analyze_log(log_file, reference_ciphertext)
@@ -0,0 +1,118 @@
+'''
+Pipelined shot loop.
+
+The DUT needs a settling gap between shots. Instead of a fixed sleep after all
+host work is done, ShotPipeline measures the gap from the end of the previous
+shot: the next shot is armed inside it and wait_settled() only sleeps what is
+left. Logging and other bookkeeping are handed to a background thread with
+submit(), so they overlap with the settling gap and the next shot's DUT
+latency instead of delaying it.
+
+Queued jobs only run if the process lives to close() them; a crash or kill
+loses them. Durable result records are therefore written by the caller right
+after shot_done(), which already puts them inside the gap.
+
+    pipeline.start()
+    vcg = session.arm(...)
+    pipeline.wait_settled()
+    ... trigger, read the DUT, wait for completion ...
+    pipeline.shot_done()
+    results.write(voltage, delay, duration, outcome, response)
+    pipeline.submit(logging.info, "...")
+'''
+import threading
+import time
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+from latency import LatencyHistogram
+
+
+class ShotPipeline(object):
+    """Explicit settling time between shots and background result handling"""
+
+    def __init__(self, settle=2.0, maxsize=4096):
+        self.settle = settle            # Seconds between the end of a shot and the next trigger
+        self.queue = queue.Queue(maxsize)
+        self.thread = None
+        self.error = None
+        self.last_end = None
+        self.gaps = LatencyHistogram()  # Measured end-to-trigger gaps
+        self.hidden = LatencyHistogram()  # Host work done inside the gap
+        self.sink = LatencyHistogram()  # Background job durations
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._drain, name="shot-sink")
+            self.thread.daemon = True
+            self.thread.start()
+
+    def _drain(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    return
+                func, args = job
+                start = time.time()
+                try:
+                    func(*args)
+                except Exception as e:
+                    self.error = e
+                self.sink.record(time.time() - start)
+            finally:
+                self.queue.task_done()
+
+    def _check(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def submit(self, func, *args):
+        """Runs func(*args) on the background thread, or inline when the pipeline is not started"""
+        self._check()
+        if self.thread is None:
+            func(*args)
+        else:
+            self.queue.put((func, args))
+
+    def wait_settled(self):
+        """Sleeps until settle seconds have passed since the previous shot ended"""
+        if self.last_end is None:
+            return
+        busy = time.time() - self.last_end
+        self.hidden.record(busy)
+        if busy < self.settle:
+            time.sleep(self.settle - busy)
+        self.gaps.record(time.time() - self.last_end)
+
+    def shot_done(self):
+        self.last_end = time.time()
+
+    def flush(self):
+        """Waits until all submitted jobs ran"""
+        if self.thread is not None:
+            self.queue.join()
+        self._check()
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        self._check()
+
+    def report(self):
+        print("Settling: target {:.3f}s, gap {}".format(self.settle, self.gaps.summary()))
+        print("Host work hidden in the gap: {}".format(self.hidden.summary()))
+        print("Background jobs: {}".format(self.sink.summary()))
@@ -0,0 +1,89 @@
+'''
+Power-cycle controller for the DUT relay.
+
+Keeps the relay port open, switches the board off for at least min_off_time,
+switches it back on and then polls a cheap liveness probe until the board
+answers or boot_timeout passes. The measured recovery time of every reset is
+kept in history.
+'''
+import time
+
+import serial
+
+RELAY_OFF = bytes(bytearray([0xA0, 0x01, 0x01, 0xA2]))
+RELAY_ON = bytes(bytearray([0xA0, 0x01, 0x00, 0xA1]))
+
+
+class PowerCycler(object):
+    """Relay-driven DUT reset with readiness probing"""
+
+    def __init__(self, port='COM7', baudrate=9600, min_off_time=1.0, probe=None, boot_timeout=5.0,
+                 poll_interval=0.02):
+        self.port = port
+        self.baudrate = baudrate
+        self.min_off_time = min_off_time    # Time the board stays unpowered
+        self.probe = probe                  # probe() -> True once the board answers
+        self.boot_timeout = boot_timeout
+        self.poll_interval = poll_interval
+        self.ser = None
+        self.history = []                   # (timestamp, off_time, recovery_time, recovered)
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def open(self):
+        if self.ser is None:
+            self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
+        return self.ser
+
+    def close(self):
+        if self.ser is not None:
+            self.ser.close()
+            self.ser = None
+
+    def off(self):
+        self.open().write(RELAY_OFF)
+        self.ser.flush()
+
+    def on(self):
+        self.open().write(RELAY_ON)
+        self.ser.flush()
+
+    def wait_ready(self):
+        """Polls the probe until it succeeds or boot_timeout passes; returns the boot time or None"""
+        start = time.time()
+        if self.probe is None:
+            return 0.0
+        while True:
+            if self.probe():
+                return time.time() - start
+            if time.time() - start > self.boot_timeout:
+                return None
+            time.sleep(self.poll_interval)
+
+    def reset(self):
+        """Power cycles the board, returns True once it answers again"""
+        self.off()
+        off_start = time.time()
+        time.sleep(self.min_off_time)
+        self.on()
+        off_time = time.time() - off_start
+        recovery = self.wait_ready()
+        self.history.append((off_start, off_time, recovery, recovery is not None))
+        return recovery is not None
+
+    def last_recovery(self):
+        return self.history[-1][2] if self.history else None
+
+    def report(self):
+        recovered = [h[2] for h in self.history if h[3]]
+        failed = len(self.history) - len(recovered)
+        if recovered:
+            print("Resets: {} ({} without recovery), recovery mean {:.3f}s max {:.3f}s".format(
+                len(self.history), failed, sum(recovered) / len(recovered), max(recovered)))
+        else:
+            print("Resets: {} ({} without recovery)".format(len(self.history), failed))
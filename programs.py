@@ -0,0 +1,191 @@
+'''
+Python-side programs for the VC Glitcher assembler and a cache of their
+compiled native handles.
+
+A Program records the same instruction calls as VCGlitcherProgram (add_label,
+loadi, waittime, branch0, end, ...) as plain tuples without touching the DLL.
+ProgramCache keys programs by their instruction list and only emits them into
+a native program (one vcg_as_* call per instruction plus vcg_as_check_program)
+on a miss. Handles are kept in LRU order and destroyed on eviction, so a
+parameterised perturbation program rebuilt for every shot costs a dictionary
+lookup once it has been seen.
+
+Eviction destroys the native handle, so a program loaded on the device must
+not be evicted while the device may still run it: get(..., pin=True) keeps it
+resident until unpin(). Pinned programs do not count against eviction; the
+cache grows past its capacity rather than destroy one.
+
+    def perturbation(delay):
+        p = Program()
+        p.wait_signal(WAIT.TRIGGER, 1)
+        p.loadi(REG.R0, delay)
+        p.waittime(REG.R0)
+        p.set_signal(SET.GLITCH_EN, 1)
+        p.end()
+        return p
+
+    program = perturbation(1200)
+    vcg.tvcg_add_program(cache.get(program, pin=True))
+    ...
+    cache.unpin(program)  # Once the device no longer uses it
+'''
+import collections
+
+from vcglitcher import VCGlitcherProgram, load_library
+
+# VCGlitcherProgram methods that add to a program, with their operand names
+INSTRUCTIONS = collections.OrderedDict([
+    ('add_label', ('label',)),
+    ('nop', ()),
+    ('jmpr', ('rj',)),
+    ('ret', ()),
+    ('loadi', ('rd', 'data')),
+    ('loadm', ('rd', 'address')),
+    ('storem', ('address', 'rs')),
+    ('loadr', ('rd', 'rs')),
+    ('loadf', ('rd',)),
+    ('storer', ('rd', 'rs')),
+    ('addi', ('rd', 'data')),
+    ('subi', ('rd', 'data')),
+    ('shiftl', ('rd', 'shift')),
+    ('shiftr', ('rd', 'shift')),
+    ('jmp', ('label',)),
+    ('cmpeq', ('ra', 'rb')),
+    ('cmpgt', ('ra', 'rb')),
+    ('cmplt', ('ra', 'rb')),
+    ('cmpgte', ('ra', 'rb')),
+    ('cmplte', ('ra', 'rb')),
+    ('cmpz', ('ra',)),
+    ('branch0', ('label',)),
+    ('branch1', ('label',)),
+    ('wait_signal', ('signal', 'val')),
+    ('waittime', ('rt',)),
+    ('counter_rst', ()),
+    ('addr', ('rd', 'ra', 'rb')),
+    ('subr', ('rd', 'ra', 'rb')),
+    ('notr', ('rd', 'ra')),
+    ('xorr', ('rd', 'ra', 'rb')),
+    ('andr', ('rd', 'ra', 'rb')),
+    ('orr', ('rd', 'ra', 'rb')),
+    ('backup', ()),
+    ('restore', ()),
+    ('counter_move', ('rd',)),
+    ('end', ()),
+    ('set_signal', ('signal', 'val')),
+    ('get_signal', ('rd', 'signal')),
+    ('recvr', ('rd',)),
+    ('sendi', ('data',)),
+    ('sendq', ()),
+    ('sendr', ('rs',)),
+    ('sync', ()),
+    ('txconfig', ('rs', 'i', 'dp')),
+    ('rxconfig', ('rs', 'i', 'dp')),
+])
+LABEL_OPERANDS = ('add_label', 'jmp', 'branch0', 'branch1')
+
+
+class Program(object):
+    """Instruction list with the VCGlitcherProgram builder interface"""
+
+    def __init__(self, instructions=()):
+        self.instructions = list(instructions)  # (name, operands) tuples
+
+    def __getattr__(self, name):
+        if name not in INSTRUCTIONS:
+            raise AttributeError(name)
+        return lambda *operands: self.add(name, *operands)
+
+    def add(self, name, *operands):
+        if len(operands) != len(INSTRUCTIONS[name]):
+            raise TypeError("{} takes operands {}".format(name, INSTRUCTIONS[name]))
+        for operand in operands:
+            assert isinstance(operand, str) if name in LABEL_OPERANDS else isinstance(operand, int)
+        self.instructions.append((name, tuple(operands)))
+        return self
+
+    def key(self):
+        return tuple(self.instructions)
+
+    def __eq__(self, other):
+        return isinstance(other, Program) and self.instructions == other.instructions
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __len__(self):
+        return len(self.instructions)
+
+    def emit(self, native):
+        """Replays the instructions into a VCGlitcherProgram"""
+        for name, operands in self.instructions:
+            getattr(native, name)(*operands)
+        return native
+
+
+class ProgramCache(object):
+    """LRU cache of assembled native programs keyed by their instructions"""
+
+    def __init__(self, dll=None, capacity=32):
+        self.dll = dll if dll is not None else load_library()
+        self.capacity = capacity
+        self.programs = collections.OrderedDict()  # key -> VCGlitcherProgram
+        self.pinned = set()  # Keys of programs loaded on the device
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, program, pin=False):
+        """
+        Returns the assembled VCGlitcherProgram for a Program, compiling it on a
+        miss. pin=True protects it from eviction until unpin().
+        """
+        key = program.key()
+        native = self.programs.pop(key, None)
+        if native is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            native = VCGlitcherProgram(self.dll)
+            try:
+                program.emit(native)
+                native.assemble_program()
+            except Exception:
+                native.destroy()
+                raise
+            while len(self.programs) >= self.capacity and self.evict():
+                pass
+        self.programs[key] = native  # Most recently used last
+        if pin:
+            self.pinned.add(key)
+        return native
+
+    def unpin(self, program):
+        self.pinned.discard(program.key())
+
+    def evict(self):
+        """Destroys the least recently used unpinned program; False if there is none"""
+        for key in self.programs:
+            if key not in self.pinned:
+                self.programs.pop(key).destroy()
+                self.evictions += 1
+                return True
+        return False
+
+    def clear(self):
+        """Destroys all unpinned programs"""
+        while self.evict():
+            pass
+
+    def close(self):
+        """Destroys all programs, pinned ones included; only once the device is done with them"""
+        self.pinned.clear()
+        self.clear()
+
+    def report(self):
+        total = self.hits + self.misses
+        print("Program cache: {} lookups, {} hits ({:.1f}%), {} compiled, {} evicted, {} resident ({} pinned)".format(
+            total, self.hits, 100.0 * self.hits / total if total else 0.0, self.misses, self.evictions,
+            len(self.programs), len(self.pinned)))
@@ -0,0 +1,347 @@
+'''
+Offline assembler and interpreter for VC Glitcher programs.
+
+assemble() checks a programs.Program the way vcg_as_check_program does
+(duplicate or undefined labels, missing end, register and signal operands)
+and raises the same VCGlitcherError codes. parse() turns assembler text into
+a Program:
+
+    start:
+        wait_signal TRIGGER, 1
+        loadi R0, 1200
+        waittime R0
+        set_signal GLITCH_EN, 1
+        end
+
+Machine executes an assembled program against a StubCard and counts cycles
+per instruction, so perturbation programs can be validated and timed, and
+their glitch offsets computed, without the device. The execution model is
+inferred from the SDK instruction set: four 32-bit registers, a compare flag
+read by branch0/branch1, jmpr/ret as call and return, and every instruction
+taking CYCLES[name] clock cycles (1 unless set otherwise). waittime adds the
+register value in cycles, and send/receive take byte_cycles from the card.
+Adjust CYCLES and cycle_time to measurements of the real device.
+'''
+import collections
+import re
+
+from vcglitcher import REG, WAIT, SET, GET, VCGlitcherError, check_error
+from programs import Program, INSTRUCTIONS, LABEL_OPERANDS
+
+# SDK status codes, see check_error()
+INVALID_REGISTER = 30
+INVALID_SHIFT = 31
+LABEL_USED = 32
+LABEL_UNDEFINED = 33
+END_MISSING = 34
+INVALID_IMMEDIATE = 35
+INVALID_WAIT_SIGNAL = 37
+INVALID_SET_SIGNAL = 38
+INVALID_GET_SIGNAL = 39
+PROGRAM_EMPTY = 41
+
+MASK = 0xFFFFFFFF
+CYCLE_TIME = 10e-9  # Assumed 100 MHz sequencer clock
+CYCLES = collections.defaultdict(lambda: 1)
+
+
+def _names(e):
+    return dict((k, v) for k, v in vars(e).items() if not k.startswith('_'))
+
+REGISTERS = _names(REG)
+WAIT_SIGNALS = _names(WAIT)
+SET_SIGNALS = _names(SET)
+GET_SIGNALS = _names(GET)
+SYMBOLS = {}
+for table in (REGISTERS, WAIT_SIGNALS, SET_SIGNALS, GET_SIGNALS):
+    SYMBOLS.update(table)
+
+# Operand kinds checked by assemble()
+REGISTER_OPERANDS = ('rd', 'rs', 'ra', 'rb', 'rj', 'rt')
+SIGNAL_OPERANDS = {
+    'wait_signal': WAIT_SIGNALS.values(),
+    'set_signal': SET_SIGNALS.values(),
+    'get_signal': GET_SIGNALS.values(),
+}
+SIGNAL_ERRORS = {'wait_signal': INVALID_WAIT_SIGNAL, 'set_signal': INVALID_SET_SIGNAL,
+                 'get_signal': INVALID_GET_SIGNAL}
+
+
+class Assembled(object):
+    """Label-free instruction list with resolved jump targets"""
+
+    def __init__(self, instructions, labels):
+        self.instructions = instructions  # (name, operands) with labels replaced by addresses
+        self.labels = labels              # label -> address
+
+    def __len__(self):
+        return len(self.instructions)
+
+
+def assemble(program):
+    """Checks a Program and resolves its labels; raises VCGlitcherError like vcg_as_check_program"""
+    labels = {}
+    body = []
+    for name, operands in program.instructions:
+        if name == 'add_label':
+            if operands[0] in labels:
+                check_error(LABEL_USED)
+            labels[operands[0]] = len(body)
+        else:
+            body.append((name, operands))
+    if not body:
+        check_error(PROGRAM_EMPTY)
+    if not any(name == 'end' for name, _ in body):
+        check_error(END_MISSING)
+
+    instructions = []
+    for name, operands in body:
+        for kind, value in zip(INSTRUCTIONS[name], operands):
+            if kind in REGISTER_OPERANDS and value not in REGISTERS.values():
+                check_error(INVALID_REGISTER)
+            if kind == 'shift' and not 0 <= value < 32:
+                check_error(INVALID_SHIFT)
+            if kind in ('data', 'address') and not 0 <= value <= MASK:
+                check_error(INVALID_IMMEDIATE)
+        if name in SIGNAL_OPERANDS and operands[INSTRUCTIONS[name].index('signal')] not in SIGNAL_OPERANDS[name]:
+            check_error(SIGNAL_ERRORS[name])
+        if name in LABEL_OPERANDS:
+            if operands[0] not in labels:
+                check_error(LABEL_UNDEFINED)
+            operands = (labels[operands[0]],)
+        instructions.append((name, operands))
+    return Assembled(instructions, labels)
+
+
+LINE = re.compile(r'^\s*(?:(\w+):)?\s*(?:(\w+)\s*(.*?))?\s*$')
+
+
+def parse(text):
+    """Parses assembler text (one instruction per line, "label:" prefixes, ';' comments) into a Program"""
+    program = Program()
+    for number, line in enumerate(text.splitlines(), 1):
+        match = LINE.match(line.split(';')[0])
+        if match is None:
+            raise ValueError("line {}: cannot parse {!r}".format(number, line))
+        label, name, args = match.groups()
+        if label:
+            program.add_label(label)
+        if not name:
+            continue
+        if name not in INSTRUCTIONS or name == 'add_label':
+            raise ValueError("line {}: unknown instruction {}".format(number, name))
+        operands = []
+        for arg in [a.strip() for a in args.split(',')] if args else []:
+            if name in LABEL_OPERANDS:
+                operands.append(arg)
+            elif arg in SYMBOLS:
+                operands.append(SYMBOLS[arg])
+            else:
+                operands.append(int(arg, 0))
+        program.add(name, *operands)
+    return program
+
+
+class StubCard(object):
+    """
+    Scripted environment of a program: the trigger input, the other input
+    signals and the smart card byte stream.
+    """
+
+    def __init__(self, trigger_cycle=0, responses=(), signals=None, byte_cycles=0):
+        self.trigger_cycle = trigger_cycle      # Cycle at which TRIGGER_IN rises, None for never
+        self.responses = list(responses)        # Bytes returned by recvr
+        self.signals = dict(signals or {})      # Constant values of other input signals
+        self.byte_cycles = byte_cycles          # Cycles to send or receive one byte
+        self.sent = []
+
+    def signal(self, signal, cycle):
+        if signal in (WAIT.TRIGGER, GET.TRIGGER_IN):
+            return int(self.trigger_cycle is not None and cycle >= self.trigger_cycle)
+        if signal == GET.TX_FIFO_EMPTY:
+            return self.signals.get(signal, 1)
+        return self.signals.get(signal, 0)
+
+    def wait(self, signal, value, cycle):
+        """Cycle at which signal reaches value, None if it never does"""
+        if self.signal(signal, cycle) == value:
+            return cycle
+        if signal == WAIT.TRIGGER and value == 1 and self.trigger_cycle is not None:
+            return self.trigger_cycle
+        return None
+
+    def receive(self):
+        return self.responses.pop(0) if self.responses else None
+
+    def send(self, value):
+        self.sent.append(value & 0xFF)
+
+
+class Trace(object):
+    """Result of one Machine run"""
+
+    def __init__(self, assembled, cycle_time):
+        self.assembled = assembled
+        self.cycle_time = cycle_time
+        self.cycles = 0
+        self.counts = [0] * len(assembled)   # Executions per address
+        self.spent = [0] * len(assembled)    # Cycles per address, including waits
+        self.events = []                     # (cycle, signal, value) of set_signal
+        self.halted = False
+
+    def time(self, cycles=None):
+        return (self.cycles if cycles is None else cycles) * self.cycle_time
+
+    def glitch_offsets(self, trigger_cycle=0):
+        """Seconds from the trigger to every rising GLITCH_EN"""
+        return [(c - trigger_cycle) * self.cycle_time for c, s, v in self.events if s == SET.GLITCH_EN and v]
+
+    def report(self):
+        names = dict((v, k) for k, v in self.assembled.labels.items())
+        for address, (name, operands) in enumerate(self.assembled.instructions):
+            print("{:>10} {:4} {:<12} {:<18} {:>8} {:>10}".format(
+                names.get(address, ''), address, name, ", ".join(str(o) for o in operands),
+                self.counts[address], self.spent[address]))
+        print("{} cycles ({:.3f} us){}".format(self.cycles, self.time() * 1e6, "" if self.halted else ", not halted"))
+
+
+class Machine(object):
+    """Interpreter for assembled VC Glitcher programs"""
+
+    def __init__(self, program, card=None, cycle_time=CYCLE_TIME, cycles=None, max_cycles=10 ** 9):
+        self.assembled = program if isinstance(program, Assembled) else assemble(program)
+        self.card = card if card is not None else StubCard()
+        self.cycle_time = cycle_time
+        self.costs = cycles if cycles is not None else CYCLES
+        self.max_cycles = max_cycles
+
+    def run(self):
+        """Executes until end; returns a Trace"""
+        trace = Trace(self.assembled, self.cycle_time)
+        card = self.card
+        reg = [0] * len(REGISTERS)
+        memory = collections.defaultdict(int)
+        flag = 0
+        stack = []
+        saved = None
+        counter_start = 0
+        outputs = {}
+        cycle = 0
+        pc = 0
+        code = self.assembled.instructions
+        while True:
+            if cycle > self.max_cycles:
+                raise VCGlitcherError("Program did not halt within {} cycles".format(self.max_cycles))
+            if not 0 <= pc < len(code):
+                raise VCGlitcherError("Program ran off the end at address {}".format(pc))
+            name, ops = code[pc]
+            start = cycle
+            cycle += self.costs[name]
+            next_pc = pc + 1
+
+            if name == 'end':
+                trace.halted = True
+            elif name == 'loadi':
+                reg[ops[0]] = ops[1] & MASK
+            elif name == 'loadm':
+                reg[ops[0]] = memory[ops[1]]
+            elif name == 'storem':
+                memory[ops[0]] = reg[ops[1]]
+            elif name == 'loadr':
+                reg[ops[0]] = memory[reg[ops[1]]]
+            elif name == 'storer':
+                memory[reg[ops[0]]] = reg[ops[1]]
+            elif name == 'loadf':
+                reg[ops[0]] = flag
+            elif name == 'addi':
+                reg[ops[0]] = (reg[ops[0]] + ops[1]) & MASK
+            elif name == 'subi':
+                reg[ops[0]] = (reg[ops[0]] - ops[1]) & MASK
+            elif name == 'shiftl':
+                reg[ops[0]] = (reg[ops[0]] << ops[1]) & MASK
+            elif name == 'shiftr':
+                reg[ops[0]] = reg[ops[0]] >> ops[1]
+            elif name == 'addr':
+                reg[ops[0]] = (reg[ops[1]] + reg[ops[2]]) & MASK
+            elif name == 'subr':
+                reg[ops[0]] = (reg[ops[1]] - reg[ops[2]]) & MASK
+            elif name == 'notr':
+                reg[ops[0]] = ~reg[ops[1]] & MASK
+            elif name == 'xorr':
+                reg[ops[0]] = reg[ops[1]] ^ reg[ops[2]]
+            elif name == 'andr':
+                reg[ops[0]] = reg[ops[1]] & reg[ops[2]]
+            elif name == 'orr':
+                reg[ops[0]] = reg[ops[1]] | reg[ops[2]]
+            elif name == 'cmpeq':
+                flag = int(reg[ops[0]] == reg[ops[1]])
+            elif name == 'cmpgt':
+                flag = int(reg[ops[0]] > reg[ops[1]])
+            elif name == 'cmplt':
+                flag = int(reg[ops[0]] < reg[ops[1]])
+            elif name == 'cmpgte':
+                flag = int(reg[ops[0]] >= reg[ops[1]])
+            elif name == 'cmplte':
+                flag = int(reg[ops[0]] <= reg[ops[1]])
+            elif name == 'cmpz':
+                flag = int(reg[ops[0]] == 0)
+            elif name == 'jmp':
+                next_pc = ops[0]
+            elif name == 'branch0':
+                if not flag:
+                    next_pc = ops[0]
+            elif name == 'branch1':
+                if flag:
+                    next_pc = ops[0]
+            elif name == 'jmpr':
+                stack.append(next_pc)
+                next_pc = reg[ops[0]]
+            elif name == 'ret':
+                if not stack:
+                    raise VCGlitcherError("ret without jmpr at address {}".format(pc))
+                next_pc = stack.pop()
+            elif name == 'waittime':
+                cycle += reg[ops[0]]
+            elif name == 'wait_signal':
+                until = card.wait(ops[0], ops[1], cycle)
+                if until is None:
+                    raise VCGlitcherError("Signal {} never reaches {} (address {})".format(ops[0], ops[1], pc))
+                cycle = max(cycle, until)
+            elif name == 'counter_rst':
+                counter_start = cycle
+            elif name == 'counter_move':
+                reg[ops[0]] = (cycle - counter_start) & MASK
+            elif name == 'backup':
+                saved = (list(reg), flag)
+            elif name == 'restore':
+                if saved is not None:
+                    reg, flag = list(saved[0]), saved[1]
+            elif name == 'set_signal':
+                if outputs.get(ops[0]) != ops[1]:
+                    trace.events.append((start, ops[0], ops[1]))
+                outputs[ops[0]] = ops[1]
+            elif name == 'get_signal':
+                reg[ops[0]] = card.signal(ops[1], cycle)
+            elif name == 'recvr':
+                value = card.receive()
+                if value is None:
+                    raise VCGlitcherError("Card sent no byte for recvr at address {}".format(pc))
+                reg[ops[0]] = value & 0xFF
+                cycle += card.byte_cycles
+            elif name in ('sendi', 'sendr'):
+                card.send(ops[0] if name == 'sendi' else reg[ops[0]])
+                cycle += card.byte_cycles
+            # nop, sendq, sync, txconfig and rxconfig only take time here
+
+            trace.counts[pc] += 1
+            trace.spent[pc] += cycle - start
+            if trace.halted:
+                break
+            pc = next_pc
+        trace.cycles = cycle
+        return trace
+
+
+def estimate(program, trigger_cycle=0, **kwargs):
+    """Runs a program against a StubCard triggering at trigger_cycle; returns the Trace"""
+    return Machine(program, StubCard(trigger_cycle=trigger_cycle), **kwargs).run()
@@ -3,24 +3,17 @@ import time
 import sys
 import struct
 import subprocess
+import os
+from uart import read_uint, DutConnection
+from aes128 import PINATA_KEY, START_AES_PLAINTEXT, encrypt
 # import secrets
 import logging
  
 def read32bitData(ser):
-    data = 0
-    for i in range(4):
-        tmp = ser.read()
-        data = data + (int.from_bytes(tmp , byteorder=sys.byteorder) << (i * 8))
-        time.sleep(0.2)
-    return data
+    return read_uint(ser, 4)
  
 def read64bitData(ser):
-    data = 0
-    for i in range(8):
-        tmp = ser.read()
-        data = data + (int.from_bytes(tmp , byteorder=sys.byteorder) << (i * 8))
-        time.sleep(0.2)
-    return data
+    return read_uint(ser, 8)
  
 def uart_write_byte(ser, val):
     # length = 8
@@ -30,52 +23,23 @@ def uart_write_byte(ser, val):
     # ser.write
     # ser.write(val.to_bytes(1, byteorder='big'))
  
+AES_PLAINTEXT = list(bytearray(START_AES_PLAINTEXT))
+AES_REFERENCE = encrypt(PINATA_KEY, bytearray(AES_PLAINTEXT))  # Expected unfaulted response
+
 def start_aes():
- 
-    com_port = serial.Serial(
-        port='COM4',
-        baudrate=115200,
-        bytesize=serial.EIGHTBITS,
-        parity=serial.PARITY_NONE,
-        stopbits=serial.STOPBITS_ONE,
-        timeout = 5
-    )
-   
-    com_port.close()
-    cmd = [0x20]
-    com_port.open()
- 
-    #com_port.write(bytes((bytearray(cmd))))
-    #time.sleep(0.2)
-    #tmp =  list(com_port.read(8))
-    # tmp =  list(bytearray(com_port.read(8)))
-    #print(tmp)
- 
-    # ## Encryption
-    # time.sleep(2)
-    for i in range(1):
-        cmd = [0xAE, 0x7B, 0xE9, 0x59, 0x01, 0xBD, 0x9F, 0x48, 0x31, 0x7B, 0xE9, 0x59, 0x01, 0xBD, 0x9F, 0x48, 0x31]
-        com_port.write(bytes((bytearray(cmd))))
-        time.sleep(0.2)
-     
-        if com_port.in_waiting >= 16:
-            tmp = list(com_port.read(16))
-            logging.info(" AES encryption successful")
-            logging.info(tmp)
-        else:
-            logging.info("board no response.")
-            
-        #tmp =  list(com_port.read(16))
-        #print(tmp)
- 
-    #cmd = [0x1D]
-    #com_port.write(bytes((bytearray(cmd))))
-    #time.sleep(0.2)
-    #tmp =  list(com_port.read(8))
-    #print(tmp)
- 
-    com_port.close()
-    return True
+    # The DUT port stays open between shots; stale input is flushed and the
+    # 16-byte response is awaited with a deadline instead of a fixed sleep.
+    cmd = [0xAE] + AES_PLAINTEXT
+    with tracer.span('start_aes'):
+        tmp = dut.transact(cmd, 16)
+
+    if len(tmp) >= 16:
+        pipeline.submit(logging.info, " AES encryption successful")
+        pipeline.submit(logging.info, list(tmp))
+    else:
+        pipeline.submit(logging.info, "board no response.")
+
+    return tmp
 
 '''
 This script provides an example of how to make use of Embedded Glitcher through VC Glitcher SDK API calls
@@ -84,6 +48,18 @@ A sequence of random glitches will be generated to the 'digital glitch' port of
 Riscure BV, 2012
 '''
 from vcglitcher import *
+from session import GlitcherSession
+from results import ResultWriter, OUTCOME_NAMES, classify
+from sweep import AdaptiveSweep, EarlyStop
+from space import ParameterSpace, Coverage, DEFAULT_AXES
+from batching import BatchTester
+from power import PowerCycler
+from checkpoint import Checkpoint, completed_counts
+from rigs import RigScheduler, parse_rigs
+from pipeline import ShotPipeline
+from telemetry import CampaignMetrics, MetricsServer
+from aggregate import OutcomeIndex
+from tracing import Tracer
 
 import random
 import numpy as np
@@ -91,157 +67,303 @@ import logging
 import serial
 import time
 
-SERIAL_PORT = "COM4"
+SERIAL_PORT = os.environ.get("DUT_PORT", "COM4")
+# GLITCH_SIM=1 runs the campaign against vcgsim and the emulated AES target
+# (emulator.py) instead of the VC Glitcher, the board and the relay
+SIMULATE = os.environ.get("GLITCH_SIM") == "1"
+if SIMULATE:
+    from emulator import AesTarget
+    from vcgsim import VCGlitcherSim
+    target = AesTarget()
+    target.start()
+    SERIAL_PORT = target.port
 BAUDRATE = 115200
+CHECKPOINT_PATH = os.environ.get("GLITCH_CHECKPOINT", "glitch_checkpoint.json")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9108"))  # 0 disables the endpoint
 
+# Spans of the last 64k shot phases, written to glitch_trace<start>.json at the end
+tracer = Tracer()
+session = GlitcherSession(dll=VCGlitcherSim(target=target) if SIMULATE else None, tracer=tracer)
+dut = DutConnection(SERIAL_PORT, BAUDRATE)
+results = None  # ResultWriter, opened in __main__
+early_stop = EarlyStop(max_shots=50, min_shots=10, precision=0.1)
+completed = {}  # voltage -> outcome counts already in the result file when resuming
+index = OutcomeIndex()  # Outcome counts per (voltage, delay, duration), see aggregate.py
+index_path = None  # Saved after every voltage when set
+# 2 s settling gap between shots (none in simulation); the next shot is armed
+# and earlier results are logged and stored inside it
+pipeline = ShotPipeline(settle=0.0 if SIMULATE else 2.0)
+# Live counters for the metrics endpoint, e.g. curl http://127.0.0.1:9108/metrics
+metrics = CampaignMetrics()
+metrics.gauge('glitch_pipeline_backlog', 'Log and result jobs waiting for the background thread',
+              func=pipeline.queue.qsize)
 
-def dig_glitch(glitch_voltage_p):
+def phase(name, start, end):
+    # One phase of a shot, for the metrics endpoint and the trace
+    metrics.phase[name].record(end - start)
+    tracer.record(name, start, end)
+
+def dig_glitch(glitch_voltage_p, delay=100, duration=100, v_vcc=None, v_clk=None, pattern=None):
     """
     Configures the VC Glitcher and triggers a digital glitch sequence.
     """
-    
-    vcg = VCGlitcher()
-
-    # Print SDK snapshot version
-    print vcg.sdk_is_snapshot_version()
-    print "SDK Snapshot Version: {}".format(vcg.sdk_is_snapshot_version())
-    # List devices and get information about the first device
-    vcg.device_list()
-    vcg.device_get_info(0)
-    
-    # Open the device
-    vcg.open()
-    print "Device opened successfully."
-    # Opening VC Glitcher device
-    print "Device opened successfully."
-    #print "Device opened successfully."
-
-    # Set glitch mode to Embedded VCC
-    l = vcg.set_mode(GLITCH_MODE.EMBEDDED_VCC)
-    print(l)
-    #for glitch_voltage in np.arange(-7.4, 4.3, 0.5):
-    #    print "Testing glitch voltage: {:.2f}".format(glitch_voltage)
-    #    time.sleep(0.2)
+    # Device list/open/mode/trigger setup is done once by the session;
+    # a shot only reprograms the voltage and pattern and re-arms.
     glitch_voltage = glitch_voltage_p
-    vcg.set_vcc_glitch_parameter(4.0,4.0,glitch_voltage) 
-    vcg.pattern_enable()
-    print "Glitcher availability: {}".format(vcg.evcg_is_available())
-    print "Glitcher version: {}".format(vcg.get_version())
-    print "Glitcher availability: {}".format(vcg.evcg_is_available())
-
-    # Clear any previous patterns
-
-    # Add a glitch pattern (delay=400ns, duration=400ns)
-    oi = vcg.evcg_get_guaranteed_pattern_number()
-    print(oi)
-    #for i in range(1,4):
-    print("Clearing existing patterns...")
-    vcg.evcg_clear_pattern()  # This should free up space
-    print("Patterns cleared. Now adding a new pattern.")
-
-    vcg.evcg_add_pattern(100, 100)
-    #vcg.evcg_add_pattern(100, 300)
-    #vcg.evcg_add_pattern(400,350)
-    #vcg.evcg_add_pattern(400,300)
-    #print(vcg.evcg_set_pattern())
-    # Configure smartcard reset and glitch trigger
-    #vcg.smartcard_reset_config(RST_SRC.EVCG, EVCG_RST_POLARITY.ACTIVE_LOW)  # Use reset generated by Embedded Glitcher
-    vi = vcg.evcg_trigger_config(EVCG_TRIGGER_SRC.TRIGGER_IN, EVCG_TRIGGER_EDGE.RISING)  # Trigger by software
-    print(vi)
-
-    # Commit the glitch sequence and arm the glitcher
-    vcg.evcg_set_pattern()
-    #vcg.evcg_set_arm(True)  # Arm Embedded Glitcher for any trigger
-     # Clear any bad patterns
-    vcg.evcg_set_arm(True)  # Re-arm glitcher
+    metrics.voltage.value = glitch_voltage_p
+    t0 = shot_start = time.time()
+    if pattern is not None:
+        vcg = session.arm_pattern(glitch_voltage, pattern, v_vcc, v_clk)  # Batched sequence
+    else:
+        vcg = session.arm(glitch_voltage, delay, duration, v_vcc, v_clk)
+    t1 = time.time()
+    phase('arm', t0, t1)
+
+    pipeline.wait_settled()
+    t0 = time.time()
+    phase('settle', t1, t0)
 
     # Start the glitching process
     u = vcg.evcg_soft_start()
-    start_aes() 
-    print "Soft start result: {}".format(u)
-    print "Glitch triggered."  # Generate software trigger; glitches should be seen on the 'digital glitch' port
-    logging.info("Soft start result: {} | Glitch voltage: {:.2f}V".format(u, glitch_voltage_p))
-
-    # Wait for the glitch sequence to complete
-    start_wait_time = time.time()
-    while vcg.evcg_busy():
-        if time.time() - start_wait_time > 5:  # If stuck for 5 seconds
-            print("Board unresponsive! Resetting...")
-            reset_pinata()  # Call reset function
-            break
-    vcg.evcg_set_arm(False)  # Disarm Embedded Glitcher
-    vcg.close()  # Close the device
-    return
-    print "Glitcher device closed successfully."                                                         # Closing VC Glitcher device
-    logging.info("Glitch execution completed successfully. Duration: {:.2f}s".format(time.time() - start_time))
+    start_glitch_time = time.time()
+    tracer.record('soft_start', t0, start_glitch_time)
+    response = start_aes()
+    t1 = time.time()
+    phase('dut', t0, t1)
+    pipeline.submit(logging.info, "Soft start result: {} | Glitch voltage: {:.2f}V".format(u, glitch_voltage_p))
 
-RELAY_PORT = "COM7"  
+    # Wait for the glitch sequence to complete; the timeout follows the
+    # observed completion latencies (5 s until there is enough data). They are
+    # timed from the end of the DUT exchange so the UART round trip is not in them.
+    # A sequence that never completes or a board that stopped answering stays
+    # that way until the power is cycled, the same check as RigShooter.shoot
+    reset = not session.wait(t1) or (len(response) < 16 and not dut_alive())
+    if reset:
+        print("Board unresponsive! Resetting...")
+        reset_pinata()  # Call reset function
+    t0 = time.time()
+    phase('wait', t1, t0)
+    session.disarm()  # Disarm Embedded Glitcher, keep the device open
+    pipeline.shot_done()
+    t1 = time.time()
+    phase('disarm', t0, t1)
+    tracer.record('dig_glitch', shot_start, t1)
+    outcome = classify(response, reset, AES_REFERENCE)
+    metrics.shot(outcome)
+    if results is not None and pattern is None:  # batch_glitch records per candidate
+        # Written and fsynced here, not on the pipeline: the shot has ended, so
+        # this already runs inside the settling gap, and nothing is lost in a queue
+        results.write(glitch_voltage_p, delay, duration, outcome, response)
+        pipeline.submit(index.add, glitch_voltage_p, delay, duration, outcome)
+    return outcome
 
-def toggle_relay_off():
-    ser = serial.Serial(RELAY_PORT, 9600, timeout=1)
+RELAY_PORT = target.relay_port if SIMULATE else os.environ.get("RELAY_PORT", "COM7")
+
+def dut_alive():
+    # Liveness probe: the board is back once it answers an encryption
+    return len(dut.transact([0xAE] + AES_PLAINTEXT, 16, timeout=0.05)) >= 16
+
+# The relay port stays open; after switching on, the board is polled until it
+# answers instead of assuming a fixed boot time
+power = PowerCycler(RELAY_PORT, 9600, min_off_time=1.0, probe=dut_alive, boot_timeout=10.0)
 
-    command1 = "A0 01 01 A2"
-    command_bytes1 = bytearray.fromhex(command1)
-    ser.write(command_bytes1)
-    ser.close()
+def toggle_relay_off():
+    power.off()
 
 def toggle_relay_on():
-    ser = serial.Serial(RELAY_PORT, 9600, timeout=1)
+    power.on()
 
-    command2 = "A0 01 00 A1"
-    command_bytes2 = bytearray.fromhex(command2)
-    ser.write(command_bytes2)
-    ser.close()
-     
 
 def reset_pinata():
-    print("Powering off...")
-    toggle_relay_off()  
-    time.sleep(1)      
-    
-    print("powering on....")
-    toggle_relay_on()
-    time.sleep(0)
-
-    print("Reset complete!")
+    print("Power cycling...")
+    metrics.resets.value += 1
+    with tracer.span('reset_pinata'):
+        recovered = power.reset()
+    if recovered:
+        print("Reset complete! Board answered after {:.3f}s".format(power.last_recovery()))
+        pipeline.submit(logging.info, "Reset | recovery {:.3f}s".format(power.last_recovery()))
+    else:
+        print("Board did not answer within {}s after reset!".format(power.boot_timeout))
+        pipeline.submit(logging.info, "Reset | no recovery")
 #reset_pinata()
 
 
+def measure_voltage(glitch_voltage_p):
+    """Fires shots at one glitch voltage until early_stop is satisfied and returns the outcome counts"""
+    # Shots recorded before an interruption count towards this point
+    counts = list(completed.pop(glitch_voltage_p, [0] * len(OUTCOME_NAMES)))
+    for i in range(sum(counts), early_stop.max_shots):
+        if early_stop.done(counts):
+            break
+        metrics.iteration.value = i
+        pipeline.submit(logging.info, "Iteration {} | Glitch Voltage: {:.3f}V".format(i, glitch_voltage_p))
+        counts[dig_glitch(glitch_voltage_p)] += 1
+    early_stop.record(counts)
+    if index_path is not None:
+        pipeline.submit(index.save, index_path)
+    elapsed_time = time.time() - start_time
+    pipeline.submit(logging.info, "Overnight testing completed. Total execution time: {:.2f} seconds".format(elapsed_time))
+    print("Execution Time: {:.2f} seconds".format(elapsed_time))
+    return counts
+
+def explore_space(n_samples, axes=DEFAULT_AXES, checkpoint=None):
+    """Fires one shot per quasi-random sample of voltage x delay x duration (x VCC x clock)"""
+    space = ParameterSpace(axes)
+    coverage = Coverage(space)
+    state = checkpoint.state.get('explore') if checkpoint is not None else None
+    if state is None:
+        state = {'space': space.get_state(), 'done': 0}
+    else:
+        # Regenerate the samples fired before the interruption and skip them
+        space.set_state(state['space'])
+        coverage.add(space.halton(state['done']))
+    for point in space.halton(n_samples - state['done']):
+        pipeline.submit(logging.info, "Sample {}".format(point))
+        dig_glitch(point['glitch_voltage'], point.get('delay', 100), point.get('duration', 100),
+                   point.get('v_vcc'), point.get('v_clk'))
+        coverage.add([point])
+        state['done'] += 1
+        if checkpoint is not None:
+            # Saved right after the sample's record, so it is never ahead of the result file
+            checkpoint.update(explore=dict(state))
+    coverage.report()
+    return coverage
+
+def explore_rigs(rigs, n_samples, axes=DEFAULT_AXES):
+    """
+    Spreads quasi-random samples over several rigs, e.g.
+    parse_rigs(os.environ["RIGS"]) with RIGS="0:COM4:COM7,1:COM5:COM8".
+    Each rig runs in its own process; records go to the common result file.
+    """
+    space = ParameterSpace(axes)
+    points = space.halton(n_samples)
+    scheduler = RigScheduler(rigs, AES_PLAINTEXT, AES_REFERENCE)
+    outcomes = scheduler.run(points, results)
+    coverage = Coverage(space)
+    coverage.add([p for p, o in zip(points, outcomes) if o is not None])
+    coverage.report()
+    scheduler.report()
+    return outcomes
+
+# (delay, duration) grid tested by --batch
+BATCH_CANDIDATES = [(delay, duration) for delay in range(0, 1000, 20) for duration in (20, 50, 100)]
+
+def batch_glitch(glitch_voltage_p, candidates):
+    """Tests (delay, duration) candidates at one voltage, many per arm/trigger round"""
+    tester = BatchTester(lambda pattern: dig_glitch(glitch_voltage_p, pattern=pattern), session.pattern_capacity())
+    outcomes = tester.run(candidates)
+    if results is not None:
+        for (delay, duration), outcome in sorted(outcomes.items()):
+            results.write(glitch_voltage_p, delay, duration, outcome)
+            pipeline.submit(index.add, glitch_voltage_p, delay, duration, outcome)
+    tester.report()
+    return outcomes
+
+
+def option(name, default=None):
+    # Value following name on the command line, e.g. --explore 2000
+    if name in sys.argv[1:-1]:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+def campaign_mode():
+    """
+    Campaign mode from the command line:
+        (default)                  adaptive voltage sweep at delay = duration = 100
+        --explore N                N quasi-random voltage x delay x duration samples
+        --explore N --rigs SPEC    the same samples spread over several rigs, see explore_rigs
+        --batch V                  BATCH_CANDIDATES at V volts, batched per arm cycle
+    """
+    if option("--rigs") is not None:
+        return {'name': 'rigs', 'rigs': option("--rigs"), 'samples': int(option("--explore", 1000))}
+    if option("--explore") is not None:
+        return {'name': 'explore', 'samples': int(option("--explore"))}
+    if option("--batch") is not None:
+        return {'name': 'batch', 'voltage': float(option("--batch"))}
+    return {'name': 'sweep'}
 
 
 if __name__ == "__main__":
-    # Run the reset sequence
-    reset_pinata()
-        #trigger_generated = start_aes()
-    start_time = time.time()  # Store start time
+    #trigger_generated = start_aes()
+    # "--resume" continues an interrupted campaign from its checkpoint: same
+    # mode, log and result files. Shots already recorded are not fired again
+    # by the sweep and --explore; --rigs and --batch start over.
+    checkpoint = Checkpoint(CHECKPOINT_PATH)
+    resume = "--resume" in sys.argv and checkpoint.exists() and not checkpoint.load().get('completed')
+    if resume:
+        start_time = checkpoint.state['start_time']
+    else:
+        start_time = time.time()  # Store start time
+        # Coarse 0.1 V steps over the whole range, refined automatically down to
+        # 0.01 V wherever the fault or reset rate changes between neighbours
+        checkpoint.state = {
+            'start_time': start_time,
+            'log': "glitch_log" + str(start_time) + ".txt",
+            'results': "glitch_results" + str(start_time) + ".bin",
+            'index': "glitch_index" + str(start_time) + ".bin",
+            'sweep': {'start': -7.4, 'stop': 4.2, 'coarse_step': 0.1, 'min_step': 0.01},
+            'mode': campaign_mode(),
+            'completed': False,
+        }
+        checkpoint.save()
             #logging.info("Starting overnight glitch testing...")
     print("Start Time:",start_time)
             #print("Start Time:", time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time)))
-    log_filename = "glitch_log" + str(start_time) + ".txt"
+    log_filename = checkpoint.state['log']
+    # Checkpoints written before the index was added have no 'index' entry
+    index_path = checkpoint.state.setdefault('index', "glitch_index" + str(start_time) + ".bin")
     logging.basicConfig(filename=log_filename, level=logging.INFO, format="%(asctime)s - %(message)s")
+    results = ResultWriter(checkpoint.state['results'], AES_REFERENCE, durable=True)
+    if resume:
+        completed = completed_counts(checkpoint.state['results'], delay=100, duration=100)
+        if os.path.exists(index_path):
+            index = OutcomeIndex.load(index_path)
+            index.catch_up(checkpoint.state['results'])  # Shots after the last save
+        elif os.path.exists(checkpoint.state['results']):
+            index = OutcomeIndex.from_results(checkpoint.state['results'])  # Never saved, rebuilt from the shots
+        print("Resuming campaign of {} with {} voltages already measured".format(start_time, len(completed)))
+        logging.info("Resumed | {} voltages already measured".format(len(completed)))
             #duration =  10  
             #glitch_voltage_list = list(np.arange(-7.4, 4.3, 0.1))
+    mode = checkpoint.state.get('mode', {'name': 'sweep'})
+    if mode['name'] != 'rigs':  # Rig workers own their boards and relays
+        reset_pinata()
+    pipeline.start()
+    server = None
+    if METRICS_PORT:
+        server = MetricsServer(metrics, METRICS_PORT)
+        server.start()
+        print("Metrics at {}".format(server.url()))
     
-    left_sweep = np.arange(-7.4, -5.11, 0.1)
-    fine_grained_interval = np.arange(-5.10, -4.89, 0.01)
-    right_sweep = np.arange(-4.89, 4.21, 0.1)
-
-    glitch_voltage_list = np.concatenate((left_sweep, fine_grained_interval, right_sweep))
-    glitch_voltage_list = np.round(glitch_voltage_list, 3) 
-            #log this print statement
-            #while time.time() - start_time < duration: 
-    for glitch_voltage_p in glitch_voltage_list:
-        for i in range(50):
-                    #if trigger_generated:
-            print("###",i,glitch_voltage_p)
-            print "Trigger detected (HIGH). Running digital glitch..."
-            logging.info("Iteration {} | Glitch Voltage: {:.2f}V".format(i, glitch_voltage_p))
-            time.sleep(2)
-            dig_glitch(glitch_voltage_p)
-                    # else:
-                        #print "No trigger detected. Skipping glitch."
-        end_time = time.time()
-        elapsed_time = end_time - start_time
-        logging.info("Overnight testing completed. Total execution time: {:.2f} seconds".format(elapsed_time))
-        print("Execution Time: {:.2f} seconds".format(elapsed_time))
-   
+    # The sweep is deterministic given the outcome counts, so on resume it
+    # replays its refinement decisions from the recorded shots
+    sweep = AdaptiveSweep(**checkpoint.state['sweep'])
+    try:
+        if mode['name'] == 'explore':
+            explore_space(mode['samples'], checkpoint=checkpoint)
+        elif mode['name'] == 'rigs':
+            explore_rigs(parse_rigs(mode['rigs']), mode['samples'])
+        elif mode['name'] == 'batch':
+            batch_glitch(mode['voltage'], BATCH_CANDIDATES)
+        else:
+            sweep.run(measure_voltage)
+            sweep.report()
+            early_stop.report()
+    finally:
+        # Runs the queued log lines and index updates, also after Ctrl-C
+        pipeline.close()
+
+    pipeline.report()
+    tracer.report()
+    tracer.export_chrome("glitch_trace" + str(start_time) + ".json")
+    if server is not None:
+        server.close()
+    session.report()
+    power.report()
+    session.close()
+    power.close()
+    dut.close()
+    results.close()
+    index.catch_up(checkpoint.state['results'])  # Records written without index.add, e.g. by explore_rigs
+    index.save(index_path)
+    checkpoint.update(completed=True)
@@ -0,0 +1,134 @@
+'''
+Append-only binary store for glitch campaign results.
+
+Every shot is one fixed-size little-endian record:
+
+    timestamp   float64   time.time() when the shot was recorded
+    voltage     float32   glitch voltage
+    delay       uint32    glitch pattern delay
+    duration    uint32    glitch pattern duration
+    outcome     uint8     OUTCOME code
+    ciphertext  16 bytes  DUT response, zero-filled when there was none
+
+after a 16-byte file header. load_results() maps a file as a NumPy structured
+array without parsing anything.
+'''
+import os
+import struct
+import time
+
+import numpy as np
+
+from vcglitcher import enum
+
+OUTCOME = enum(NORMAL=0, FAULT=1, MUTE=2, RESET=3)
+OUTCOME_NAMES = ('normal', 'fault', 'mute', 'reset')
+
+MAGIC = b'EMFIRES1'
+HEADER = struct.Struct('<8sII')  # magic, record size, reserved
+RECORD = struct.Struct('<dfIIB16s')
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('voltage', '<f4'),
+    ('delay', '<u4'),
+    ('duration', '<u4'),
+    ('outcome', 'u1'),
+    ('ciphertext', 'u1', (16,)),
+])
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+NO_RESPONSE = b'\x00' * 16
+
+
+def classify(response, reset=False, reference=None):
+    """Outcome code of a shot from the DUT response and whether it needed a reset"""
+    if reset:
+        return OUTCOME.RESET
+    if response is None or len(response) < 16:
+        return OUTCOME.MUTE
+    if reference is not None and bytes(bytearray(response[:16])) != bytes(bytearray(reference)):
+        return OUTCOME.FAULT
+    return OUTCOME.NORMAL
+
+
+class ResultWriter(object):
+    """Appends shot records to a result file"""
+
+    def __init__(self, path, reference=None, durable=False):
+        self.path = path
+        self.reference = bytes(bytearray(reference)) if reference is not None else None
+        self.durable = durable  # Flush and fsync every record, a crash loses at most the shot in flight
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new:
+            _check_header(path)
+            _truncate_torn(path)
+        self.file = open(path, 'ab')
+        if new:
+            self.file.write(HEADER.pack(MAGIC, RECORD.size, 0))
+            self.sync()
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def write(self, voltage, delay, duration, outcome, ciphertext=None):
+        if ciphertext is None or len(ciphertext) < 16:
+            ciphertext = NO_RESPONSE
+        self.file.write(RECORD.pack(time.time(), voltage, delay, duration, outcome,
+                                    bytes(bytearray(ciphertext[:16]))))
+        self.count += 1
+        if self.durable:
+            self.sync()
+
+    def record_shot(self, voltage, delay, duration, response, reset=False):
+        """Classifies and appends one shot, returns its outcome code"""
+        outcome = classify(response, reset, self.reference)
+        self.write(voltage, delay, duration, outcome, response)
+        return outcome
+
+    def flush(self):
+        self.file.flush()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def _check_header(path):
+    with open(path, 'rb') as f:
+        magic, record_size, _ = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or record_size != RECORD.size:
+        raise ValueError("{} is not a result file of this format".format(path))
+
+
+def _truncate_torn(path):
+    """Cuts off a partially written last record so appends stay aligned"""
+    size = os.path.getsize(path)
+    whole = HEADER.size + (size - HEADER.size) // RECORD.size * RECORD.size
+    if whole != size:
+        with open(path, 'r+b') as f:
+            f.truncate(whole)
+
+
+def load_results(path):
+    """Memory-maps a result file as a read-only structured array"""
+    _check_header(path)
+    n = (os.path.getsize(path) - HEADER.size) // RECORD.size  # Ignore a torn last record
+    if n == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER.size, shape=(n,))
+
+
+def outcome_counts(records):
+    """Returns (voltages, counts) with counts[i, outcome] shots per voltage"""
+    voltages, inverse = np.unique(np.round(records['voltage'], 3), return_inverse=True)
+    k = len(OUTCOME_NAMES)
+    counts = np.bincount(inverse * k + records['outcome'], minlength=len(voltages) * k)
+    return voltages, counts.reshape(len(voltages), k)
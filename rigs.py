@@ -0,0 +1,330 @@
+'''
+Multi-rig campaign scheduler.
+
+A rig is one VC Glitcher (SDK device index) with its own DUT port and relay
+port. RigScheduler starts one worker process per rig and hands the parameter
+points out in small chunks: a worker asks for the next chunk whenever it is
+idle, so fast rigs cover more of the space than slow ones. A chunk that is not
+finished within its lease, or whose rig fails or dies, goes back to the queue
+and is handed to another rig. Workers send their shot records back and the
+scheduler writes them all to one result file.
+
+    rigs = parse_rigs("0:COM4:COM7,1:COM5:COM8")
+    scheduler = RigScheduler(rigs, AES_PLAINTEXT, AES_REFERENCE)
+    outcomes = scheduler.run(ParameterSpace().halton(2000), results)
+
+SimulatedRig runs the same worker against vcgsim and the emulator.
+'''
+import collections
+import multiprocessing
+import time
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+from session import GlitcherSession
+from uart import DutConnection
+from power import PowerCycler
+from results import classify
+
+AES_OPCODE = 0xAE
+
+
+class Rig(object):
+    """One glitcher with its DUT and relay"""
+
+    def __init__(self, device_index=0, dut_port='COM4', relay_port='COM7', name=None, settle=2.0):
+        self.device_index = device_index
+        self.dut_port = dut_port
+        self.relay_port = relay_port
+        self.name = name or "rig{}".format(device_index)
+        self.settle = settle  # Pause before every shot
+
+    def connect(self, plaintext, reference):
+        """Runs in the worker process; returns the RigShooter for this rig"""
+        shooter = RigShooter(plaintext, reference, GlitcherSession(self.device_index),
+                             DutConnection(self.dut_port, 115200), settle=self.settle)
+        shooter.power = PowerCycler(self.relay_port, 9600, min_off_time=1.0, probe=shooter.alive,
+                                    boot_timeout=10.0)
+        return shooter
+
+
+def parse_rigs(spec):
+    """Parses "index:dut_port:relay_port,..." into Rigs"""
+    rigs = []
+    for item in spec.split(','):
+        index, dut_port, relay_port = item.strip().split(':')
+        rigs.append(Rig(int(index), dut_port, relay_port))
+    return rigs
+
+
+class RigShooter(object):
+    """Fires single shots on one rig, the per-rig counterpart of dig_glitch"""
+
+    def __init__(self, plaintext, reference, session, dut, power=None, settle=0.0):
+        self.command = [AES_OPCODE] + list(bytearray(plaintext))
+        self.reference = bytes(bytearray(reference))
+        self.session = session
+        self.dut = dut
+        self.power = power
+        self.settle = settle
+
+    def alive(self):
+        return len(self.dut.transact(self.command, 16, timeout=0.05)) >= 16
+
+    def shoot(self, point):
+        """Returns the result record (voltage, delay, duration, outcome, response) of one shot"""
+        voltage = point['glitch_voltage']
+        delay = point.get('delay', 100)
+        duration = point.get('duration', 100)
+        if self.settle:
+            time.sleep(self.settle)
+        vcg = self.session.arm(voltage, delay, duration, v_vcc=point.get('v_vcc'), v_clk=point.get('v_clk'))
+        vcg.evcg_soft_start()
+        response = bytes(bytearray(self.dut.transact(self.command, 16)))
+        start = time.time()  # Completion latency excludes the DUT round trip
+        # A sequence that never completes or a board that stopped answering
+        # stays that way until the power is cycled
+        reset = not self.session.wait(start) or (len(response) < 16 and not self.alive())
+        if reset and self.power is not None:
+            self.power.reset()
+        self.session.disarm()
+        return voltage, delay, duration, classify(response, reset, self.reference), response
+
+    def close(self):
+        self.session.close()
+        self.dut.close()
+        if self.power is not None:
+            self.power.close()
+
+
+class SimulatedRig(Rig):
+    """Rig backed by vcgsim and an emulated AES target, for testing the scheduler"""
+
+    def __init__(self, name, seed=None, model=None, latency=0.0, slowdown=0.0, fail_after=None):
+        Rig.__init__(self, name=name, settle=0.0)
+        self.seed = seed
+        self.model = model
+        self.latency = latency        # Added to every simulated SDK call
+        self.slowdown = slowdown      # Extra seconds per shot
+        self.fail_after = fail_after  # Shots before the rig raises
+
+    def connect(self, plaintext, reference):
+        from emulator import AesTarget
+        from vcgsim import VCGlitcherSim
+        target = AesTarget(model=self.model, seed=self.seed)
+        target.start()
+        shooter = _SimulatedShooter(plaintext, reference,
+                                    GlitcherSession(dll=VCGlitcherSim(self.latency, target=target)),
+                                    DutConnection(target.port, timeout=0.02))
+        shooter.power = PowerCycler(target.relay_port, 9600, min_off_time=0.01, probe=shooter.alive,
+                                    boot_timeout=1.0)
+        shooter.target = target
+        shooter.slowdown = self.slowdown
+        shooter.fail_after = self.fail_after
+        return shooter
+
+
+class _SimulatedShooter(RigShooter):
+
+    def shoot(self, point):
+        if self.fail_after is not None:
+            if self.fail_after <= 0:
+                raise IOError("simulated rig failure")
+            self.fail_after -= 1
+        if self.slowdown:
+            time.sleep(self.slowdown)
+        return RigShooter.shoot(self, point)
+
+    def close(self):
+        RigShooter.close(self)
+        self.target.stop()
+
+
+def _rig_worker(rig, plaintext, reference, inbox, outbox):
+    # Worker process: asks for a chunk whenever idle and returns its records
+    chunk_id = None
+    try:
+        shooter = rig.connect(plaintext, reference)
+    except Exception as e:
+        outbox.put(('failed', rig.name, None, repr(e)))
+        return
+    try:
+        while True:
+            outbox.put(('idle', rig.name, None, None))
+            task = inbox.get()
+            if task is None:
+                break
+            chunk_id, points = task
+            start = time.time()
+            records = [shooter.shoot(p) for p in points]
+            outbox.put(('done', rig.name, chunk_id, (records, time.time() - start)))
+    except Exception as e:
+        outbox.put(('failed', rig.name, chunk_id, repr(e)))
+    finally:
+        shooter.close()
+
+
+class RigStats(object):
+    """Per-rig counters kept by the scheduler"""
+
+    def __init__(self):
+        self.shots = 0
+        self.chunks = 0
+        self.busy = 0.0
+        self.wasted = 0      # Shots of chunks another rig finished first
+        self.failure = None
+
+
+class RigScheduler(object):
+    """Runs parameter points on several rigs in parallel worker processes"""
+
+    def __init__(self, rigs, plaintext, reference, chunk_size=8, lease_timeout=None, lease_margin=4.0,
+                 min_lease=30.0, poll_interval=0.1):
+        self.rigs = list(rigs)
+        self.plaintext = list(bytearray(plaintext))
+        self.reference = bytes(bytearray(reference))
+        self.chunk_size = chunk_size
+        self.lease_timeout = lease_timeout  # None: lease_margin x the median chunk time so far
+        self.lease_margin = lease_margin
+        self.min_lease = min_lease
+        self.poll_interval = poll_interval
+        self.stats = collections.OrderedDict((r.name, RigStats()) for r in self.rigs)
+        self.chunk_times = []
+        self.reissued = 0
+        self.unfinished = 0
+        self.elapsed = 0.0
+
+    def lease(self):
+        if self.lease_timeout is not None:
+            return self.lease_timeout
+        if not self.chunk_times:
+            return self.min_lease
+        median = sorted(self.chunk_times)[len(self.chunk_times) // 2]
+        return max(self.min_lease, self.lease_margin * median)
+
+    def run(self, points, writer=None):
+        """
+        Fires every point once on some rig. Records are appended to writer (a
+        results.ResultWriter) as chunks complete; returns the outcome per point,
+        None for points no rig could finish.
+        """
+        points = list(points)
+        chunks = dict((i // self.chunk_size, points[i:i + self.chunk_size])
+                      for i in range(0, len(points), self.chunk_size))
+        todo = collections.deque(sorted(chunks))
+        pending = set(chunks)
+        outcomes = [None] * len(points)
+        leases = {}       # rig name -> (chunk id, start time)
+        idle = []
+        live = {}         # rig name -> (process, inbox)
+        outbox = multiprocessing.Queue()
+        start = time.time()
+        for rig in self.rigs:
+            inbox = multiprocessing.Queue()
+            proc = multiprocessing.Process(target=_rig_worker, name=rig.name,
+                                           args=(rig, self.plaintext, self.reference, inbox, outbox))
+            proc.daemon = True
+            proc.start()
+            live[rig.name] = (proc, inbox)
+
+        def drop(name, reason):
+            # Rig is gone: its chunk goes back to the front of the queue
+            live.pop(name, None)
+            if name in idle:
+                idle.remove(name)
+            self.stats[name].failure = reason
+            lease = leases.pop(name, None)
+            if lease is not None and lease[0] in pending:
+                todo.appendleft(lease[0])
+                self.reissued += 1
+
+        try:
+            while pending and live:
+                try:
+                    kind, name, chunk_id, payload = outbox.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    kind = None
+                if kind == 'idle' and name in live:
+                    idle.append(name)
+                elif kind == 'done':
+                    leases.pop(name, None)
+                    records, seconds = payload
+                    stats = self.stats[name]
+                    stats.busy += seconds
+                    if chunk_id in pending:
+                        pending.discard(chunk_id)
+                        stats.shots += len(records)
+                        stats.chunks += 1
+                        self.chunk_times.append(seconds)
+                        first = chunk_id * self.chunk_size
+                        for i, record in enumerate(records):
+                            outcomes[first + i] = record[3]
+                            if writer is not None:
+                                writer.write(*record)
+                    else:
+                        stats.wasted += len(records)
+                elif kind == 'failed' and name in live:
+                    drop(name, payload)
+
+                for name, (proc, inbox) in list(live.items()):
+                    if not proc.is_alive():
+                        drop(name, "exit code {}".format(proc.exitcode))
+
+                # A straggling chunk is handed to the next idle rig as well;
+                # whichever copy finishes first is kept. Leases keep their
+                # start time, so a chunk is queued again only once its newest
+                # copy is past the lease too
+                now = time.time()
+                newest = {}
+                for chunk_id, since in leases.values():
+                    newest[chunk_id] = max(since, newest.get(chunk_id, since))
+                for chunk_id, since in newest.items():
+                    if chunk_id in pending and chunk_id not in todo and now - since > self.lease():
+                        todo.appendleft(chunk_id)
+                        self.reissued += 1
+
+                while idle and todo:
+                    chunk_id = todo.popleft()
+                    if chunk_id not in pending:
+                        continue
+                    # Idle rigs hold no lease, but never hand a rig its own chunk twice
+                    free = [n for n in idle if leases.get(n, (None,))[0] != chunk_id]
+                    if not free:
+                        todo.appendleft(chunk_id)
+                        break
+                    name = free[0]
+                    idle.remove(name)
+                    live[name][1].put((chunk_id, chunks[chunk_id]))
+                    leases[name] = (chunk_id, now)
+        finally:
+            # Idle rigs stop cleanly, rigs still busy on a duplicate are stopped
+            for name, (proc, inbox) in live.items():
+                if name in leases:
+                    proc.terminate()
+                else:
+                    inbox.put(None)
+            for proc, inbox in live.values():
+                proc.join(timeout=5.0)
+                if proc.is_alive():
+                    proc.terminate()
+            if writer is not None:
+                writer.flush()
+        self.unfinished = sum(len(chunks[c]) for c in pending)
+        self.elapsed = time.time() - start
+        return outcomes
+
+    def throughput(self):
+        shots = sum(s.shots for s in self.stats.values())
+        return shots / self.elapsed if self.elapsed else 0.0
+
+    def report(self):
+        for name, s in self.stats.items():
+            rate = s.shots / s.busy if s.busy else 0.0
+            print("{}: {} shots in {} chunks, {:.2f} shots/s, {} wasted{}".format(
+                name, s.shots, s.chunks, rate, s.wasted, ", failed: {}".format(s.failure) if s.failure else ""))
+        print("Rigs: {} shots in {:.1f}s ({:.2f} shots/s), {} chunks reissued, {} points unfinished".format(
+            sum(s.shots for s in self.stats.values()), self.elapsed, self.throughput(), self.reissued,
+            self.unfinished))
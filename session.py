@@ -0,0 +1,175 @@
+'''
+Long-lived VC Glitcher session for glitch sweeps.
+
+The device is listed, opened and put into Embedded VCC mode once; every shot
+afterwards only reprograms the glitch voltage and pattern and re-arms. The
+session reconnects only when the SDK reports a USB communication error.
+'''
+import time
+from vcglitcher import *
+from latency import LatencyHistogram
+from tracing import Tracer
+
+USB_ERROR = 3
+
+
+class GlitcherSession(object):
+    """Opens the VC Glitcher once and re-arms it between shots"""
+
+    def __init__(self, device_index=0, mode=GLITCH_MODE.EMBEDDED_VCC, v_vcc=4.0, v_clk=4.0, dll=None, tracer=None):
+        self.dll = dll  # None loads the SDK library, see VCGlitcher
+        self.tracer = tracer if tracer is not None else Tracer(capacity=0, enabled=False)
+        self.device_index = device_index
+        self.mode = mode
+        self.v_vcc = v_vcc
+        self.v_clk = v_clk
+        self.vcg = None
+        self.opens = 0
+        self.reconnects = 0
+        self.shots = 0
+        self.setup_time = 0.0
+        # Completion wait: poll backoff bounds and the data-driven timeout
+        self.min_poll = 50e-6
+        self.max_poll = 5e-3
+        self.min_timeout = 0.05
+        self.max_timeout = 5.0
+        self.timeout_margin = 4.0
+        self.min_samples = 20
+        self.latency = LatencyHistogram()
+        self.timeouts = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def open(self):
+        """Runs the one-off device setup that dig_glitch used to repeat per shot"""
+        start = time.time()
+        span = self.tracer.span
+        with span('session.open'):
+            with span('VCGlitcher'):
+                vcg = VCGlitcher(self.dll)
+            with span('device_list'):
+                vcg.device_list()
+                vcg.device_get_info(self.device_index)
+            with span('open'):
+                vcg.open()
+            with span('set_mode'):
+                vcg.set_mode(self.mode)
+                vcg.pattern_enable()
+                vcg.evcg_trigger_config(EVCG_TRIGGER_SRC.TRIGGER_IN, EVCG_TRIGGER_EDGE.RISING)
+        self.vcg = vcg
+        self.setup_time += time.time() - start
+        self.opens += 1
+        return vcg
+
+    def close(self):
+        if self.vcg is None:
+            return
+        try:
+            self.vcg.evcg_set_arm(False)
+            self.vcg.close()
+        except VCGlitcherError:
+            pass  # Device already gone, nothing left to release
+        self.vcg = None
+
+    def reconnect(self):
+        self.close()
+        self.reconnects += 1
+        return self.open()
+
+    def _guarded(self, func):
+        # Run func against the open device, reopening once after a USB error
+        if self.vcg is None:
+            self.open()
+        try:
+            return func(self.vcg)
+        except VCGlitcherError as e:
+            if e.status != USB_ERROR:
+                raise
+            print("USB error, reconnecting VC Glitcher...")
+            return func(self.reconnect())
+
+    def arm(self, glitch_voltage, delay=100, duration=100, v_vcc=None, v_clk=None):
+        """Reprograms a single glitch pattern and arms the Embedded Glitcher"""
+        return self.arm_pattern(glitch_voltage, [(delay, duration)], v_vcc, v_clk)
+
+    def arm_pattern(self, glitch_voltage, pairs, v_vcc=None, v_clk=None):
+        """Commits a sequence of (delay, duration) pattern pairs and arms the Embedded Glitcher"""
+        v_vcc = self.v_vcc if v_vcc is None else v_vcc
+        v_clk = self.v_clk if v_clk is None else v_clk
+        span = self.tracer.span
+        def _arm(vcg):
+            vcg.evcg_set_arm(False)
+            with span('set_vcc_glitch_parameter'):
+                vcg.set_vcc_glitch_parameter(v_vcc, v_clk, glitch_voltage)
+            with span('pattern'):
+                vcg.evcg_clear_pattern()
+                for delay, duration in pairs:
+                    vcg.evcg_add_pattern(delay, duration)
+                vcg.evcg_set_pattern()
+            vcg.evcg_set_arm(True)
+            return vcg
+        vcg = self._guarded(_arm)
+        self.shots += 1
+        return vcg
+
+    def pattern_capacity(self):
+        """Number of pattern pairs the Embedded Glitcher buffer is guaranteed to hold"""
+        return self._guarded(lambda vcg: vcg.evcg_get_guaranteed_pattern_number())
+
+    def busy(self):
+        return self._guarded(lambda vcg: vcg.evcg_busy())
+
+    def wait_timeout(self):
+        """Completion timeout: a margin over the observed p99.9 latency, 5 s until enough data"""
+        if self.latency.count < self.min_samples:
+            return self.max_timeout
+        limit = self.latency.percentile(0.999) * self.timeout_margin
+        return min(max(limit, self.min_timeout), self.max_timeout)
+
+    def wait(self, start=None, timeout=None):
+        """
+        Waits for the glitch sequence to finish, sleeping with an exponential
+        poll backoff instead of spinning on evcg_busy. Latency and timeout are
+        counted from start (default: now), which should come after any
+        blocking DUT I/O. Returns True on completion, False on timeout.
+        """
+        if start is None:
+            start = time.time()
+        if timeout is None:
+            timeout = self.wait_timeout()
+        interval = self.min_poll
+        while self.busy():
+            elapsed = time.time() - start
+            if elapsed > timeout:
+                self.timeouts += 1
+                return False
+            time.sleep(min(interval, timeout - elapsed))
+            interval = min(interval * 2, self.max_poll)
+        self.latency.record(time.time() - start)
+        return True
+
+    def disarm(self):
+        self._guarded(lambda vcg: vcg.evcg_set_arm(False))
+
+    def setup_cost(self):
+        """Average time spent on one full device setup"""
+        if self.opens == 0:
+            return 0.0
+        return self.setup_time / self.opens
+
+    def saved_time(self):
+        """Setup time avoided compared to reopening the device for every shot"""
+        return self.setup_cost() * max(self.shots - self.opens, 0)
+
+    def report(self):
+        per_shot = self.saved_time() / self.shots if self.shots else 0.0
+        print("Glitcher session: {} shots, {} opens, {} reconnects".format(self.shots, self.opens, self.reconnects))
+        print("Setup cost {:.3f}s per open, saved {:.1f}s total ({:.3f}s per shot)".format(
+            self.setup_cost(), self.saved_time(), per_shot))
+        print("Sequence completion: {} ({} timeouts, current timeout {:.3f}s)".format(
+            self.latency.summary(), self.timeouts, self.wait_timeout()))
@@ -0,0 +1,140 @@
+'''
+Multi-dimensional glitch parameter space exploration.
+
+Glitch voltage, pattern delay and duration, and optionally the VCC and clock
+voltages are sampled together with a space-filling design (Latin hypercube or
+Halton sequence) instead of a nested grid. Each sample maps onto one
+GlitcherSession.arm() call, and Coverage tracks which cells of the space have
+been visited.
+
+    space = ParameterSpace(DEFAULT_AXES)
+    for point in space.halton(2000):
+        space.arm(session, point)
+'''
+import numpy as np
+
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29)
+
+
+class Axis(object):
+    """One glitch parameter with its range"""
+
+    def __init__(self, name, low, high, integer=False):
+        self.name = name
+        self.low = low
+        self.high = high
+        self.integer = integer
+
+    def scale(self, unit):
+        values = self.low + unit * (self.high - self.low)
+        if self.integer:
+            return np.rint(values).astype(np.int64)
+        return np.round(values, 3)
+
+    def unit(self, values):
+        return (np.asarray(values, dtype=float) - self.low) / float(self.high - self.low)
+
+
+# Axes understood by ParameterSpace.arm(); names match GlitcherSession.arm()
+DEFAULT_AXES = (
+    Axis('glitch_voltage', -7.4, 4.2),
+    Axis('delay', 0, 2000, integer=True),
+    Axis('duration', 4, 400, integer=True),
+)
+SUPPLY_AXES = (
+    Axis('v_vcc', 3.0, 5.0),
+    Axis('v_clk', 3.0, 5.0),
+)
+
+
+def radical_inverse(index, base):
+    """Van der Corput radical inverse of an index array"""
+    index = np.asarray(index, dtype=np.int64).copy()
+    result = np.zeros(index.shape)
+    f = 1.0 / base
+    while index.any():
+        result += f * (index % base)
+        index //= base
+        f /= base
+    return result
+
+
+class ParameterSpace(object):
+    """Samples glitch parameters jointly over several axes"""
+
+    def __init__(self, axes=DEFAULT_AXES, seed=None):
+        assert len(axes) <= len(PRIMES)
+        self.axes = tuple(axes)
+        self.rng = np.random.RandomState(seed)
+        self.halton_index = 1  # Index 0 is the all-zero corner
+
+    def names(self):
+        return [a.name for a in self.axes]
+
+    def get_state(self):
+        """JSON-serialisable sampler state for checkpoints"""
+        name, keys, pos, has_gauss, cached = self.rng.get_state()
+        return {'halton_index': int(self.halton_index),
+                'rng': [name, keys.tolist(), int(pos), int(has_gauss), float(cached)]}
+
+    def set_state(self, state):
+        self.halton_index = state['halton_index']
+        name, keys, pos, has_gauss, cached = state['rng']
+        self.rng.set_state((str(name), np.array(keys, dtype=np.uint32), pos, has_gauss, cached))
+
+    def to_points(self, unit):
+        """Scales samples from the unit cube to a list of parameter dicts"""
+        columns = [a.scale(unit[:, i]) for i, a in enumerate(self.axes)]
+        return [dict(zip(self.names(), (c[j].item() for c in columns))) for j in range(len(unit))]
+
+    def latin_hypercube_unit(self, n):
+        d = len(self.axes)
+        strata = np.array([self.rng.permutation(n) for _ in range(d)]).T
+        return (strata + self.rng.uniform(size=(n, d))) / n
+
+    def halton_unit(self, n):
+        # Continues the sequence across calls so batches never repeat points
+        index = np.arange(self.halton_index, self.halton_index + n)
+        self.halton_index += n
+        return np.column_stack([radical_inverse(index, PRIMES[i]) for i in range(len(self.axes))])
+
+    def latin_hypercube(self, n):
+        return self.to_points(self.latin_hypercube_unit(n))
+
+    def halton(self, n):
+        return self.to_points(self.halton_unit(n))
+
+    def grid_size(self, steps):
+        """Shots a nested grid with the given number of steps per axis needs"""
+        return int(np.prod([steps] * len(self.axes)))
+
+    def arm(self, session, point):
+        """Programs one sample into the glitcher: voltages, then a single pattern pair"""
+        return session.arm(point['glitch_voltage'], point.get('delay', 100), point.get('duration', 100),
+                           v_vcc=point.get('v_vcc'), v_clk=point.get('v_clk'))
+
+
+class Coverage(object):
+    """Tracks which cells of a bins^d partition of the space have been sampled"""
+
+    def __init__(self, space, bins=8):
+        self.space = space
+        self.bins = bins
+        self.counts = np.zeros(bins ** len(space.axes), dtype=np.int64)
+
+    def cells(self, points):
+        index = np.zeros(len(points), dtype=np.int64)
+        for axis in self.space.axes:
+            unit = axis.unit([p[axis.name] for p in points])
+            index = index * self.bins + np.clip((unit * self.bins).astype(np.int64), 0, self.bins - 1)
+        return index
+
+    def add(self, points):
+        self.counts += np.bincount(self.cells(points), minlength=len(self.counts))
+
+    def fraction(self):
+        return np.count_nonzero(self.counts) / float(len(self.counts))
+
+    def report(self):
+        print("Coverage: {} samples, {:.1f}% of {} cells visited".format(
+            int(self.counts.sum()), 100.0 * self.fraction(), len(self.counts)))
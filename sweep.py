@@ -0,0 +1,159 @@
+'''
+Adaptive multi-resolution glitch voltage sweep.
+
+A coarse grid is measured first. Intervals whose end points differ in fault or
+reset rate (or that touch a point with faults) are halved and their mid point
+measured, level by level, until neighbouring points are min_step apart. All
+points lie on the min_step grid (mid points are rounded down to it), so
+refined regions end up sampled uniformly at min_step and flat regions only at
+the coarse step.
+
+EarlyStop ends the repetitions at one point as soon as its fault and reset
+rates are pinned down to the requested precision.
+'''
+import collections
+import math
+
+import numpy as np
+
+from results import OUTCOME, OUTCOME_NAMES
+
+
+def rates(counts):
+    """Returns (fault_rate, reset_rate) of an outcome count vector"""
+    n = float(sum(counts))
+    if n == 0:
+        return 0.0, 0.0
+    return counts[OUTCOME.FAULT] / n, (counts[OUTCOME.MUTE] + counts[OUTCOME.RESET]) / n
+
+
+def wilson_interval(k, n, z=1.96):
+    """Wilson score interval of a binomial rate with k hits in n trials"""
+    if n == 0:
+        return 0.0, 1.0
+    p = float(k) / n
+    denom = 1.0 + z * z / n
+    center = (p + z * z / (2.0 * n)) / denom
+    half = z * math.sqrt(p * (1.0 - p) / n + z * z / (4.0 * n * n)) / denom
+    return max(center - half, 0.0), min(center + half, 1.0)
+
+
+class EarlyStop(object):
+    """Sequential stopping rule for the repetitions at one parameter point"""
+
+    def __init__(self, max_shots=50, min_shots=10, precision=0.1, z=1.96):
+        self.max_shots = max_shots
+        self.min_shots = min_shots
+        self.precision = precision  # Allowed half-width of the rate intervals
+        self.z = z                  # 1.96 for 95% confidence
+        self.points = 0
+        self.shots = 0
+
+    def done(self, counts):
+        """True once both fault and reset rate intervals are narrow enough"""
+        n = sum(counts)
+        if n >= self.max_shots:
+            return True
+        if n < self.min_shots:
+            return False
+        faults = counts[OUTCOME.FAULT]
+        resets = counts[OUTCOME.MUTE] + counts[OUTCOME.RESET]
+        for k in (faults, resets):
+            lo, hi = wilson_interval(k, n, self.z)
+            if hi - lo > 2 * self.precision:
+                return False
+        return True
+
+    def record(self, counts):
+        self.points += 1
+        self.shots += sum(counts)
+
+    def saved(self):
+        return self.points * self.max_shots - self.shots
+
+    def report(self):
+        budget = self.points * self.max_shots
+        print("Early stopping: {} shots over {} points, saved {} of {} ({:.1f}%)".format(
+            self.shots, self.points, self.saved(), budget, 100.0 * self.saved() / budget if budget else 0.0))
+
+
+class AdaptiveSweep(object):
+    """Coarse-to-fine voltage sweep refining around fault and reset transitions"""
+
+    def __init__(self, start=-7.4, stop=4.2, coarse_step=0.1, min_step=0.01, threshold=0.1,
+                 refine_faults=True):
+        self.start = start
+        self.stop = stop
+        self.coarse_step = coarse_step
+        self.min_step = min_step
+        self.threshold = threshold          # Rate change that triggers a refinement
+        self.refine_faults = refine_faults  # Always refine next to points that faulted
+        self.points = {}                    # voltage -> outcome counts
+
+    def voltage(self, i):
+        """Voltage of point i of the min_step grid"""
+        return round(self.start + i * self.min_step, 3)
+
+    def coarse_indices(self):
+        """Coarse grid as min_step grid indices; coarse_step is rounded to a multiple of min_step"""
+        units = max(int(round(self.coarse_step / self.min_step)), 1)
+        n = int(round((self.stop - self.start) / self.min_step))
+        indices = list(range(0, n + 1, units))
+        if indices[-1] != n:
+            indices.append(n)
+        return indices
+
+    def coarse_grid(self):
+        return [self.voltage(i) for i in self.coarse_indices()]
+
+    def interesting(self, a, b):
+        fault_a, reset_a = rates(self.points[a])
+        fault_b, reset_b = rates(self.points[b])
+        if abs(fault_a - fault_b) > self.threshold or abs(reset_a - reset_b) > self.threshold:
+            return True
+        return self.refine_faults and (fault_a > 0 or fault_b > 0)
+
+    def measure_point(self, measure, voltage):
+        if voltage not in self.points:
+            self.points[voltage] = list(measure(voltage))
+        return self.points[voltage]
+
+    def run(self, measure):
+        """
+        Runs the sweep. measure(voltage) fires the shots for one voltage and
+        returns the outcome counts indexed by results.OUTCOME.
+        """
+        grid = self.coarse_indices()
+        for i in grid:
+            self.measure_point(measure, self.voltage(i))
+
+        # Intervals as min_step grid indices, so spacing never goes below min_step
+        intervals = collections.deque(zip(grid[:-1], grid[1:]))
+        while intervals:
+            a, b = intervals.popleft()
+            if b - a < 2 or not self.interesting(self.voltage(a), self.voltage(b)):
+                continue
+            mid = (a + b) // 2
+            self.measure_point(measure, self.voltage(mid))
+            intervals.append((a, mid))
+            intervals.append((mid, b))
+        return self.points
+
+    def table(self):
+        """Returns (voltages, counts) sorted by voltage"""
+        voltages = sorted(self.points)
+        counts = np.array([self.points[v] for v in voltages], dtype=np.int64).reshape(-1, len(OUTCOME_NAMES))
+        return np.array(voltages), counts
+
+    def fixed_grid_points(self):
+        """Number of points a uniform grid at min_step over the range would need"""
+        return int(round((self.stop - self.start) / self.min_step)) + 1
+
+    def report(self):
+        voltages, counts = self.table()
+        print("{:>8} ".format("Voltage") + " ".join("{:>6}".format(n) for n in OUTCOME_NAMES))
+        for v, row in zip(voltages, counts):
+            print("{:>8.3f} ".format(v) + " ".join("{:>6}".format(c) for c in row))
+        fixed = self.fixed_grid_points()
+        print("Measured {} points, a {} V grid needs {} ({:.1f}%)".format(
+            len(voltages), self.min_step, fixed, 100.0 * len(voltages) / fixed))
@@ -0,0 +1,238 @@
+'''
+Live campaign metrics in the Prometheus text format.
+
+Counters and gauges are plain attribute updates and histograms are
+LatencyHistograms, so the shot loop pays a few additions per shot. Rates and
+ratios are only computed when the endpoint is scraped. MetricsServer serves
+the registry from a daemon thread:
+
+    metrics = CampaignMetrics()
+    MetricsServer(metrics, 9108).start()
+    ...
+    metrics.shot(outcome)
+
+    curl http://127.0.0.1:9108/metrics
+'''
+import collections
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from latency import BUCKETS, STEPS_PER_OCTAVE, LatencyHistogram, bucket_upper
+from results import OUTCOME, OUTCOME_NAMES
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PHASES = ('arm', 'settle', 'dut', 'wait', 'disarm')
+
+
+class Value(object):
+    """Counter or gauge sample"""
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    if isinstance(value, float):
+        return repr(value) if value == value else 'NaN'
+    return str(value)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join('{}="{}"'.format(n, v) for (n, _), v in zip(pairs, escaped)) + '}'
+
+
+class Metric(object):
+    """One metric family; labels(...) returns the sample for a label combination"""
+
+    def __init__(self, name, kind, help, labels=(), func=None):
+        self.name = name
+        self.kind = kind  # counter, gauge or histogram
+        self.help = help
+        self.labelnames = tuple(labels)
+        self.func = func  # Computes the value of an unlabelled gauge at scrape time
+        self.children = collections.OrderedDict()
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = LatencyHistogram() if self.kind == 'histogram' else Value()
+        return child
+
+    def attach(self, histogram, *values):
+        """Exports an existing LatencyHistogram under this family"""
+        self.children[tuple(str(v) for v in values)] = histogram
+
+    def render(self, lines):
+        lines.append('# HELP {} {}'.format(self.name, self.help))
+        lines.append('# TYPE {} {}'.format(self.name, self.kind))
+        if self.func is not None:
+            lines.append('{} {}'.format(self.name, _format_value(self.func())))
+            return
+        for values, child in list(self.children.items()):
+            if self.kind != 'histogram':
+                lines.append('{}{} {}'.format(self.name, _format_labels(self.labelnames, values),
+                                              _format_value(child.value)))
+                continue
+            # One bucket per octave of the histogram's quarter-octave buckets
+            counts = list(child.counts)
+            cumulative = 0
+            for i in range(BUCKETS):
+                cumulative += counts[i]
+                if i % STEPS_PER_OCTAVE == 0:
+                    lines.append('{}_bucket{} {}'.format(self.name, _format_labels(
+                        self.labelnames, values, [('le', '{:g}'.format(bucket_upper(i)))]), cumulative))
+            total = cumulative + counts[BUCKETS]
+            lines.append('{}_bucket{} {}'.format(
+                self.name, _format_labels(self.labelnames, values, [('le', '+Inf')]), total))
+            lines.append('{}_sum{} {}'.format(self.name, _format_labels(self.labelnames, values),
+                                              _format_value(child.total)))
+            lines.append('{}_count{} {}'.format(self.name, _format_labels(self.labelnames, values), total))
+
+
+class MetricsRegistry(object):
+    """Ordered collection of metric families"""
+
+    def __init__(self):
+        self.metrics = collections.OrderedDict()
+
+    def _add(self, metric):
+        assert metric.name not in self.metrics, metric.name
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Metric(name, 'counter', help, labels))
+
+    def gauge(self, name, help, labels=(), func=None):
+        return self._add(Metric(name, 'gauge', help, labels, func))
+
+    def histogram(self, name, help, labels=()):
+        return self._add(Metric(name, 'histogram', help, labels))
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            metric.render(lines)
+        return '\n'.join(lines) + '\n'
+
+
+class CampaignMetrics(MetricsRegistry):
+    """Shot outcomes, resets, phase latencies and position of a glitch campaign"""
+
+    def __init__(self, window=60.0):
+        MetricsRegistry.__init__(self)
+        self.window = window  # Seconds over which the shot rate is averaged
+        self.start_time = time.time()
+        self.last_shot = None
+        self.rate_samples = collections.deque()  # (time, shots) taken at each scrape
+        self.rate_lock = threading.Lock()
+
+        shots = self.counter('glitch_shots_total', 'Shots fired by outcome', ('outcome',))
+        self.outcomes = [shots.labels(name) for name in OUTCOME_NAMES]  # Indexed by OUTCOME
+        self.resets = self.counter('glitch_resets_total', 'DUT power cycles').labels()
+        phases = self.histogram('glitch_phase_seconds', 'Duration of each phase of a shot', ('phase',))
+        self.phase = dict((name, phases.labels(name)) for name in PHASES)
+        self.voltage = self.gauge('glitch_voltage', 'Glitch voltage of the current shot').labels()
+        self.iteration = self.gauge('glitch_iteration', 'Shot index at the current voltage').labels()
+        self.gauge('glitch_shots_per_second', 'Shot rate over the last {:g} s'.format(window), func=self.shot_rate)
+        self.gauge('glitch_fault_ratio', 'Fraction of shots with a faulty response',
+                   func=lambda: self.ratio(OUTCOME.FAULT))
+        self.gauge('glitch_mute_ratio', 'Fraction of shots with no or a truncated response',
+                   func=lambda: self.ratio(OUTCOME.MUTE))
+        self.gauge('glitch_last_shot_age_seconds', 'Seconds since the last shot ended', func=self.last_shot_age)
+
+    def shot(self, outcome):
+        self.outcomes[outcome].value += 1
+        self.last_shot = time.time()
+
+    def shots(self):
+        return sum(o.value for o in self.outcomes)
+
+    def ratio(self, outcome):
+        total = self.shots()
+        return float(self.outcomes[outcome].value) / total if total else None
+
+    def shot_rate(self):
+        now = time.time()
+        total = self.shots()
+        with self.rate_lock:
+            samples = self.rate_samples
+            samples.append((now, total))
+            while len(samples) > 1 and now - samples[1][0] >= self.window:
+                samples.popleft()
+            since, before = samples[0] if len(samples) > 1 else (self.start_time, 0)
+        return (total - before) / (now - since) if now > since else None
+
+    def last_shot_age(self):
+        return time.time() - self.last_shot if self.last_shot is not None else None
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep scrapes out of the campaign output
+
+
+class _HTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MetricsServer(object):
+    """Serves a registry at http://host:port/metrics from a daemon thread"""
+
+    def __init__(self, registry, port=9108, host='127.0.0.1'):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    def start(self):
+        self.httpd = _HTTPServer((self.host, self.port), _Handler)
+        self.httpd.registry = self.registry
+        self.port = self.httpd.server_address[1]  # Actual port when 0 was asked for
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def url(self):
+        return "http://{}:{}/metrics".format(self.host, self.port)
+
+    def close(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.thread.join()
+            self.httpd = None
@@ -0,0 +1,21 @@
+from aes128 import PINATA_KEY, START_AES_PLAINTEXT, encrypt, expand_key, last_round_key_to_key
+
+# FIPS-197 appendix C.1
+FIPS_KEY = bytes(bytearray(range(16)))
+FIPS_PLAINTEXT = bytes(bytearray.fromhex('00112233445566778899aabbccddeeff'))
+FIPS_CIPHERTEXT = bytes(bytearray.fromhex('69c4e0d86a7b0430d8cdb78070b4c55a'))
+
+
+def test_fips197_vector():
+    assert encrypt(FIPS_KEY, FIPS_PLAINTEXT) == FIPS_CIPHERTEXT
+
+
+def test_last_round_key_inverts_the_key_schedule():
+    round_key = bytes(bytearray(expand_key(PINATA_KEY)[10]))
+    assert last_round_key_to_key(round_key) == PINATA_KEY
+
+
+def test_last_round_fault_changes_one_byte():
+    correct = bytearray(encrypt(PINATA_KEY, START_AES_PLAINTEXT))
+    faulty = bytearray(encrypt(PINATA_KEY, START_AES_PLAINTEXT, fault=(10, 3, 0x40)))
+    assert sum(a != b for a, b in zip(correct, faulty)) == 1
@@ -0,0 +1,33 @@
+from aggregate import OutcomeIndex, load
+from results import OUTCOME, ResultWriter
+
+
+def test_save_load_merge_round_trip(tmpdir):
+    a = OutcomeIndex()
+    a.add(1.0, 100, 50, OUTCOME.FAULT)
+    a.add(1.0, 100, 50, OUTCOME.NORMAL, count=3)
+    a.add(-0.5, 20, 10, OUTCOME.RESET)
+    path = str(tmpdir.join('index.bin'))
+    a.save(path)
+    loaded = OutcomeIndex.load(path)
+    assert loaded.bins == a.bins
+
+    results_path = str(tmpdir.join('results.bin'))
+    with ResultWriter(results_path) as results:
+        results.write(1.0, 100, 50, OUTCOME.FAULT)
+        results.write(2.0, 0, 10, OUTCOME.MUTE)
+    merged = loaded.merge(load(results_path))
+    assert merged.shots() == 7
+    assert merged.counts(voltage=1.0).tolist() == [3, 2, 0, 0]
+    assert merged.rate(voltage=1.0) == 0.4
+    assert merged.rate(voltage=3.0) is None
+
+
+def test_catch_up_adds_only_new_records(tmpdir):
+    path = str(tmpdir.join('results.bin'))
+    with ResultWriter(path) as results:
+        results.write(0.1, 0, 10, OUTCOME.NORMAL)
+        index = OutcomeIndex.from_results(path)
+        results.write(0.1, 0, 10, OUTCOME.FAULT)
+    index.catch_up(path)
+    assert index.counts().tolist() == [1, 1, 0, 0]
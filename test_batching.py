@@ -0,0 +1,33 @@
+from batching import BatchTester, pack, to_pattern
+from results import OUTCOME
+
+
+def test_pack_keeps_a_gap_between_glitches():
+    batches = pack([(0, 20), (20, 20), (41, 10)], capacity=8)
+    assert batches == [[(0, 20), (41, 10)], [(20, 20)]]
+    assert all(delay > 0 for batch in batches for delay, _ in to_pattern(batch)[1:])
+
+
+def test_effect_pinned_to_one_candidate():
+    guilty = (300, 20)
+
+    def shoot(pattern):
+        end, fired = 0, []
+        for delay, duration in pattern:
+            fired.append((end + delay, duration))
+            end += delay + duration
+        return OUTCOME.FAULT if guilty in fired else OUTCOME.NORMAL
+
+    tester = BatchTester(shoot, capacity=8)
+    outcomes = tester.run([(delay, 20) for delay in range(0, 800, 50)])
+    assert [c for c, o in outcomes.items() if o != OUTCOME.NORMAL] == [guilty]
+    assert not tester.unattributed
+
+
+def test_fault_not_reproduced_by_either_half_is_kept():
+    shots = iter([OUTCOME.RESET])  # Then normal on every retry
+    tester = BatchTester(lambda pattern: next(shots, OUTCOME.NORMAL), capacity=4)
+    candidates = [(0, 10), (20, 10), (40, 10), (60, 10)]
+    outcomes = tester.run(candidates)
+    assert all(outcomes[c] == OUTCOME.RESET for c in candidates)
+    assert tester.unattributed == set(candidates)
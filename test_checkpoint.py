@@ -0,0 +1,24 @@
+from checkpoint import Checkpoint, completed_counts
+from results import OUTCOME, ResultWriter
+
+
+def test_resume_counts_per_voltage(tmpdir):
+    path = str(tmpdir.join('results.bin'))
+    with ResultWriter(path) as results:
+        for outcome in (OUTCOME.NORMAL, OUTCOME.NORMAL, OUTCOME.FAULT):
+            results.write(-1.2, 100, 100, outcome)
+        results.write(-1.1, 100, 100, OUTCOME.RESET)
+        results.write(-1.1, 50, 100, OUTCOME.FAULT)  # Other delay
+    assert completed_counts(path, delay=100, duration=100) == {-1.2: [2, 1, 0, 0], -1.1: [0, 0, 0, 1]}
+    assert completed_counts(path)[-1.1] == [0, 1, 0, 1]
+    assert completed_counts(str(tmpdir.join('missing.bin'))) == {}
+
+
+def test_state_round_trip(tmpdir):
+    path = str(tmpdir.join('checkpoint.json'))
+    checkpoint = Checkpoint(path)
+    assert not checkpoint.exists()
+    checkpoint.state = {'results': 'results.bin', 'completed': False}
+    checkpoint.save()
+    checkpoint.update(completed=True)
+    assert Checkpoint(path).load() == {'results': 'results.bin', 'completed': True}
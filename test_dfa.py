@@ -0,0 +1,42 @@
+import numpy as np
+
+from aes128 import PINATA_KEY, START_AES_PLAINTEXT
+from dfa import BIT_FAULTS, KeyRecovery
+from faults import encrypt_batch, reference_ciphertext
+
+PLAINTEXT = np.frombuffer(START_AES_PLAINTEXT, dtype=np.uint8)
+
+
+def _byte_faults(rng, fault_round, n):
+    # Emulator fault model: one random byte XORed with 1..255
+    return encrypt_batch(PINATA_KEY, np.tile(PLAINTEXT, (n, 1)),
+                         (fault_round, rng.randint(0, 16, n), rng.randint(1, 256, n)))
+
+
+def test_recovers_key_from_byte_faults():
+    rng = np.random.RandomState(1)
+    faulty = np.concatenate([_byte_faults(rng, 9, 30), _byte_faults(rng, 10, 30), rng.randint(0, 256, (5, 16))])
+    with KeyRecovery() as dfa:
+        dfa.add_pairs(reference_ciphertext(), faulty)
+        assert dfa.entropy() == 0
+        assert dfa.key() == PINATA_KEY
+
+
+def test_pairs_outside_the_fault_model_are_outvoted():
+    rng = np.random.RandomState(2)
+    dfa = KeyRecovery(last_round_faults=BIT_FAULTS)
+    position = np.zeros(2, dtype=int)
+    dfa.add_pairs(reference_ciphertext(), encrypt_batch(PINATA_KEY, np.tile(PLAINTEXT, (2, 1)),
+                                                        (10, position, np.array([0x5a, 0x33]))))
+    n = 200
+    dfa.add_pairs(reference_ciphertext(), encrypt_batch(PINATA_KEY, np.tile(PLAINTEXT, (n, 1)),
+                                                        (10, rng.randint(0, 16, n), 1 << rng.randint(0, 8, n))))
+    assert dfa.key() == PINATA_KEY
+    assert dfa.single_counts()[1] == 2
+
+
+def test_contradiction_has_infinite_entropy():
+    dfa = KeyRecovery()
+    dfa.diagonals[0] = np.zeros(0, dtype=np.uint32)
+    assert dfa.entropy() == float('inf')
+    assert dfa.key() is None
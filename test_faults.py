@@ -0,0 +1,35 @@
+import numpy as np
+
+from aes128 import PINATA_KEY, START_AES_PLAINTEXT, encrypt
+from faults import DIAGONALS, FAULT_CLASS, classify_ciphertexts, encrypt_batch, reference_ciphertext
+
+PLAINTEXT = np.frombuffer(START_AES_PLAINTEXT, dtype=np.uint8)
+
+
+def test_batch_matches_reference_model():
+    fault = (9, np.array([0, 5]), np.array([0x01, 0xa5]))
+    ct = encrypt_batch(PINATA_KEY, np.tile(PLAINTEXT, (2, 1)), fault)
+    for row, byte, mask in zip(ct, fault[1], fault[2]):
+        assert bytes(bytearray(row)) == encrypt(PINATA_KEY, START_AES_PLAINTEXT, (9, int(byte), int(mask)))
+
+
+def test_classifies_known_faults():
+    reference = reference_ciphertext()
+    single = encrypt_batch(PINATA_KEY, PLAINTEXT, (10, np.array([7]), np.array([0x10])))
+    diagonal = encrypt_batch(PINATA_KEY, PLAINTEXT, (9, np.array([4]), np.array([0x33])))
+    multi = encrypt_batch(PINATA_KEY, PLAINTEXT, (8, np.array([0]), np.array([0x01])))
+    ct = np.concatenate([reference[None], single, diagonal, multi, reference[None]])
+    classes = classify_ciphertexts(ct, reference, responded=[True, True, True, True, False])
+    assert classes.tolist() == [FAULT_CLASS.CORRECT, FAULT_CLASS.SINGLE, FAULT_CLASS.DIAGONAL,
+                                FAULT_CLASS.MULTI, FAULT_CLASS.NONE]
+
+
+def test_round9_faults_hit_one_diagonal_each():
+    reference = reference_ciphertext()
+    hit = set()
+    for byte in range(16):
+        ct = encrypt_batch(PINATA_KEY, PLAINTEXT, (9, np.array([byte]), np.array([0x80])))[0]
+        changed = np.nonzero(ct != reference)[0].tolist()
+        assert changed in [sorted(d) for d in DIAGONALS]
+        hit.add(tuple(changed))
+    assert len(hit) == 4
@@ -0,0 +1,28 @@
+import os
+
+from results import HEADER, OUTCOME, RECORD, ResultWriter, load_results
+
+
+def test_reopen_truncates_torn_record(tmpdir):
+    path = str(tmpdir.join('results.bin'))
+    with ResultWriter(path) as results:
+        results.write(1.0, 100, 100, OUTCOME.NORMAL, b'\x11' * 16)
+        results.write(1.1, 100, 100, OUTCOME.FAULT, b'\x22' * 16)
+    with open(path, 'ab') as f:
+        f.write(b'\x00' * (RECORD.size // 2))  # Crash halfway through a record
+
+    with ResultWriter(path) as results:
+        assert os.path.getsize(path) == HEADER.size + 2 * RECORD.size
+        results.write(1.2, 100, 100, OUTCOME.MUTE)
+    records = load_results(path)
+    assert records['outcome'].tolist() == [OUTCOME.NORMAL, OUTCOME.FAULT, OUTCOME.MUTE]
+    assert records['voltage'].astype(float).round(3).tolist() == [1.0, 1.1, 1.2]
+    assert bytes(bytearray(records['ciphertext'][1])) == b'\x22' * 16
+
+
+def test_record_shot_classifies(tmpdir):
+    with ResultWriter(str(tmpdir.join('results.bin')), reference=b'\x11' * 16) as results:
+        assert results.record_shot(0.5, 0, 10, b'\x11' * 16) == OUTCOME.NORMAL
+        assert results.record_shot(0.5, 0, 10, b'\x12' * 16) == OUTCOME.FAULT
+        assert results.record_shot(0.5, 0, 10, b'\x11' * 3) == OUTCOME.MUTE
+        assert results.record_shot(0.5, 0, 10, None, reset=True) == OUTCOME.RESET
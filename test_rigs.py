@@ -0,0 +1,22 @@
+from aes128 import PINATA_KEY, START_AES_PLAINTEXT, encrypt
+from results import OUTCOME_NAMES, ResultWriter, load_results
+from rigs import RigScheduler, SimulatedRig
+
+REFERENCE = encrypt(PINATA_KEY, START_AES_PLAINTEXT)
+
+
+def test_straggler_is_reissued_and_failed_rig_replaced(tmpdir):
+    points = [{'glitch_voltage': 1.0, 'delay': 100, 'duration': 100} for _ in range(64)]
+    # The fast rig takes over the slow rig's chunks until it fails
+    rigs = [SimulatedRig('slow', seed=1, slowdown=0.05), SimulatedRig('failing', seed=2, slowdown=0.005, fail_after=40)]
+    scheduler = RigScheduler(rigs, START_AES_PLAINTEXT, REFERENCE, chunk_size=4, lease_timeout=0.05)
+    path = str(tmpdir.join('results.bin'))
+    with ResultWriter(path, REFERENCE) as writer:
+        outcomes = scheduler.run(points, writer)
+
+    assert all(outcome is not None for outcome in outcomes)
+    assert all(0 <= outcome < len(OUTCOME_NAMES) for outcome in outcomes)
+    assert len(load_results(path)) == len(points) and scheduler.unfinished == 0
+    assert scheduler.stats['failing'].failure is not None
+    assert scheduler.stats['slow'].wasted > 0
+    assert scheduler.reissued > 0
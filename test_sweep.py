@@ -0,0 +1,30 @@
+import numpy as np
+
+from results import OUTCOME
+from sweep import AdaptiveSweep
+
+
+def _step(voltage):
+    # Faults above 0.33 V only
+    return [0, 10, 0, 0] if voltage > 0.33 else [10, 0, 0, 0]
+
+
+def test_refines_on_the_min_step_grid():
+    sweep = AdaptiveSweep(start=0.0, stop=1.0, coarse_step=0.1, min_step=0.01, refine_faults=False)
+    sweep.run(_step)
+    voltages = np.array(sorted(sweep.points))
+    assert voltages[0] == 0.0 and voltages[-1] == 1.0
+    steps = np.round(np.diff(voltages) / 0.01, 6)
+    assert np.all(steps == np.round(steps)) and steps.min() == 1
+    # Refined down to min_step around the transition only
+    assert 0.33 in sweep.points and 0.34 in sweep.points
+    assert len(sweep.points) < sweep.fixed_grid_points()
+
+
+def test_flat_response_measures_the_coarse_grid_only():
+    sweep = AdaptiveSweep(start=-1.0, stop=1.0, coarse_step=0.1, min_step=0.01)
+    calls = []
+    sweep.run(lambda v: calls.append(v) or [1, 0, 0, 0])
+    assert calls == sweep.coarse_grid() and len(calls) == 21
+    voltages, counts = sweep.table()
+    assert counts[:, OUTCOME.NORMAL].tolist() == [1] * 21
@@ -0,0 +1,134 @@
+'''
+Span tracing of the shot pipeline.
+
+Spans are (name, start, end, thread) entries written into preallocated lists
+used as a ring buffer, so recording costs a few list stores and the newest
+capacity spans are kept. They export to the Chrome trace event format (open
+in chrome://tracing or ui.perfetto.dev) and to per-name percentile summaries.
+
+    tracer = Tracer()
+    with tracer.span('start_aes'):
+        ...
+    tracer.record('arm', t0, t1)  # From timestamps already taken
+    tracer.report()
+    tracer.export_chrome('glitch_trace.json')
+'''
+import json
+import os
+import threading
+import time
+
+try:
+    from threading import get_ident
+except ImportError:  # Python 2
+    from thread import get_ident
+
+from latency import LatencyHistogram
+
+
+class _Span(object):
+    __slots__ = ('tracer', 'name', 'start')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.tracer.record(self.name, self.start, time.time())
+
+
+class _NullSpan(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer(object):
+    """Ring buffer of timed spans"""
+
+    def __init__(self, capacity=1 << 16, enabled=True):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.names = [None] * capacity
+        self.starts = [0.0] * capacity
+        self.ends = [0.0] * capacity
+        self.threads = [0] * capacity
+        self.count = 0  # Spans recorded so far, the next one goes to count % capacity
+        self.origin = time.time()
+
+    def span(self, name):
+        """Context manager recording the time spent in its block"""
+        return _Span(self, name) if self.enabled else NULL_SPAN
+
+    def record(self, name, start, end):
+        if not self.enabled:
+            return
+        i = self.count % self.capacity
+        self.names[i] = name
+        self.starts[i] = start
+        self.ends[i] = end
+        self.threads[i] = get_ident()
+        self.count += 1
+
+    def dropped(self):
+        return max(self.count - self.capacity, 0)
+
+    def spans(self):
+        """Recorded (name, start, end, thread) tuples, oldest first"""
+        n = min(self.count, self.capacity)
+        first = self.count - n
+        return [(self.names[i % self.capacity], self.starts[i % self.capacity], self.ends[i % self.capacity],
+                 self.threads[i % self.capacity]) for i in range(first, self.count)]
+
+    def clear(self):
+        self.count = 0
+
+    def histograms(self):
+        """LatencyHistogram of every span name"""
+        histograms = {}
+        for name, start, end, _ in self.spans():
+            histogram = histograms.get(name)
+            if histogram is None:
+                histogram = histograms[name] = LatencyHistogram()
+            histogram.record(end - start)
+        return histograms
+
+    def chrome_events(self):
+        pid = os.getpid()
+        names = dict((t.ident, t.name) for t in threading.enumerate())
+        events = []
+        threads = set()
+        for name, start, end, thread in self.spans():
+            threads.add(thread)
+            events.append({'name': name, 'ph': 'X', 'pid': pid, 'tid': thread,
+                           'ts': (start - self.origin) * 1e6, 'dur': (end - start) * 1e6})
+        for thread in threads:
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread,
+                           'args': {'name': names.get(thread, str(thread))}})
+        return events
+
+    def export_chrome(self, path):
+        """Writes the spans as a Chrome trace / Perfetto JSON file"""
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.chrome_events(), 'displayTimeUnit': 'ms'}, f)
+
+    def report(self):
+        # Spans nest (a shot contains its phases), so totals are not additive
+        print("{:<28} {:>7} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+            "Span", "Count", "Mean [ms]", "p50 [ms]", "p90 [ms]", "p99 [ms]", "Max [ms]", "Total [s]"))
+        for name, h in sorted(self.histograms().items(), key=lambda item: -item[1].total):
+            print("{:<28} {:>7} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}".format(
+                name, h.count, h.mean() * 1e3, h.percentile(0.5) * 1e3, h.percentile(0.9) * 1e3,
+                h.percentile(0.99) * 1e3, h.max * 1e3, h.total))
+        if self.dropped():
+            print("{} older spans overwritten (ring buffer of {})".format(self.dropped(), self.capacity))
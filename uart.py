@@ -0,0 +1,140 @@
+'''
+Framed UART helpers for talking to the DUT.
+
+Multi-byte values are fetched with a single deadline-bounded read and decoded
+in one go instead of byte by byte with a sleep in between.
+'''
+import serial
+import struct
+import time
+
+# struct codes for the widths that have a native representation
+_STRUCT_CODES = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+# Every timeout change reconfigures the port, so read_exact keeps the port
+# timeout unless it is off from the remaining deadline by more than this
+READ_SLACK = 0.005
+
+
+class ReadTimeout(serial.SerialException):
+    """Raised when a framed read does not complete before its deadline"""
+
+    def __init__(self, expected, data):
+        serial.SerialException.__init__(self, "expected {} bytes, got {}".format(expected, len(data)))
+        self.expected = expected
+        self.data = data
+
+
+def read_exact(ser, n, timeout=1.0):
+    """Reads up to n bytes, returning early once all n arrived or the deadline passed"""
+    deadline = time.time() + timeout
+    old_timeout = current = ser.timeout
+    buf = bytearray()
+    try:
+        while len(buf) < n:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            if current is None or abs(current - remaining) > READ_SLACK:
+                current = ser.timeout = remaining
+            chunk = ser.read(n - len(buf))
+            if not chunk:
+                break
+            buf.extend(chunk)
+    finally:
+        if current != old_timeout:
+            ser.timeout = old_timeout
+    return bytes(buf)
+
+
+def decode_uint(data, byteorder='little'):
+    """Decodes an unsigned integer of any width"""
+    prefix = '<' if byteorder == 'little' else '>'
+    code = _STRUCT_CODES.get(len(data))
+    if code is not None:
+        return struct.unpack(prefix + code, data)[0]
+    value = 0
+    raw = bytearray(data)
+    if byteorder == 'little':
+        raw.reverse()
+    for b in raw:
+        value = (value << 8) | b
+    return value
+
+
+def decode_words(data, width, byteorder='little'):
+    """Decodes a buffer into a list of unsigned words of the given byte width"""
+    assert len(data) % width == 0
+    count = len(data) // width
+    code = _STRUCT_CODES.get(width)
+    if code is not None:
+        prefix = '<' if byteorder == 'little' else '>'
+        return list(struct.unpack(prefix + code * count, data))
+    return [decode_uint(data[i:i + width], byteorder) for i in range(0, len(data), width)]
+
+
+def read_uint(ser, width, timeout=1.0, byteorder='little'):
+    """Reads one unsigned integer of width bytes"""
+    data = read_exact(ser, width, timeout)
+    if len(data) < width:
+        raise ReadTimeout(width, data)
+    return decode_uint(data, byteorder)
+
+
+def read_words(ser, count, width=4, timeout=1.0, byteorder='little'):
+    """Reads an array of count unsigned words of width bytes each"""
+    n = count * width
+    data = read_exact(ser, n, timeout)
+    if len(data) < n:
+        raise ReadTimeout(n, data)
+    return decode_words(data, width, byteorder)
+
+
+class DutConnection(object):
+    """Keeps the DUT serial port open for a whole campaign"""
+
+    def __init__(self, port='COM4', baudrate=115200, timeout=0.2):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.ser = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def open(self):
+        if self.ser is None:
+            self.ser = serial.Serial(
+                port=self.port,
+                baudrate=self.baudrate,
+                bytesize=serial.EIGHTBITS,
+                parity=serial.PARITY_NONE,
+                stopbits=serial.STOPBITS_ONE,
+                timeout=self.timeout
+            )
+        return self.ser
+
+    def close(self):
+        if self.ser is not None:
+            self.ser.close()
+            self.ser = None
+
+    def flush(self):
+        """Drops stale bytes left over from a previous (possibly glitched) shot"""
+        ser = self.open()
+        if hasattr(ser, 'reset_input_buffer'):
+            ser.reset_input_buffer()
+        else:
+            ser.flushInput()  # pyserial < 3.0
+
+    def transact(self, cmd, n_response, timeout=None):
+        """Writes a command and waits for up to n_response bytes or the deadline"""
+        if timeout is None:
+            timeout = self.timeout
+        self.flush()
+        self.ser.write(bytes(bytearray(cmd)))
+        return read_exact(self.ser, n_response, timeout)
@@ -0,0 +1,84 @@
+'''
+Microbenchmark of the VC Glitcher ctypes call layer.
+
+Times the hot polling calls (evcg_busy, tvcg_read) and a pattern update
+through VCGlitcher, and the same calls made the way the wrapper used to make
+them: entry points without declared argtypes, and fresh ctypes arguments,
+byref() objects, out-parameters and read buffers on every call. Prints the
+mean per-call time of both.
+
+    python vcgbench.py [path/to/vcglitcher.dll | --sim] [calls]
+'''
+import sys
+import time
+from ctypes import CDLL, byref, c_char, c_int, c_uint
+
+from vcglitcher import VCGlitcher, VCGlitcherError, ERROR_MESSAGES, VCG_DLL_PATH
+
+
+def legacy_check_error(status):
+    # The old check_error built its message table inside the failure branch
+    if status > 0:
+        raise VCGlitcherError(dict(ERROR_MESSAGES).get(status, "Unknown error"), status)
+
+
+def legacy_busy(dll, device):
+    busy = c_int()
+    legacy_check_error(dll.vcg_evcg_busy(byref(device), byref(busy)))
+    return bool(busy.value)
+
+
+def legacy_read(dll, device, n_read=16):
+    n_readout = c_uint()
+    byte_array = bytearray(n_read)
+    address = (c_char * n_read).from_buffer(byte_array)
+    legacy_check_error(dll.vcg_tvcg_get_response(byref(device), byref(address), c_uint(n_read), byref(n_readout)))
+    return list(byte_array[:n_readout.value])
+
+
+def legacy_pattern(dll, device, delay=100, duration=100):
+    legacy_check_error(dll.vcg_evcg_clear_pattern(byref(device)))
+    legacy_check_error(dll.vcg_evcg_add_pattern_pair(byref(device), c_uint(delay), c_uint(duration)))
+
+
+def per_call(func, calls):
+    start = time.time()
+    for _ in range(calls):
+        func()
+    return (time.time() - start) / calls
+
+
+def run(make_dll, calls=100000):
+    """make_dll() returns a fresh backend; returns {name: (before, after)} in seconds per call"""
+    vcg = VCGlitcher(make_dll())
+    legacy = make_dll() if isinstance(vcg.vcg_dll, CDLL) else vcg.vcg_dll  # Separate, unbound handle
+    device = vcg.device
+    cases = [
+        ('evcg_busy', lambda: legacy_busy(legacy, device), vcg.evcg_busy),
+        ('tvcg_read', lambda: legacy_read(legacy, device), lambda: vcg.tvcg_read(16)),
+        ('pattern', lambda: legacy_pattern(legacy, device),
+         lambda: (vcg.evcg_clear_pattern(), vcg.evcg_add_pattern(100, 100))),
+    ]
+    timings = {}
+    for name, before, after in cases:
+        timings[name] = (per_call(before, calls), per_call(after, calls))
+    return timings
+
+
+def report(timings):
+    print("{:<12} {:>12} {:>12} {:>8}".format("call", "before [us]", "after [us]", "speedup"))
+    for name, (before, after) in sorted(timings.items()):
+        print("{:<12} {:>12.3f} {:>12.3f} {:>7.1f}x".format(
+            name, before * 1e6, after * 1e6, before / after if after else float('inf')))
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else VCG_DLL_PATH
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    if target == '--sim':
+        from vcgsim import VCGlitcherSim
+        sim = VCGlitcherSim()
+        sim.opened = True
+        report(run(lambda: sim, calls))
+    else:
+        report(run(lambda: CDLL(target), calls))
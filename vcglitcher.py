@@ -1,3 +1,4 @@
+import os
 import time
 from ctypes import *
 
@@ -15,9 +16,15 @@ SET = enum(CURRENT_LIM=4, TRIGGER_PWR_DOWN_EN=5, SW_PWR_DOWN=6, GLITCH_EN=7, TRI
 GET = enum(TRIGGER_IN=12, TX_FIFO_EMPTY=13)
 CLK = enum(SPEED_1MHZ=0, SPEED_2MHZ=1, SPEED_3MHZ=2, SPEED_4MHZ=3)
 
+# SDK library, overridden by the VCG_DLL_PATH environment variable or configure()
+VCG_DLL_PATH = os.environ.get("VCG_DLL_PATH",
+                              r"C:\Users\EMFI\Downloads\Riscure\Riscure\VC Glitcher SDK\lib\x64\vcglitcher.dll")
+_library = None
+
 class VCGlitcherError(Exception):
-   def __init__(self, value):
+   def __init__(self, value, status=None):
       self.value = value
+      self.status = status
    def __str__(self):
       return repr(self.value)
 
@@ -34,182 +41,316 @@ class vcg_device(Structure):
                 ("handle", c_void_p),
                 ("config_buffer", POINTER(c_ubyte))]
 
+ERROR_MESSAGES = {
+    1: "VC Glitcher could not be found.",
+    2: "VC Glitcher version not compatible wth this SDK.",
+    3: "USB communication error.",
+    4: "An invalid mode was specified.",
+    5: "An invalid memory address was specified.",
+    6: "An smart card FIFO access with invalid length was specified.",
+    7: "An invalid LCD line was specified.",
+    8: "An invalid smart card clock speed was specified.",
+    9: "An invalid pattern selection was specified.",
+   10: "An invalid pattern length was specified.",
+   11: "The Embedded Glitcher pattern buffer is full.",
+   12: "Invalid Embedded VC Glitcher delay or duration.",
+   13: "The accumulated delay overflows.",
+   14: "The accumulated duration overflows.",
+   15: "An invalid handle was specified.",
+   16: "An invalid glitch voltage was specified.",
+   17: "An invalid VCC voltage was specified.",
+   18: "An invalid clock voltage was specified.",
+   19: "An invalid clock high voltage was specified.",
+   20: "An invalid clock low voltage was specified.",
+   21: "An invalid laser voltage was specified.",
+   22: "An invalid VCC and clock voltage was specified.",
+   23: "An invalid offset voltage was specified.",
+   24: "An incalid current limit voltage was specified.",
+   25: "An invalid PWM channel was indexed.",
+   26: "An invalid PWM voltage was specified.",
+   27: "Operation failed.",
+   28: "Cannot create dump file.",
+   29: "Cannot create program array.",
+   30: "An invalid index of CPU register was specified.",
+   31: "An invalid shift length was specified.",
+   32: "The label has already been used.",
+   33: "An undefined label has been referred.",
+   34: "'END' instruction is missing.",
+   35: "An invalid immediate value was specified.",
+   36: "An invalid memory address was specified.",
+   37: "An invalid wait signal was specified.",
+   38: "An invalid set signal was specified.",
+   39: "An invalid get signal was specified.",
+   40: "The user memory is larger than the memory capacity.",
+   41: "The specified program is empty.",
+   42: "A NULL pointer is passed as argument.",
+   43: "VC Glitcher has already been opened.",
+   44: "VC Glitcher has not been opened.",
+   45: "Cannot add program while TVCG is active.",
+   46: "Cannot remove program while TVCG is active.",
+   47: "Timeout during TVCG operation.",
+}
+
 def check_error(status):
-   if(status > 0):
-      raise VCGlitcherError({
-         1: "VC Glitcher could not be found.",
-         2: "VC Glitcher version not compatible wth this SDK.",
-         3: "USB communication error.",
-         4: "An invalid mode was specified.",
-         5: "An invalid memory address was specified.",
-         6: "An smart card FIFO access with invalid length was specified.",
-         7: "An invalid LCD line was specified.",
-         8: "An invalid smart card clock speed was specified.",
-         9: "An invalid pattern selection was specified.",
-        10: "An invalid pattern length was specified.",
-        11: "The Embedded Glitcher pattern buffer is full.",
-        12: "Invalid Embedded VC Glitcher delay or duration.",
-        13: "The accumulated delay overflows.",
-        14: "The accumulated duration overflows.",
-        15: "An invalid handle was specified.",
-        16: "An invalid glitch voltage was specified.",
-        17: "An invalid VCC voltage was specified.",
-        18: "An invalid clock voltage was specified.",
-        19: "An invalid clock high voltage was specified.",
-        20: "An invalid clock low voltage was specified.",
-        21: "An invalid laser voltage was specified.",
-        22: "An invalid VCC and clock voltage was specified.",
-        23: "An invalid offset voltage was specified.",
-        24: "An incalid current limit voltage was specified.",
-        25: "An invalid PWM channel was indexed.",
-        26: "An invalid PWM voltage was specified.",
-        27: "Operation failed.",
-        28: "Cannot create dump file.",
-        29: "Cannot create program array.",
-        30: "An invalid index of CPU register was specified.",
-        31: "An invalid shift length was specified.",
-        32: "The label has already been used.",
-        33: "An undefined label has been referred.",
-        34: "'END' instruction is missing.",
-        35: "An invalid immediate value was specified.",
-        36: "An invalid memory address was specified.",
-        37: "An invalid wait signal was specified.",
-        38: "An invalid set signal was specified.",
-        39: "An invalid get signal was specified.",
-        40: "The user memory is larger than the memory capacity.",
-        41: "The specified program is empty.",
-        42: "A NULL pointer is passed as argument.",
-        43: "VC Glitcher has already been opened.",
-        44: "VC Glitcher has not been opened.",
-        45: "Cannot add program while TVCG is active.",
-        46: "Cannot remove program while TVCG is active.",
-        47: "Timeout during TVCG operation.",
-        }.get(status, "Unknown error"))
+   if status > 0:
+      raise VCGlitcherError(ERROR_MESSAGES.get(status, "Unknown error"), status)
+
+_DEVICE = POINTER(vcg_device)
+_BUFFER = c_void_p  # byref() of a c_char array
+
+# Declared signatures: (restype, argtypes) of every SDK entry point used here
+PROTOTYPES = {
+   'vcg_sdk_get_version': (c_char_p, []),
+   'vcg_sdk_is_snapshot_version': (c_int, []),
+   'vcg_device_list': (c_int, [POINTER(c_uint)]),
+   'vcg_device_get_info': (c_int, [_DEVICE, c_uint]),
+   'vcg_set_read_timeout': (c_int, [_DEVICE, c_uint]),
+   'vcg_set_write_timeout': (c_int, [_DEVICE, c_uint]),
+   'vcg_open': (c_int, [_DEVICE]),
+   'vcg_close': (c_int, [_DEVICE]),
+   'vcg_get_version': (c_int, [_DEVICE, c_char_p, c_uint]),
+   'vcg_set_mode': (c_int, [_DEVICE, c_int]),
+   'vcg_is_card_inserted': (c_int, [_DEVICE, POINTER(c_int)]),
+   'vcg_set_offset': (c_int, [_DEVICE, c_double]),
+   'vcg_set_current_limit': (c_int, [_DEVICE, c_double]),
+   'vcg_set_vcc_voltage': (c_int, [_DEVICE, c_double, c_double, c_double]),
+   'vcg_set_clk_voltage': (c_int, [_DEVICE, c_double, c_double, c_double, c_double]),
+   'vcg_set_laser_voltage': (c_int, [_DEVICE, c_double, c_double]),
+   'vcg_set_program': (c_int, [_DEVICE, c_void_p]),
+   'vcg_get_cpu_frequency': (c_int, [_DEVICE, POINTER(c_uint)]),
+   'vcg_start_cpu': (c_int, [_DEVICE]),
+   'vcg_stop_cpu': (c_int, [_DEVICE]),
+   'vcg_get_cpu_status': (c_int, [_DEVICE, POINTER(c_int)]),
+   'vcg_memory_get_size': (c_int, [_DEVICE, POINTER(c_uint)]),
+   'vcg_memory_write': (c_int, [_DEVICE, c_uint, c_uint]),
+   'vcg_memory_read': (c_int, [_DEVICE, c_uint, POINTER(c_uint)]),
+   'vcg_sc_write': (c_int, [_DEVICE, _BUFFER, c_uint]),
+   'vcg_sc_read': (c_int, [_DEVICE, _BUFFER, c_uint, POINTER(c_uint)]),
+   'vcg_set_sc_clock_speed': (c_int, [_DEVICE, c_int]),
+   'vcg_pattern_set': (c_int, [_DEVICE, _BUFFER, c_uint]),
+   'vcg_pattern_enable': (c_int, [_DEVICE]),
+   'vcg_pattern_disable': (c_int, [_DEVICE]),
+   'vcg_sc_reset_configuration': (c_int, [_DEVICE, c_uint, c_uint]),
+   'vcg_set_sc_soft_reset': (c_int, [_DEVICE, c_uint]),
+   'vcg_tvcg_enable_sync': (c_int, [_DEVICE, c_int]),
+   'vcg_tvcg_add_perturbation_program': (c_int, [_DEVICE, c_void_p]),
+   'vcg_tvcg_execute_direct': (c_int, [_DEVICE, c_void_p]),
+   'vcg_tvcg_powerup': (c_int, [_DEVICE]),
+   'vcg_tvcg_powerdown': (c_int, [_DEVICE]),
+   'vcg_tvcg_update_baudrate': (c_int, [_DEVICE, c_uint]),
+   'vcg_tvcg_reset_sc': (c_int, [_DEVICE]),
+   'vcg_tvcg_reset_sc_glitch': (c_int, [_DEVICE, c_uint, c_void_p]),
+   'vcg_tvcg_command': (c_int, [_DEVICE, _BUFFER, c_uint, c_uint, c_void_p]),
+   'vcg_tvcg_get_response': (c_int, [_DEVICE, _BUFFER, c_uint, POINTER(c_uint)]),
+   'vcg_tvcg_is_available': (c_int, [_DEVICE, POINTER(c_int)]),
+   'vcg_evcg_clear_pattern': (c_int, [_DEVICE]),
+   'vcg_evcg_add_pattern_pair': (c_int, [_DEVICE, c_uint, c_uint]),
+   'vcg_evcg_set_pattern': (c_int, [_DEVICE]),
+   'vcg_evcg_set_arm': (c_int, [_DEVICE, c_int]),
+   'vcg_evcg_trigger_configuration': (c_int, [_DEVICE, c_uint, c_uint]),
+   'vcg_evcg_soft_start': (c_int, [_DEVICE]),
+   'vcg_evcg_pd_en': (c_int, [_DEVICE, c_int]),
+   'vcg_evcg_get_guaranteed_pattern_number': (c_int, [_DEVICE, POINTER(c_uint)]),
+   'vcg_evcg_busy': (c_int, [_DEVICE, POINTER(c_int)]),
+   'vcg_evcg_is_available': (c_int, [_DEVICE, POINTER(c_int)]),
+   'vcg_evcg_add_glitch': (c_int, [_DEVICE, c_uint, c_uint, c_uint]),
+   'vcg_as_create_program': (c_void_p, []),
+   'vcg_as_destroy_program': (c_int, [c_void_p]),
+   'vcg_as_print_program': (c_int, [c_void_p]),
+   'vcg_as_check_program': (c_int, [c_void_p]),
+   'vcg_as_add_label': (c_int, [c_void_p, _BUFFER]),
+   'vcg_as_get_tx_incremental_value': (c_int, [c_int]),
+   'vcg_as_get_rx_incremental_value': (c_int, [c_int]),
+}
+for _name in ('nop', 'ret', 'counter_rst', 'backup', 'restore', 'end', 'sendq', 'sync'):
+   PROTOTYPES['vcg_as_' + _name] = (c_int, [c_void_p])
+for _name in ('jmpr', 'loadf', 'cmpz', 'waittime', 'counter_move', 'recvr', 'sendr'):
+   PROTOTYPES['vcg_as_' + _name] = (c_int, [c_void_p, c_int])
+for _name in ('loadr', 'storer', 'cmpeq', 'cmpgt', 'cmplt', 'cmpgte', 'cmplte', 'notr', 'get_signal'):
+   PROTOTYPES['vcg_as_' + _name] = (c_int, [c_void_p, c_int, c_int])
+for _name in ('addr', 'subr', 'xorr', 'andr', 'orr'):
+   PROTOTYPES['vcg_as_' + _name] = (c_int, [c_void_p, c_int, c_int, c_int])
+for _name in ('loadi', 'loadm', 'addi', 'subi', 'shiftl', 'shiftr'):
+   PROTOTYPES['vcg_as_' + _name] = (c_int, [c_void_p, c_int, c_uint])
+for _name in ('jmp', 'branch0', 'branch1'):
+   PROTOTYPES['vcg_as_' + _name] = (c_int, [c_void_p, _BUFFER])
+PROTOTYPES['vcg_as_storem'] = (c_int, [c_void_p, c_uint, c_int])
+PROTOTYPES['vcg_as_waitsignal'] = (c_int, [c_void_p, c_int, c_byte])
+PROTOTYPES['vcg_as_set_signal'] = (c_int, [c_void_p, c_int, c_byte])
+PROTOTYPES['vcg_as_sendi'] = (c_int, [c_void_p, c_byte])
+PROTOTYPES['vcg_as_txconfig'] = (c_int, [c_void_p, c_int, c_byte, c_byte])
+PROTOTYPES['vcg_as_rxconfig'] = (c_int, [c_void_p, c_int, c_byte, c_byte])
+
+# Shot and polling path entry points are called with ready-made byref()
+# objects and small ints only. ctypes converts every argument through
+# from_param when argtypes are declared, which costs more than the call
+# itself, so these keep only their restype.
+UNCHECKED = (
+   'vcg_evcg_busy', 'vcg_evcg_is_available', 'vcg_evcg_clear_pattern', 'vcg_evcg_add_pattern_pair',
+   'vcg_evcg_set_pattern', 'vcg_evcg_set_arm', 'vcg_evcg_soft_start', 'vcg_tvcg_get_response',
+   'vcg_tvcg_is_available', 'vcg_sc_read',
+)
+
+def bind(dll):
+   """Declares restype and argtypes of every known entry point of a loaded SDK library, once"""
+   if isinstance(dll, CDLL) and not getattr(dll, '_vcg_bound', False):
+      for name, (restype, argtypes) in PROTOTYPES.items():
+         try:
+            func = getattr(dll, name)
+         except AttributeError:
+            continue  # Not exported by this SDK version
+         func.restype = restype
+         if name not in UNCHECKED:
+            func.argtypes = argtypes
+      dll._vcg_bound = True
+   return dll
+
+def configure(path):
+   """Sets the SDK library path, before the library is first used"""
+   global VCG_DLL_PATH
+   if _library is not None and path != VCG_DLL_PATH:
+      raise VCGlitcherError("SDK library already loaded from {}".format(VCG_DLL_PATH))
+   VCG_DLL_PATH = path
+
+def load_library():
+   """Returns the process-wide SDK library, loaded and bound on first use"""
+   global _library
+   if _library is None:
+      _library = bind(CDLL(VCG_DLL_PATH))
+   return _library
+
+def version_tuple(version):
+   """Numeric release parts of a version string, '2.1-0' -> (2, 1)"""
+   parts = []
+   for part in version.split('-')[0].split('.'):
+      if not part.isdigit():
+         break
+      parts.append(int(part))
+   return tuple(parts)
  
 class VCGlitcher:
    """VC Glitcher python implementation"""
 
    wrapper_version = "2.0"
 
-   def __init__(self):
-      self.vcg_dll = CDLL(r"C:\Users\EMFI\Downloads\Riscure\Riscure\VC Glitcher SDK\lib\x64\vcglitcher.dll")
+   def __init__(self, dll=None):
+      # dll selects the backend: the shared SDK library by default, or any
+      # object exposing the same vcg_* entry points (e.g. vcgsim.VCGlitcherSim)
+      self.vcg_dll = bind(dll) if dll is not None else load_library()
       self.device = vcg_device()
-      #if self.__class__.wrapper_version > version_parts[0]:
-      if self.__class__.wrapper_version > self.sdk_get_version():
-      #if( self.__class__.wrapper_version > self.sdk_get_version()[0].split('-')[0] ):
-         print '[WARNING]Wrapper version newer than the VC Glitcher SDK library'
+      self.device_ref = byref(self.device)
+      # Out-parameters and read buffer reused by every call
+      self._uint = c_uint()
+      self._uint_ref = byref(self._uint)
+      self._int = c_int()
+      self._int_ref = byref(self._int)
+      self._read_buffer = bytearray(2048)
+      self._read_ref = byref((c_char * 2048).from_buffer(self._read_buffer))
+      # Versions are compared once per library, not per object
+      if not getattr(self.vcg_dll, '_vcg_version_checked', False):
+         self.vcg_dll._vcg_version_checked = True
+         if not self.check_version():
+            print('[WARNING]Wrapper version newer than the VC Glitcher SDK library')
 
    def check_version(self):
-         version_raw = self.sdk_get_version()  # Make sure this is within the class
-         version_string = version_raw.decode('utf-8')
-         version_parts = version_string.split('-')
-         if self.wrapper_version > version_raw:  # Comparison logic
-             print("Version check passed.")
-         else:
-             print("Version check failed.")
-             print(version_parts)
+      """True unless the wrapper is newer than the SDK library"""
+      return version_tuple(self.wrapper_version) <= version_tuple(self.sdk_get_version())
 
    def device_list(self):
-      count = c_uint()
-      check_error(self.vcg_dll.vcg_device_list(byref(count)))
-      return count.value
+      check_error(self.vcg_dll.vcg_device_list(self._uint_ref))
+      return self._uint.value
 
    def device_get_info(self, index):
       assert isinstance(index, int)
-      check_error(self.vcg_dll.vcg_device_get_info(byref(self.device), c_uint(index)))
+      check_error(self.vcg_dll.vcg_device_get_info(self.device_ref, index))
       return 
 
    def set_read_timeout(self, timeout):
       assert isinstance(timeout, int)
-      check_error(self.vcg_dll.vcg_set_read_timeout(byref(self.device), c_uint(timeout)))
+      check_error(self.vcg_dll.vcg_set_read_timeout(self.device_ref, timeout))
 
    def set_write_timeout(self, timeout):
       assert isinstance(timeout, int)
-      check_error(self.vcg_dll.vcg_set_write_timeout(byref(self.device), c_uint(timeout)))
+      check_error(self.vcg_dll.vcg_set_write_timeout(self.device_ref, timeout))
 
    def open(self):
-      check_error(self.vcg_dll.vcg_open(byref(self.device)))
+      check_error(self.vcg_dll.vcg_open(self.device_ref))
 
    def get_version(self):
-      version_buffer = c_char_p("xx.yy.zz")
-      check_error(self.vcg_dll.vcg_get_version(byref(self.device), version_buffer, 9))
-      return version_buffer.value.split('.')
+      version_buffer = create_string_buffer(9)
+      check_error(self.vcg_dll.vcg_get_version(self.device_ref, version_buffer, 9))
+      return version_buffer.value.decode('ascii').split('.')
       
 
    def get_serial_number(self):
-      return str(bytearray(self.device.serialNumber)).split('\x00')[0]
+      return bytearray(self.device.serialNumber).split(b'\x00')[0].decode('ascii')
 
    def set_mode(self, mode):
       assert isinstance(mode, int)
-      check_error(self.vcg_dll.vcg_set_mode(byref(self.device), c_int(mode)))
+      check_error(self.vcg_dll.vcg_set_mode(self.device_ref, mode))
       return mode
 
    def is_card_inserted(self):
-      inserted = c_int()
-      check_error(self.vcg_dll.vcg_is_card_inserted(byref(self.device), byref(inserted)))
-      return bool(inserted.value)
+      check_error(self.vcg_dll.vcg_is_card_inserted(self.device_ref, self._int_ref))
+      return bool(self._int.value)
 
    def set_offset(self, v_offset):
       assert (isinstance(v_offset, float) or isinstance(v_offset, int))
-      check_error(self.vcg_dll.vcg_set_offset(byref(self.device), c_double(v_offset)))
+      check_error(self.vcg_dll.vcg_set_offset(self.device_ref, v_offset))
 
    def set_current_limit(self, v_limit):
       assert (isinstance(v_limit, float) or isinstance(v_limit, int))
-      check_error(self.vcg_dll.vcg_set_current_limit(byref(self.device), c_double(v_limit)))
+      check_error(self.vcg_dll.vcg_set_current_limit(self.device_ref, v_limit))
 
    def set_vcc_glitch_parameter(self, v_vcc, v_clk, v_glitch):
       assert (isinstance(v_vcc, float) or isinstance(v_vcc, int))
       assert (isinstance(v_clk, float) or isinstance(v_clk, int))
       assert (isinstance(v_glitch, float) or isinstance(v_glitch, int))
-      check_error(self.vcg_dll.vcg_set_vcc_voltage(byref(self.device), c_double(v_vcc), c_double(v_glitch), c_double(v_clk)))
+      check_error(self.vcg_dll.vcg_set_vcc_voltage(self.device_ref, v_vcc, v_glitch, v_clk))
 
    def set_clk_glitch_parameter(self, v_vcc, v_clk_hi, v_clk_lo, v_glitch):
       assert (isinstance(v_vcc, float) or isinstance(v_vcc, int))
       assert (isinstance(v_clk_hi, float) or isinstance(v_clk_hi, int))
       assert (isinstance(v_clk_lo, float) or isinstance(v_clk_lo, int))
       assert (isinstance(v_glitch, float) or isinstance(v_glitch, int))
-      check_error(self.vcg_dll.vcg_set_clk_voltage(byref(self.device), c_double(v_clk_hi), c_double(v_clk_lo), c_double(v_glitch), c_double(v_vcc)))
+      check_error(self.vcg_dll.vcg_set_clk_voltage(self.device_ref, v_clk_hi, v_clk_lo, v_glitch, v_vcc))
 
    def set_laser_glitch_parameter(self, v_amplitude, v_vcc_clk):
       assert (isinstance(v_amplitude, float) or isinstance(v_amplitude, int))
       assert (isinstance(v_vcc_clk, float) or isinstance(v_vcc_clk, int))
-      check_error(self.vcg_dll.vcg_set_laser_voltage(byref(self.device), c_double(v_amplitude), c_double(v_vcc_clk)))
+      check_error(self.vcg_dll.vcg_set_laser_voltage(self.device_ref, v_amplitude, v_vcc_clk))
 
    def set_program(self, vcg_program):
       assert (isinstance(vcg_program, VCGlitcherProgram))
-      check_error(self.vcg_dll.vcg_set_program(byref(self.device), vcg_program.get_handle()))
+      check_error(self.vcg_dll.vcg_set_program(self.device_ref, vcg_program.get_handle()))
 
    def cpu_get_speed(self):
-      cpu_speed = c_uint()
-      check_error(self.vcg_dll.vcg_get_cpu_frequency(byref(self.device),byref(cpu_speed)))
-      return int(cpu_speed.value)
+      check_error(self.vcg_dll.vcg_get_cpu_frequency(self.device_ref, self._uint_ref))
+      return int(self._uint.value)
 
    def cpu_start(self):
-      check_error(self.vcg_dll.vcg_start_cpu(byref(self.device)))
+      check_error(self.vcg_dll.vcg_start_cpu(self.device_ref))
 
    def cpu_stop(self):
-      check_error(self.vcg_dll.vcg_stop_cpu(byref(self.device)))
+      check_error(self.vcg_dll.vcg_stop_cpu(self.device_ref))
 
    def is_cpu_stopped(self):
-      status = c_int()
-      check_error(self.vcg_dll.vcg_get_cpu_status(byref(self.device), byref(status)))
-      return bool(status.value)
+      check_error(self.vcg_dll.vcg_get_cpu_status(self.device_ref, self._int_ref))
+      return bool(self._int.value)
 
    def memory_get_size(self):
-      size = c_uint()
-      check_error(self.vcg_dll.vcg_memory_get_size(byref(self.device), byref(size)))
-      return size.value
+      check_error(self.vcg_dll.vcg_memory_get_size(self.device_ref, self._uint_ref))
+      return self._uint.value
 
    def memory_write(self, address, data):
       assert (isinstance(address, int))
       assert (isinstance(data, int))
-      check_error(self.vcg_dll.vcg_memory_write(byref(self.device), c_uint(address), c_uint(data)))
+      check_error(self.vcg_dll.vcg_memory_write(self.device_ref, address, data))
 
    def memory_read(self, address):
       assert (isinstance(address, int))
-      data = c_uint()
-      check_error(self.vcg_dll.vcg_memory_read(byref(self.device), c_uint(address), byref(data)))
-      return data.value
+      check_error(self.vcg_dll.vcg_memory_read(self.device_ref, address, self._uint_ref))
+      return self._uint.value
 
    def smartcard_fifo_write(self, data):
       assert (isinstance(data, list))
@@ -217,24 +358,24 @@ class VCGlitcher:
       byte_array = bytearray(data)
       cbuff = c_char * len(data)
       address = cbuff.from_buffer(byte_array)
-      check_error(self.vcg_dll.vcg_sc_write(byref(self.device), byref(address), c_uint(len(data))))
+      check_error(self.vcg_dll.vcg_sc_write(self.device_ref, byref(address), c_uint(len(data))))
+
+   def _read_target(self, n_read):
+      # Reads of up to 2048 bytes (0 = whatever is available) reuse one buffer
+      if n_read <= len(self._read_buffer):
+         return self._read_buffer, self._read_ref
+      byte_array = bytearray(n_read)
+      return byte_array, byref((c_char * n_read).from_buffer(byte_array))
 
    def smartcard_fifo_read(self, n_read):
       assert (isinstance(n_read, int))
-      n_readout = c_uint()
-      if(n_read == 0):
-         buffer_len = 2048
-      else:
-         buffer_len = n_read
-      byte_array = bytearray(buffer_len)
-      cbuff = c_char * buffer_len
-      address = cbuff.from_buffer(byte_array)
-      check_error(self.vcg_dll.vcg_sc_read(byref(self.device), byref(address), c_uint(n_read), byref(n_readout)))
-      return list(byte_array[:n_readout.value])
+      byte_array, address = self._read_target(n_read)
+      check_error(self.vcg_dll.vcg_sc_read(self.device_ref, address, n_read, self._uint_ref))
+      return list(byte_array[:self._uint.value])
 
    def smartcard_set_clock_speed(self, clk_speed):
       assert (isinstance(clk_speed, int))
-      check_error(self.vcg_dll.vcg_set_sc_clock_speed(byref(self.device), c_int(clk_speed)))
+      check_error(self.vcg_dll.vcg_set_sc_clock_speed(self.device_ref, clk_speed))
 
    def pattern_load(self, pattern):
       assert (isinstance(pattern, list))
@@ -242,29 +383,32 @@ class VCGlitcher:
       byte_array = bytearray(pattern)
       cbuff = c_char * len(pattern)
       address = cbuff.from_buffer(byte_array)
-      r = check_error(self.vcg_dll.vcg_pattern_set(byref(self.device), byref(address), c_uint(len(pattern))))
+      r = check_error(self.vcg_dll.vcg_pattern_set(self.device_ref, byref(address), c_uint(len(pattern))))
       if r == None:
          return "pattern loaded successfully"
 
    def pattern_enable(self):
-      check_error(self.vcg_dll.vcg_pattern_enable(byref(self.device)))
+      check_error(self.vcg_dll.vcg_pattern_enable(self.device_ref))
 
    def pattern_disable(self):
-      check_error(self.vcg_dll.vcg_pattern_disable(byref(self.device)))
+      check_error(self.vcg_dll.vcg_pattern_disable(self.device_ref))
 
    def smartcard_reset_config(self, src, polarity):
-      check_error(self.vcg_dll.vcg_sc_reset_configuration(byref(self.device), c_uint(src), c_uint(polarity)))
+      check_error(self.vcg_dll.vcg_sc_reset_configuration(self.device_ref, src, polarity))
 
    def set_smartcard_soft_reset(self, value):
       assert isinstance(value, int)
-      check_error(self.vcg_dll.vcg_set_sc_soft_reset(byref(self.device), c_uint(value)))
+      check_error(self.vcg_dll.vcg_set_sc_soft_reset(self.device_ref, value))
 
    def sdk_get_version(self):
       #ret = c_char_p(self.vcg_dll.vcg_sdk_get_version())
       ret = self.vcg_dll.vcg_sdk_get_version()
       if isinstance(ret, int):
          return str(ret)  # Convert to string if it's an integer
-      return ret.value
+      ret = getattr(ret, 'value', ret)  # Bound restype c_char_p already returns the bytes
+      if isinstance(ret, bytes) and not isinstance(ret, str):
+         return ret.decode('ascii')  # Python 3 returns bytes
+      return ret
 
 
     # Your logic here    
@@ -276,40 +420,40 @@ class VCGlitcher:
       return bool(ret)
 
    def close(self):
-      check_error(self.vcg_dll.vcg_close(byref(self.device)))
+      check_error(self.vcg_dll.vcg_close(self.device_ref))
 
    '''
    >>>Transparent VC Glitcher API functions<<<
    '''
    def tvcg_sync_enable(self, enabled):
       assert isinstance(enabled, bool)
-      check_error(self.vcg_dll.vcg_tvcg_enable_sync(byref(self.device), c_int(enabled)))
+      check_error(self.vcg_dll.vcg_tvcg_enable_sync(self.device_ref, enabled))
 
    def tvcg_add_program(self, vcg_program):
       assert isinstance(vcg_program, VCGlitcherProgram)
-      check_error(self.vcg_dll.vcg_tvcg_add_perturbation_program(byref(self.device), vcg_program.get_handle()))
+      check_error(self.vcg_dll.vcg_tvcg_add_perturbation_program(self.device_ref, vcg_program.get_handle()))
 
    def tvcg_execute_direct(self, vcg_program):
       assert isinstance(vcg_program, VCGlitcherProgram)
-      check_error(self.vcg_dll.vcg_tvcg_execute_direct(byref(self.device), vcg_program.get_handle()))
+      check_error(self.vcg_dll.vcg_tvcg_execute_direct(self.device_ref, vcg_program.get_handle()))
 
    def tvcg_start(self):
-      check_error(self.vcg_dll.vcg_tvcg_powerup(byref(self.device)))
+      check_error(self.vcg_dll.vcg_tvcg_powerup(self.device_ref))
 
    def tvcg_stop(self):
-      check_error(self.vcg_dll.vcg_tvcg_powerdown(byref(self.device)))
+      check_error(self.vcg_dll.vcg_tvcg_powerdown(self.device_ref))
 
    def tvcg_smartcard_baudrate_update(self, baudrate):
       assert isinstance(baudrate, int)
-      check_error(self.vcg_dll.vcg_tvcg_update_baudrate(byref(self.device), c_uint(baudrate)))
+      check_error(self.vcg_dll.vcg_tvcg_update_baudrate(self.device_ref, baudrate))
 
    def tvcg_smartcard_reset(self):
-      check_error(self.vcg_dll.vcg_tvcg_reset_sc(byref(self.device)))
+      check_error(self.vcg_dll.vcg_tvcg_reset_sc(self.device_ref))
 
    def tvcg_smartcard_reset_glitch(self, n_wait, vcg_program):
       assert isinstance(n_wait, int)
       assert isinstance(vcg_program, VCGlitcherProgram)
-      check_error(self.vcg_dll.vcg_tvcg_reset_sc_glitch(byref(self.device), c_uint(n_wait), vcg_program.get_handle()))
+      check_error(self.vcg_dll.vcg_tvcg_reset_sc_glitch(self.device_ref, n_wait, vcg_program.get_handle()))
 
    def tvcg_write(self, data, n_wait, vcg_program):
       assert isinstance(data, list)
@@ -319,90 +463,84 @@ class VCGlitcher:
       byte_array = bytearray(data)
       cbuff = c_char * len(data)
       address = cbuff.from_buffer(byte_array)
-      f = check_error(self.vcg_dll.vcg_tvcg_command(byref(self.device), byref(address), c_uint(len(data)), c_uint(n_wait), vcg_program.get_handle()))
+      f = check_error(self.vcg_dll.vcg_tvcg_command(self.device_ref, byref(address), c_uint(len(data)), n_wait, vcg_program.get_handle()))
       return f
 
    def tvcg_read(self, n_read):
       assert isinstance(n_read, int)
-      if( n_read == 0 ):
-         bufflen = 2048
-      else:
-         bufflen = n_read
-      n_readout = c_uint()
-      byte_array = bytearray(bufflen)
-      cbuff = c_char * bufflen
-      address = cbuff.from_buffer(byte_array)
-      check_error(self.vcg_dll.vcg_tvcg_get_response(byref(self.device), byref(address), c_uint(n_read), byref(n_readout)))
-      return list(byte_array[:n_readout.value])
+      byte_array, address = self._read_target(n_read)
+      check_error(self.vcg_dll.vcg_tvcg_get_response(self.device_ref, address, n_read, self._uint_ref))
+      return list(byte_array[:self._uint.value])
 
    def tvcg_available(self):
-      available = c_int()
-      check_error(self.vcg_dll.vcg_tvcg_is_available(byref(self.device), byref(available)))
-      return bool(available.value)
+      check_error(self.vcg_dll.vcg_tvcg_is_available(self.device_ref, self._int_ref))
+      return bool(self._int.value)
 
    '''
    >>>Embedded VC Glitcher API functions<<<
    '''
    def evcg_clear_pattern(self):
-      check_error(self.vcg_dll.vcg_evcg_clear_pattern(byref(self.device)))
+      check_error(self.vcg_dll.vcg_evcg_clear_pattern(self.device_ref))
 
    def evcg_add_pattern(self, delay, duration):
       assert (isinstance(delay, int) and isinstance(duration, int))
-      check_error(self.vcg_dll.vcg_evcg_add_pattern_pair(byref(self.device), c_uint(delay), c_uint(duration)))
+      check_error(self.vcg_dll.vcg_evcg_add_pattern_pair(self.device_ref, delay, duration))
 
    def evcg_set_pattern(self):
-      check_error(self.vcg_dll.vcg_evcg_set_pattern(byref(self.device)))
+      check_error(self.vcg_dll.vcg_evcg_set_pattern(self.device_ref))
 
    def evcg_set_arm(self, armed):
       assert isinstance(armed, bool)
-      check_error(self.vcg_dll.vcg_evcg_set_arm(byref(self.device), c_int(armed)))
+      check_error(self.vcg_dll.vcg_evcg_set_arm(self.device_ref, armed))
 
    def evcg_trigger_config(self, src, edge):
-      stat = check_error(self.vcg_dll.vcg_evcg_trigger_configuration(byref(self.device), c_uint(src), c_uint(edge)))
+      stat = check_error(self.vcg_dll.vcg_evcg_trigger_configuration(self.device_ref, src, edge))
       return src
 
    def evcg_soft_start(self):
       try:
-         check_error(self.vcg_dll.vcg_evcg_soft_start(byref(self.device)))
+         check_error(self.vcg_dll.vcg_evcg_soft_start(self.device_ref))
          return True  # Success
       except Exception as e:
-        print "Failed to start glitch:", e  
+        print("Failed to start glitch: {}".format(e))
         return False  
 
    def evcg_power_down_en(self, enabled):
       assert isinstance(enabled, bool)
-      check_error(self.vcg_dll.vcg_evcg_pd_en(byref(self.device), c_int(enabled)))
+      check_error(self.vcg_dll.vcg_evcg_pd_en(self.device_ref, enabled))
 
    def evcg_get_guaranteed_pattern_number(self):
-      n_pattern = c_uint()
-      check_error(self.vcg_dll.vcg_evcg_get_guaranteed_pattern_number(byref(self.device), byref(n_pattern)))
-      return n_pattern.value
+      check_error(self.vcg_dll.vcg_evcg_get_guaranteed_pattern_number(self.device_ref, self._uint_ref))
+      return self._uint.value
 
    def evcg_busy(self):
-      busy = c_int()
-      check_error(self.vcg_dll.vcg_evcg_busy(byref(self.device), byref(busy)))
-      return bool(busy.value)
+      check_error(self.vcg_dll.vcg_evcg_busy(self.device_ref, self._int_ref))
+      return bool(self._int.value)
 
    def evcg_is_available(self):
-      ret = c_int()
-      check_error(self.vcg_dll.vcg_evcg_is_available(byref(self.device), byref(ret)))
-      return bool(ret.value)
+      check_error(self.vcg_dll.vcg_evcg_is_available(self.device_ref, self._int_ref))
+      return bool(self._int.value)
 
    def evcg_add_glitch(self, g_delay, g_length, g_repeat):
-      check_error(self.vcg_dll.vcg_evcg_add_glitch(byref(self.device), c_uint(g_delay), c_uint(g_length), c_uint(g_repeat)))
+      check_error(self.vcg_dll.vcg_evcg_add_glitch(self.device_ref, g_delay, g_length, g_repeat))
       return [g_delay, g_length, g_repeat]
 
 class VCGlitcherProgram:
    """VC Glitcher program implementation"""
 
-   def __init__(self):
-      self.vcg_dll = CDLL(r"C:\Users\EMFI\Downloads\Riscure\Riscure\VC Glitcher SDK\lib\x64\vcglitcher.dll")
+   def __init__(self, dll=None):
+      self.vcg_dll = bind(dll) if dll is not None else load_library()
       self.handle = c_void_p(self.vcg_dll.vcg_as_create_program())
 
    def renew(self):
       check_error(self.vcg_dll.vcg_as_destroy_program(self.handle))
       self.handle = c_void_p(self.vcg_dll.vcg_as_create_program())
 
+   def destroy(self):
+      if self.handle is not None:
+         check_error(self.vcg_dll.vcg_as_destroy_program(self.handle))
+         self.handle = None
+
    def get_handle(self):
       return self.handle
 
@@ -414,14 +552,14 @@ class VCGlitcherProgram:
 
    def add_label(self, label):
       assert isinstance(label,str)
-      cbuff = create_string_buffer(label)
+      cbuff = create_string_buffer(label.encode('ascii'))
       check_error(self.vcg_dll.vcg_as_add_label(self.handle, byref(cbuff)))
 
    def nop(self):
       check_error(self.vcg_dll.vcg_as_nop(self.handle))
 
    def jmpr(self, rj):
-      check_error(self.vcg_dll.vcg_as_jmpr(self.handle, c_int(rj)))
+      check_error(self.vcg_dll.vcg_as_jmpr(self.handle, rj))
 
    def ret(self):
       check_error(self.vcg_dll.vcg_as_ret(self.handle))
@@ -429,104 +567,104 @@ class VCGlitcherProgram:
    def loadi(self, rd, data):
       assert isinstance(rd, int)
       assert isinstance(data, int)
-      check_error(self.vcg_dll.vcg_as_loadi(self.handle, c_int(rd), c_uint(data)))
+      check_error(self.vcg_dll.vcg_as_loadi(self.handle, rd, data))
 
    def loadm(self, rd, address):
       assert isinstance(rd, int)
       assert isinstance(address, int)
-      check_error(self.vcg_dll.vcg_as_loadm(self.handle, c_int(rd), c_uint(address)))
+      check_error(self.vcg_dll.vcg_as_loadm(self.handle, rd, address))
 
    def storem(self, address, rs):
       assert isinstance(address, int)
       assert isinstance(rs, int)
-      check_error(self.vcg_dll.vcg_as_storem(self.handle, c_uint(address), c_int(rs)))
+      check_error(self.vcg_dll.vcg_as_storem(self.handle, address, rs))
 
    def loadr(self, rd, rs):
       assert isinstance(rd, int)
       assert isinstance(rs, int)
-      check_error(self.vcg_dll.vcg_as_loadr(self.handle, c_int(rd), c_int(rs)))
+      check_error(self.vcg_dll.vcg_as_loadr(self.handle, rd, rs))
 
    def loadf(self, rd):
       assert isinstance(rd, int)
-      check_error(self.vcg_dll.vcg_as_loadf(self.handle, c_int(rd)))
+      check_error(self.vcg_dll.vcg_as_loadf(self.handle, rd))
 
    def storer(self, rd, rs):
       assert isinstance(rd, int)
       assert isinstance(rs, int)
-      check_error(self.vcg_dll.vcg_as_storer(self.handle, c_int(rd), c_int(rs)))
+      check_error(self.vcg_dll.vcg_as_storer(self.handle, rd, rs))
 
    def addi(self, rd, data):
       assert isinstance(rd, int)
       assert isinstance(data, int)
-      check_error(self.vcg_dll.vcg_as_addi(self.handle, c_int(rd), c_uint(data)))
+      check_error(self.vcg_dll.vcg_as_addi(self.handle, rd, data))
 
    def subi(self, rd, data):
       assert isinstance(rd, int)
       assert isinstance(data, int)
-      check_error(self.vcg_dll.vcg_as_subi(self.handle, c_int(rd), c_uint(data)))
+      check_error(self.vcg_dll.vcg_as_subi(self.handle, rd, data))
 
    def shiftl(self, rd, shift):
       assert isinstance(rd, int)
       assert isinstance(shift, int)
-      check_error(self.vcg_dll.vcg_as_shiftl(self.handle, c_int(rd), c_uint(shift)))
+      check_error(self.vcg_dll.vcg_as_shiftl(self.handle, rd, shift))
 
    def shiftr(self, rd, shift):
       assert isinstance(rd, int)
       assert isinstance(shift, int)
-      check_error(self.vcg_dll.vcg_as_shiftr(self.handle, c_int(rd), c_uint(shift)))
+      check_error(self.vcg_dll.vcg_as_shiftr(self.handle, rd, shift))
 
    def jmp(self, label):
       assert isinstance(label, str)
-      cbuff = create_string_buffer(label)
+      cbuff = create_string_buffer(label.encode('ascii'))
       check_error(self.vcg_dll.vcg_as_jmp(self.handle, byref(cbuff)))
 
    def cmpeq(self, ra, rb):
       assert isinstance(ra, int)
       assert isinstance(rb, int)
-      check_error(self.vcg_dll.vcg_as_cmpeq(self.handle, c_int(ra), c_int(rb)))
+      check_error(self.vcg_dll.vcg_as_cmpeq(self.handle, ra, rb))
 
    def cmpgt(self, ra, rb):
       assert isinstance(ra, int)
       assert isinstance(rb, int)
-      check_error(self.vcg_dll.vcg_as_cmpgt(self.handle, c_int(ra), c_int(rb)))
+      check_error(self.vcg_dll.vcg_as_cmpgt(self.handle, ra, rb))
 
    def cmplt(self, ra, rb):
       assert isinstance(ra, int)
       assert isinstance(rb, int)
-      check_error(self.vcg_dll.vcg_as_cmplt(self.handle, c_int(ra), c_int(rb)))
+      check_error(self.vcg_dll.vcg_as_cmplt(self.handle, ra, rb))
 
    def cmpgte(self, ra, rb):
       assert isinstance(ra, int)
       assert isinstance(rb, int)
-      check_error(self.vcg_dll.vcg_as_cmpgte(self.handle, c_int(ra), c_int(rb)))
+      check_error(self.vcg_dll.vcg_as_cmpgte(self.handle, ra, rb))
 
    def cmplte(self, ra, rb):
       assert isinstance(ra, int)
       assert isinstance(rb, int)
-      check_error(self.vcg_dll.vcg_as_cmplte(self.handle, c_int(ra), c_int(rb)))
+      check_error(self.vcg_dll.vcg_as_cmplte(self.handle, ra, rb))
 
    def cmpz(self, ra):
       assert isinstance(ra, int)
-      check_error(self.vcg_dll.vcg_as_cmpz(self.handle, c_int(ra)))
+      check_error(self.vcg_dll.vcg_as_cmpz(self.handle, ra))
 
    def branch0(self, label):
       assert isinstance(label, str)
-      cbuff = create_string_buffer(label)
+      cbuff = create_string_buffer(label.encode('ascii'))
       check_error(self.vcg_dll.vcg_as_branch0(self.handle, byref(cbuff)))
 
    def branch1(self, label):
       assert isinstance(label, str)
-      cbuff = create_string_buffer(label)
+      cbuff = create_string_buffer(label.encode('ascii'))
       check_error(self.vcg_dll.vcg_as_branch1(self.handle, byref(cbuff)))
 
    def wait_signal(self, signal, val):
       assert isinstance(signal, int)
       assert isinstance(val, int)
-      check_error(self.vcg_dll.vcg_as_waitsignal(self.handle, c_int(signal), c_byte(val)))
+      check_error(self.vcg_dll.vcg_as_waitsignal(self.handle, signal, c_byte(val)))
 
    def waittime(self, rt):
       assert isinstance(rt, int)
-      check_error(self.vcg_dll.vcg_as_waittime(self.handle, c_int(rt)))
+      check_error(self.vcg_dll.vcg_as_waittime(self.handle, rt))
 
    def counter_rst(self):
       check_error(self.vcg_dll.vcg_as_counter_rst(self.handle))
@@ -535,36 +673,36 @@ class VCGlitcherProgram:
       assert isinstance(rd, int)
       assert isinstance(ra, int)
       assert isinstance(rb, int)
-      check_error(self.vcg_dll.vcg_as_addr(self.handle, c_int(ra), c_int(rb), c_int(rd)))
+      check_error(self.vcg_dll.vcg_as_addr(self.handle, ra, rb, rd))
 
    def subr(self, rd, ra, rb):
       assert isinstance(rd, int)
       assert isinstance(ra, int)
       assert isinstance(rb, int)
-      check_error(self.vcg_dll.vcg_as_subr(self.handle, c_int(ra), c_int(rb), c_int(rd)))
+      check_error(self.vcg_dll.vcg_as_subr(self.handle, ra, rb, rd))
       
    def notr(self, rd, ra):
       assert isinstance(rd, int)
       assert isinstance(ra, int)
-      check_error(self.vcg_dll.vcg_as_notr(self.handle, c_int(ra), c_int(rd)))
+      check_error(self.vcg_dll.vcg_as_notr(self.handle, ra, rd))
 
    def xorr(self, rd, ra, rb):
       assert isinstance(rd, int)
       assert isinstance(ra, int)
       assert isinstance(rb, int)
-      check_error(self.vcg_dll.vcg_as_xorr(self.handle, c_int(rd), c_int(ra), c_int(rb)))
+      check_error(self.vcg_dll.vcg_as_xorr(self.handle, rd, ra, rb))
 
    def andr(self, rd, ra, rb):
       assert isinstance(rd, int)
       assert isinstance(ra, int)
       assert isinstance(rb, int)
-      check_error(self.vcg_dll.vcg_as_andr(self.handle, c_int(rd), c_int(ra), c_int(rb)))
+      check_error(self.vcg_dll.vcg_as_andr(self.handle, rd, ra, rb))
 
    def orr(self, rd, ra, rb):
       assert isinstance(rd, int)
       assert isinstance(ra, int)
       assert isinstance(rb, int)
-      check_error(self.vcg_dll.vcg_as_orr(self.handle, c_int(rd), c_int(ra), c_int(rb)))
+      check_error(self.vcg_dll.vcg_as_orr(self.handle, rd, ra, rb))
 
    def backup(self):
       check_error(self.vcg_dll.vcg_as_backup(self.handle))
@@ -574,7 +712,7 @@ class VCGlitcherProgram:
 
    def counter_move(self, rd):
       assert isinstance(rd, int)
-      check_error(self.vcg_dll.vcg_as_counter_move(self.handle, c_int(rd)))
+      check_error(self.vcg_dll.vcg_as_counter_move(self.handle, rd))
 
    def end(self):
       check_error(self.vcg_dll.vcg_as_end(self.handle))
@@ -582,16 +720,16 @@ class VCGlitcherProgram:
    def set_signal(self, signal, val):
       assert isinstance(signal, int)
       assert isinstance(val, int)
-      check_error(self.vcg_dll.vcg_as_set_signal(self.handle, c_int(signal), c_byte(val&0xff)))
+      check_error(self.vcg_dll.vcg_as_set_signal(self.handle, signal, c_byte(val&0xff)))
 
    def get_signal(self, rd, signal):
       assert isinstance(rd, int)
       assert isinstance(signal, int)
-      check_error(self.vcg_dll.vcg_as_get_signal(self.handle, c_int(rd), c_int(signal)))
+      check_error(self.vcg_dll.vcg_as_get_signal(self.handle, rd, signal))
 
    def recvr(self, rd):
       assert isinstance(rd, int)
-      check_error(self.vcg_dll.vcg_as_recvr(self.handle, c_int(rd)))
+      check_error(self.vcg_dll.vcg_as_recvr(self.handle, rd))
       
    def sendi(self, data):
       assert isinstance(data, int)
@@ -602,7 +740,7 @@ class VCGlitcherProgram:
 
    def sendr(self, rs):
       assert isinstance(rs, int)
-      check_error(self.vcg_dll.vcg_as_sendr(self.handle, c_int(rs)))
+      check_error(self.vcg_dll.vcg_as_sendr(self.handle, rs))
 
    def sync(self):
       check_error(self.vcg_dll.vcg_as_sync(self.handle))
@@ -611,13 +749,13 @@ class VCGlitcherProgram:
       assert isinstance(rs, int)
       assert isinstance(i, int)
       assert isinstance(dp, int)
-      check_error(self.vcg_dll.vcg_as_txconfig(self.handle, c_int(rs), c_byte(i), c_byte(dp)))
+      check_error(self.vcg_dll.vcg_as_txconfig(self.handle, rs, c_byte(i), c_byte(dp)))
 
    def rxconfig(self, rs, i, dp):
       assert isinstance(rs, int)
       assert isinstance(i, int)
       assert isinstance(dp, int)
-      check_error(self.vcg_dll.vcg_as_rxconfig(self.handle, c_int(rs), c_byte(i), c_byte(dp)))
+      check_error(self.vcg_dll.vcg_as_rxconfig(self.handle, rs, c_byte(i), c_byte(dp)))
 
    def get_tx_inc(self, baudrate):
       return c_int(self.vcg_dll.vcg_as_get_tx_incremental_value(c_int(baudrate))).value
@@ -0,0 +1,489 @@
+'''
+Pure Python stand-in for vcglitcher.dll.
+
+Implements the vcg_* and vcg_as_* entry points used by vcglitcher.py with the
+same calling convention (ctypes values and byref() out-parameters), keeps the
+device state in memory and adds a configurable latency to every call, so the
+wrapper and campaign loops can be profiled without the VC Glitcher:
+
+    sim = VCGlitcherSim(default_latency=0.0005, target=emulator)
+    vcg = VCGlitcher(dll=sim)
+'''
+import time
+from ctypes import c_char_p
+
+# Status codes returned by the SDK, see check_error() in vcglitcher.py
+OK = 0
+NOT_FOUND = 1
+INVALID_MODE = 4
+PATTERN_FULL = 11
+INVALID_PATTERN = 12
+INVALID_HANDLE = 15
+INVALID_GLITCH_VOLTAGE = 16
+INVALID_VCC_VOLTAGE = 17
+OPERATION_FAILED = 27
+LABEL_USED = 32
+LABEL_UNDEFINED = 33
+END_MISSING = 34
+PROGRAM_EMPTY = 41
+ALREADY_OPEN = 43
+NOT_OPEN = 44
+
+# Instructions that only record their operands
+AS_OPS = (
+    'nop', 'jmpr', 'ret', 'loadi', 'loadm', 'storem', 'loadr', 'loadf', 'storer', 'addi', 'subi',
+    'shiftl', 'shiftr', 'cmpeq', 'cmpgt', 'cmplt', 'cmpgte', 'cmplte', 'cmpz', 'waitsignal',
+    'waittime', 'counter_rst', 'addr', 'subr', 'notr', 'xorr', 'andr', 'orr', 'backup', 'restore',
+    'counter_move', 'end', 'set_signal', 'get_signal', 'recvr', 'sendi', 'sendq', 'sendr', 'sync',
+    'txconfig', 'rxconfig',
+)
+# Instructions taking a label operand
+AS_LABEL_OPS = ('jmp', 'branch0', 'branch1')
+
+
+def _value(arg):
+    # Unwrap ctypes scalars and byref() of string buffers into Python values
+    obj = getattr(arg, '_obj', arg)
+    return getattr(obj, 'value', obj)
+
+
+def _label(arg):
+    # Labels arrive as byref() of a NUL-terminated string buffer
+    return _value(arg).decode('ascii')
+
+
+def _out(ref, value):
+    # Store value into a byref() out-parameter
+    ref._obj.value = value
+
+
+class Program(object):
+    def __init__(self):
+        self.instructions = []
+        self.labels = {}
+
+
+class VCGlitcherSim(object):
+    """Simulated VC Glitcher device behind the vcglitcher.dll interface"""
+
+    def __init__(self, default_latency=0.0, latencies=None, devices=1, pattern_capacity=32,
+                 sequence_overhead=0.0001, ns_scale=1e-9, glitch_range=(-8.0, 8.0),
+                 sdk_version="2.0", target=None):
+        self.default_latency = default_latency
+        self.latencies = dict(latencies or {})
+        self.devices = devices
+        self.pattern_capacity = pattern_capacity
+        self.sequence_overhead = sequence_overhead  # Fixed time of one armed sequence
+        self.ns_scale = ns_scale                    # Seconds per pattern delay/duration unit
+        self.glitch_range = glitch_range
+        self.sdk_version = sdk_version
+        self.target = target                        # Gets glitch(voltage, delay, duration) per fired pair, delay from the trigger
+                                                    # Like the real device, the sequence ends whatever the target does
+        self.calls = {}
+        self.programs = {}
+        self.next_handle = 1
+        self.memory = {}
+        self.reset_state()
+
+    def reset_state(self):
+        self.opened = False
+        self.mode = None
+        self.voltages = (0.0, 0.0, 0.0)
+        self.pattern_enabled = False
+        self.pattern = []
+        self.committed = []
+        self.armed = False
+        self.trigger = None
+        self.busy_until = 0.0
+        self.program = None
+
+    def _enter(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        latency = self.latencies.get(name, self.default_latency)
+        if latency:
+            time.sleep(latency)
+
+    def __getattr__(self, name):
+        if name.startswith('vcg_as_'):
+            op = name[len('vcg_as_'):]
+            if op in AS_OPS:
+                return lambda handle, *args: self._as_add(name, handle, op, [_value(a) for a in args])
+            if op in AS_LABEL_OPS:
+                return lambda handle, label: self._as_add(name, handle, op, [_label(label)])
+        raise AttributeError("function '{}' not found".format(name))
+
+    '''
+    >>>Device functions<<<
+    '''
+    def vcg_sdk_get_version(self):
+        self._enter('vcg_sdk_get_version')
+        return c_char_p(self.sdk_version.encode('ascii'))
+
+    def vcg_sdk_is_snapshot_version(self):
+        self._enter('vcg_sdk_is_snapshot_version')
+        return 0
+
+    def vcg_device_list(self, count):
+        self._enter('vcg_device_list')
+        _out(count, self.devices)
+        return OK
+
+    def vcg_device_get_info(self, device, index):
+        self._enter('vcg_device_get_info')
+        if _value(index) >= self.devices:
+            return NOT_FOUND
+        dev = device._obj
+        serial = "SIM{:05d}".format(_value(index)).encode('ascii')
+        for i, b in enumerate(bytearray(serial)):
+            dev.serialNumber[i] = b
+        dev.locationId = _value(index)
+        return OK
+
+    def vcg_open(self, device):
+        self._enter('vcg_open')
+        if self.opened:
+            return ALREADY_OPEN
+        self.opened = True
+        return OK
+
+    def vcg_close(self, device):
+        self._enter('vcg_close')
+        if not self.opened:
+            return NOT_OPEN
+        self.reset_state()
+        return OK
+
+    def _device_call(self, name):
+        self._enter(name)
+        return OK if self.opened else NOT_OPEN
+
+    def vcg_set_read_timeout(self, device, timeout):
+        return self._device_call('vcg_set_read_timeout')
+
+    def vcg_set_write_timeout(self, device, timeout):
+        return self._device_call('vcg_set_write_timeout')
+
+    def vcg_get_version(self, device, buf, size):
+        status = self._device_call('vcg_get_version')
+        if status == OK:
+            buf.value = b"01.00.00"
+        return status
+
+    def vcg_set_mode(self, device, mode):
+        status = self._device_call('vcg_set_mode')
+        if status != OK:
+            return status
+        if not 0 <= _value(mode) <= 4:
+            return INVALID_MODE
+        self.mode = _value(mode)
+        return OK
+
+    def vcg_is_card_inserted(self, device, inserted):
+        status = self._device_call('vcg_is_card_inserted')
+        if status == OK:
+            _out(inserted, 1)
+        return status
+
+    def vcg_set_offset(self, device, v_offset):
+        return self._device_call('vcg_set_offset')
+
+    def vcg_set_current_limit(self, device, v_limit):
+        return self._device_call('vcg_set_current_limit')
+
+    def vcg_set_vcc_voltage(self, device, v_vcc, v_glitch, v_clk):
+        status = self._device_call('vcg_set_vcc_voltage')
+        if status != OK:
+            return status
+        if not self.glitch_range[0] <= _value(v_glitch) <= self.glitch_range[1]:
+            return INVALID_GLITCH_VOLTAGE
+        if not 0.0 <= _value(v_vcc) <= 8.0:
+            return INVALID_VCC_VOLTAGE
+        self.voltages = (_value(v_vcc), _value(v_glitch), _value(v_clk))
+        return OK
+
+    def vcg_set_clk_voltage(self, device, v_clk_hi, v_clk_lo, v_glitch, v_vcc):
+        return self._device_call('vcg_set_clk_voltage')
+
+    def vcg_set_laser_voltage(self, device, v_amplitude, v_vcc_clk):
+        return self._device_call('vcg_set_laser_voltage')
+
+    def vcg_set_program(self, device, handle):
+        status = self._device_call('vcg_set_program')
+        if status != OK:
+            return status
+        if _value(handle) not in self.programs:
+            return INVALID_HANDLE
+        self.program = _value(handle)
+        return OK
+
+    def vcg_get_cpu_frequency(self, device, speed):
+        status = self._device_call('vcg_get_cpu_frequency')
+        if status == OK:
+            _out(speed, 100000000)
+        return status
+
+    def vcg_start_cpu(self, device):
+        return self._device_call('vcg_start_cpu')
+
+    def vcg_stop_cpu(self, device):
+        return self._device_call('vcg_stop_cpu')
+
+    def vcg_get_cpu_status(self, device, status_out):
+        status = self._device_call('vcg_get_cpu_status')
+        if status == OK:
+            _out(status_out, 0)
+        return status
+
+    def vcg_memory_get_size(self, device, size):
+        status = self._device_call('vcg_memory_get_size')
+        if status == OK:
+            _out(size, 1024)
+        return status
+
+    def vcg_memory_write(self, device, address, data):
+        status = self._device_call('vcg_memory_write')
+        if status == OK:
+            self.memory[_value(address)] = _value(data)
+        return status
+
+    def vcg_memory_read(self, device, address, data):
+        status = self._device_call('vcg_memory_read')
+        if status == OK:
+            _out(data, self.memory.get(_value(address), 0))
+        return status
+
+    def vcg_sc_write(self, device, buf, length):
+        return self._device_call('vcg_sc_write')
+
+    def vcg_sc_read(self, device, buf, n_read, n_readout):
+        status = self._device_call('vcg_sc_read')
+        if status == OK:
+            _out(n_readout, 0)
+        return status
+
+    def vcg_set_sc_clock_speed(self, device, speed):
+        return self._device_call('vcg_set_sc_clock_speed')
+
+    def vcg_pattern_set(self, device, buf, length):
+        return self._device_call('vcg_pattern_set')
+
+    def vcg_pattern_enable(self, device):
+        status = self._device_call('vcg_pattern_enable')
+        if status == OK:
+            self.pattern_enabled = True
+        return status
+
+    def vcg_pattern_disable(self, device):
+        status = self._device_call('vcg_pattern_disable')
+        if status == OK:
+            self.pattern_enabled = False
+        return status
+
+    def vcg_sc_reset_configuration(self, device, src, polarity):
+        return self._device_call('vcg_sc_reset_configuration')
+
+    def vcg_set_sc_soft_reset(self, device, value):
+        return self._device_call('vcg_set_sc_soft_reset')
+
+    '''
+    >>>Transparent VC Glitcher functions<<<
+    '''
+    def vcg_tvcg_enable_sync(self, device, enabled):
+        return self._device_call('vcg_tvcg_enable_sync')
+
+    def vcg_tvcg_add_perturbation_program(self, device, handle):
+        status = self._device_call('vcg_tvcg_add_perturbation_program')
+        if status == OK and _value(handle) not in self.programs:
+            return INVALID_HANDLE
+        return status
+
+    def vcg_tvcg_execute_direct(self, device, handle):
+        status = self._device_call('vcg_tvcg_execute_direct')
+        if status == OK and _value(handle) not in self.programs:
+            return INVALID_HANDLE
+        return status
+
+    def vcg_tvcg_powerup(self, device):
+        return self._device_call('vcg_tvcg_powerup')
+
+    def vcg_tvcg_powerdown(self, device):
+        return self._device_call('vcg_tvcg_powerdown')
+
+    def vcg_tvcg_update_baudrate(self, device, baudrate):
+        return self._device_call('vcg_tvcg_update_baudrate')
+
+    def vcg_tvcg_reset_sc(self, device):
+        return self._device_call('vcg_tvcg_reset_sc')
+
+    def vcg_tvcg_reset_sc_glitch(self, device, n_wait, handle):
+        return self._device_call('vcg_tvcg_reset_sc_glitch')
+
+    def vcg_tvcg_command(self, device, buf, length, n_wait, handle):
+        return self._device_call('vcg_tvcg_command')
+
+    def vcg_tvcg_get_response(self, device, buf, n_read, n_readout):
+        status = self._device_call('vcg_tvcg_get_response')
+        if status == OK:
+            _out(n_readout, 0)
+        return status
+
+    def vcg_tvcg_is_available(self, device, available):
+        status = self._device_call('vcg_tvcg_is_available')
+        if status == OK:
+            _out(available, 1)
+        return status
+
+    '''
+    >>>Embedded VC Glitcher functions<<<
+    '''
+    def vcg_evcg_clear_pattern(self, device):
+        status = self._device_call('vcg_evcg_clear_pattern')
+        if status == OK:
+            self.pattern = []
+        return status
+
+    def _add_pair(self, delay, duration):
+        if len(self.pattern) >= self.pattern_capacity:
+            return PATTERN_FULL
+        if delay < 0 or duration <= 0:
+            return INVALID_PATTERN
+        self.pattern.append((delay, duration))
+        return OK
+
+    def vcg_evcg_add_pattern_pair(self, device, delay, duration):
+        status = self._device_call('vcg_evcg_add_pattern_pair')
+        if status != OK:
+            return status
+        return self._add_pair(_value(delay), _value(duration))
+
+    def vcg_evcg_add_glitch(self, device, g_delay, g_length, g_repeat):
+        status = self._device_call('vcg_evcg_add_glitch')
+        for i in range(_value(g_repeat)):
+            if status != OK:
+                break
+            status = self._add_pair(_value(g_delay), _value(g_length))
+        return status
+
+    def vcg_evcg_set_pattern(self, device):
+        status = self._device_call('vcg_evcg_set_pattern')
+        if status == OK:
+            self.committed = list(self.pattern)
+        return status
+
+    def vcg_evcg_set_arm(self, device, armed):
+        status = self._device_call('vcg_evcg_set_arm')
+        if status == OK:
+            self.armed = bool(_value(armed))
+        return status
+
+    def vcg_evcg_trigger_configuration(self, device, src, edge):
+        status = self._device_call('vcg_evcg_trigger_configuration')
+        if status == OK:
+            self.trigger = (_value(src), _value(edge))
+        return status
+
+    def vcg_evcg_soft_start(self, device):
+        status = self._device_call('vcg_evcg_soft_start')
+        if status != OK:
+            return status
+        if not self.armed or not self.committed:
+            return OPERATION_FAILED
+        length = sum(delay + duration for delay, duration in self.committed)
+        self.busy_until = time.time() + self.sequence_overhead + length * self.ns_scale
+        if self.target is not None:
+            offset = 0  # Pattern delays are relative to the end of the previous glitch
+            for delay, duration in self.committed:
+                offset += delay
+                self.target.glitch(self.voltages[1], offset, duration)
+                offset += duration
+        return OK
+
+    def vcg_evcg_pd_en(self, device, enabled):
+        return self._device_call('vcg_evcg_pd_en')
+
+    def vcg_evcg_get_guaranteed_pattern_number(self, device, n_pattern):
+        status = self._device_call('vcg_evcg_get_guaranteed_pattern_number')
+        if status == OK:
+            _out(n_pattern, self.pattern_capacity)
+        return status
+
+    def vcg_evcg_busy(self, device, busy):
+        status = self._device_call('vcg_evcg_busy')
+        if status == OK:
+            _out(busy, int(time.time() < self.busy_until))
+        return status
+
+    def vcg_evcg_is_available(self, device, available):
+        status = self._device_call('vcg_evcg_is_available')
+        if status == OK:
+            _out(available, 1)
+        return status
+
+    '''
+    >>>Assembler functions<<<
+    '''
+    def vcg_as_create_program(self):
+        self._enter('vcg_as_create_program')
+        handle = self.next_handle
+        self.next_handle += 1
+        self.programs[handle] = Program()
+        return handle
+
+    def vcg_as_destroy_program(self, handle):
+        self._enter('vcg_as_destroy_program')
+        if self.programs.pop(_value(handle), None) is None:
+            return INVALID_HANDLE
+        return OK
+
+    def _as_add(self, name, handle, op, args):
+        self._enter(name)
+        program = self.programs.get(_value(handle))
+        if program is None:
+            return INVALID_HANDLE
+        program.instructions.append((op, args))
+        return OK
+
+    def vcg_as_add_label(self, handle, label):
+        self._enter('vcg_as_add_label')
+        program = self.programs.get(_value(handle))
+        if program is None:
+            return INVALID_HANDLE
+        label = _label(label)
+        if label in program.labels:
+            return LABEL_USED
+        program.labels[label] = len(program.instructions)
+        return OK
+
+    def vcg_as_check_program(self, handle):
+        self._enter('vcg_as_check_program')
+        program = self.programs.get(_value(handle))
+        if program is None:
+            return INVALID_HANDLE
+        if not program.instructions:
+            return PROGRAM_EMPTY
+        if not any(op == 'end' for op, args in program.instructions):
+            return END_MISSING
+        for op, args in program.instructions:
+            if op in AS_LABEL_OPS and args[0] not in program.labels:
+                return LABEL_UNDEFINED
+        return OK
+
+    def vcg_as_print_program(self, handle):
+        self._enter('vcg_as_print_program')
+        program = self.programs.get(_value(handle))
+        if program is None:
+            return INVALID_HANDLE
+        targets = dict((index, label) for label, index in program.labels.items())
+        for index, (op, args) in enumerate(program.instructions):
+            if index in targets:
+                print("{}:".format(targets[index]))
+            print("    {} {}".format(op, ", ".join(str(a) for a in args)))
+        return OK
+
+    def vcg_as_get_tx_incremental_value(self, baudrate):
+        self._enter('vcg_as_get_tx_incremental_value')
+        return int(round(_value(baudrate) * 65536.0 / 100000000))
+
+    def vcg_as_get_rx_incremental_value(self, baudrate):
+        self._enter('vcg_as_get_rx_incremental_value')
+        return int(round(_value(baudrate) * 65536.0 / 100000000))